@@ -0,0 +1,225 @@
+"""End-to-end crawl throughput benchmark.
+
+Starts utils/local_cache_server.py on a synthetic web graph and crawls it
+with every combination of worker (thread / async / pipeline, as in
+launch.py --worker) and frontier setup (one lock, sharded, sharded with the
+write-behind journal). Politeness is switched off, so the numbers show what
+the crawler itself can do against a server with the given latency.
+
+Reports pages/s, the mean and p99 time workers wait in get_tbd_url, the
+time add_urls takes per link, and CPU seconds per page (this process plus
+parser processes; the cache server runs in its own process and isn't
+counted).
+
+    python -m benchmarks.crawl_throughput --pages 2000 --latency 0.02 --workers thread pipeline
+"""
+import atexit
+import contextlib
+import logging
+import multiprocessing
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from configparser import ConfigParser
+
+import crawler.frontier as frontier_module
+import scraper
+from crawler import Crawler
+from crawler.frontier import Frontier
+from utils.config import Config
+from utils.local_cache_server import SyntheticWeb, add_web_arguments, web_from_arguments
+
+# Frontier setups: name -> (SHARDS, JOURNAL)
+FRONTIERS = {
+    "locked": (1, False),
+    "sharded": (16, False),
+    "journaled": (16, True),
+}
+WORKERS = ("thread", "async", "pipeline")
+
+
+class TimedFrontier(Frontier):
+    """Frontier that times its callers' waits and counts finished pages."""
+
+    def __init__(self, config, restart: bool):
+        super().__init__(config, restart)
+        self.get_waits: list[float] = []
+        self.add_time = 0.0
+        self.adds = 0
+        self.completed = 0
+        self._stats_lock = threading.Lock()
+
+    def get_tbd_url(self):
+        start = time.perf_counter()
+        url = super().get_tbd_url()
+        self.get_waits.append(time.perf_counter() - start)
+        return url
+
+    def add_urls(self, urls, parent: str | None = None, quality: float | None = None):
+        urls = list(urls)
+        start = time.perf_counter()
+        super().add_urls(urls, parent, quality)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.add_time += elapsed
+            self.adds += len(urls)
+
+    def mark_url_complete(self, url: str):
+        super().mark_url_complete(url)
+        with self._stats_lock:
+            self.completed += 1
+
+
+def make_config(tmp: str, web: SyntheticWeb, server: tuple[str, int], frontier: str,
+                threads: int, async_concurrency: int, parse_processes: int) -> Config:
+    shards, journal = FRONTIERS[frontier]
+    cparser = ConfigParser()
+    cparser.read("config.ini")
+    local = cparser["LOCAL PROPERTIES"]
+    local["SAVE"] = os.path.join(tmp, "bench.shelve")
+    local["ANALYTICS_SNAPSHOT"] = os.path.join(tmp, "analytics.snapshot")
+    local["INDEX"] = ""
+    local["SHARDS"] = str(shards)
+    local["JOURNAL"] = str(journal)
+    local["THREADCOUNT"] = str(threads)
+    local["ASYNC_CONCURRENCY"] = str(async_concurrency)
+    local["PARSE_PROCESSES"] = str(parse_processes)
+    local["METRICS_PORT"] = "0"
+    local["METRICS_INTERVAL"] = "0"
+    cparser["CRAWLER"]["SEEDURL"] = ",".join(web.seed_urls())
+    cparser["CRAWLER"]["POLITENESS"] = "0"
+    config = Config(cparser)
+    config.cache_server = server
+    return config
+
+
+def _worker_factory(kind: str):
+    if kind == "async":
+        from crawler.async_worker import AsyncWorker
+        return AsyncWorker
+    if kind == "pipeline":
+        from crawler.pipeline import PipelineWorker
+        return PipelineWorker
+    from crawler.worker import Worker
+    return Worker
+
+
+def _cpu_seconds() -> float:
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def _crawl(results, web, server, worker: str, frontier: str, threads: int,
+           async_concurrency: int, parse_processes: int):
+    # Runs in a fresh process, so the scraper's module-level state starts empty
+    logging.disable(logging.INFO)
+    frontier_module.POLITENESS_DELAY = 0.0
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        # The async worker multiplexes downloads inside one thread
+        config = make_config(tmp, web, server, frontier, 1 if worker == "async" else threads,
+                             async_concurrency, parse_processes)
+        cpu = _cpu_seconds()
+        started = time.perf_counter()
+        crawler = Crawler(config, restart=True, frontier_factory=TimedFrontier,
+                          worker_factory=_worker_factory(worker))
+        crawler.start()
+        elapsed = time.perf_counter() - started
+        cpu = _cpu_seconds() - cpu
+        timed = crawler.frontier
+        timed._db.close()
+
+    waits = sorted(timed.get_waits) or [0.0]
+    pages = timed.completed
+    results.put({
+        "pages": pages,
+        "pages_per_sec": pages / elapsed,
+        "get_ms": 1000 * sum(waits) / len(waits),
+        "get_p99_ms": 1000 * waits[min(len(waits) - 1, int(0.99 * len(waits)))],
+        "add_us": 1e6 * timed.add_time / max(1, timed.adds),
+        "cpu_ms": 1000 * cpu / max(1, pages),
+    })
+
+
+def run_once(web: SyntheticWeb, server: tuple[str, int], worker: str, frontier: str, threads: int,
+             async_concurrency: int, parse_processes: int) -> dict:
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    process = context.Process(target=_crawl, args=(results, web, server, worker, frontier, threads,
+                                                   async_concurrency, parse_processes))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+@contextlib.contextmanager
+def cache_server(opts):
+    """Run utils.local_cache_server in a subprocess for the duration."""
+    with socket.socket() as probe:
+        probe.bind((opts.host, 0))
+        port = probe.getsockname()[1]
+    args = [sys.executable, "-m", "utils.local_cache_server", "--host", opts.host, "--port", str(port),
+            "--pages", str(opts.pages), "--fanout", str(opts.fanout), "--hosts", str(opts.hosts),
+            "--page-bytes", str(opts.page_bytes), "--latency", str(opts.latency),
+            "--error-rate", str(opts.error_rate), "--cache-error-rate", str(opts.cache_error_rate),
+            "--binary-rate", str(opts.binary_rate), "--seed", str(opts.seed)]
+    process = subprocess.Popen(args, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                socket.create_connection((opts.host, port), timeout=1).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("local cache server did not start")
+                time.sleep(0.05)
+        yield opts.host, port
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    cli = ArgumentParser(description="End-to-end crawl throughput benchmark")
+    cli.add_argument("--workers", nargs="+", choices=WORKERS, default=list(WORKERS))
+    cli.add_argument("--frontiers", nargs="+", choices=list(FRONTIERS), default=list(FRONTIERS))
+    cli.add_argument("--threads", type=int, default=8, help="THREADCOUNT for thread and pipeline workers")
+    cli.add_argument("--async-concurrency", type=int, default=32, help="downloads in flight for async")
+    cli.add_argument("--parse-processes", type=int, default=0, help="pipeline parsers (0 = one per CPU)")
+    cli.add_argument("--host", default="127.0.0.1")
+    add_web_arguments(cli)
+    opts = cli.parse_args()
+    web = web_from_arguments(opts)
+
+    # The crawls run in child processes; this one's (empty) report would
+    # overwrite Logs/report.txt of a real crawl
+    atexit.unregister(scraper._write_report)
+
+    print(f"{opts.pages} pages, fan-out {opts.fanout}, ~{opts.page_bytes} bytes, "
+          f"{1000 * opts.latency:.0f} ms latency, {opts.error_rate:.0%} errors, "
+          f"{opts.cache_error_rate:.0%} cache errors")
+    print(f"{'worker':>8} {'frontier':>9} {'pages':>6} {'pages/s':>8} {'get ms':>7} "
+          f"{'get p99':>8} {'add us/url':>10} {'cpu ms/page':>11}")
+    with cache_server(opts) as server:
+        for worker in opts.workers:
+            for frontier in opts.frontiers:
+                r = run_once(web, server, worker, frontier, opts.threads, opts.async_concurrency,
+                             opts.parse_processes)
+                print(f"{worker:>8} {frontier:>9} {r['pages']:>6} {r['pages_per_sec']:>8.1f} "
+                      f"{r['get_ms']:>7.2f} {r['get_p99_ms']:>8.2f} {r['add_us']:>10.1f} "
+                      f"{r['cpu_ms']:>11.2f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
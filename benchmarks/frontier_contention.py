@@ -0,0 +1,182 @@
+"""Frontier lock-contention benchmark.
+
+Runs the same synthetic crawl against the original frontier (one global
+RLock around a deque and a shelve synced on every write; shards column
+"rlock"), against the current frontier with one shard (SHARDS = 1, its
+single-lock layout) and against sharded ones, each with the write-behind
+journal off and on (JOURNAL; the baseline has none, journal column "-"),
+with politeness switched off so only frontier overhead and lock waits are
+measured. Each simulated worker
+fetches a URL, "downloads" it (a short sleep that releases the GIL, like
+real I/O), adds its outlinks and marks it complete.
+
+    python -m benchmarks.frontier_contention --threads 4 16 32 --shards 1 16 --journal off on
+"""
+import atexit
+import os
+import random
+import shelve
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from collections import defaultdict, deque
+from configparser import ConfigParser
+from threading import RLock
+from urllib.parse import urlparse
+
+import crawler.frontier as frontier_module
+import scraper
+from crawler.frontier import Frontier
+from utils import get_urlhash, normalize
+from utils.config import Config
+
+
+class GlobalLockFrontier:
+    """The frontier as it was before the per-domain queues and shards: every
+    operation takes one RLock, URLs wait in a single LIFO deque and the
+    shelve is synced on every write. Kept here as the benchmark baseline.
+    Like the original, get_tbd_url returns None as soon as the deque is
+    empty, even if other workers may still add links."""
+
+    def __init__(self, config, restart: bool):
+        self._lock = RLock()
+        self.to_be_downloaded: deque[str] = deque()
+        self._domain_last: defaultdict[str, float] = defaultdict(float)
+        self._db = shelve.open(config.save_file, flag="n" if restart else "c", writeback=False)
+        for seed in config.seed_urls:
+            self.add_url(seed)
+
+    def get_tbd_url(self) -> str | None:
+        while True:
+            with self._lock:
+                if not self.to_be_downloaded:
+                    return None
+                url = self.to_be_downloaded.pop()
+                domain = urlparse(url).netloc
+                wait = frontier_module.POLITENESS_DELAY - (time.time() - self._domain_last[domain])
+                if wait <= 0:
+                    self._domain_last[domain] = time.time()
+                    return url
+                self.to_be_downloaded.appendleft(url)
+            time.sleep(wait)
+
+    def add_url(self, url: str):
+        url = normalize(url)
+        if not scraper.is_valid(url):
+            return
+        url_hash = get_urlhash(url)
+        with self._lock:
+            if url_hash not in self._db:
+                self._db[url_hash] = (url, False)
+                self._db.sync()
+                self.to_be_downloaded.append(url)
+
+    def mark_url_complete(self, url: str):
+        url_hash = get_urlhash(url)
+        with self._lock:
+            if url_hash in self._db:
+                self._db[url_hash] = (url, True)
+                self._db.sync()
+
+
+def make_config(save_file: str, shards: int, journal: bool, threads: int, domains: int) -> Config:
+    cparser = ConfigParser()
+    cparser.read("config.ini")
+    cparser["LOCAL PROPERTIES"]["SAVE"] = save_file
+    cparser["LOCAL PROPERTIES"]["SHARDS"] = str(shards)
+    cparser["LOCAL PROPERTIES"]["JOURNAL"] = str(journal)
+    cparser["LOCAL PROPERTIES"]["THREADCOUNT"] = str(threads)
+    cparser["CRAWLER"]["SEEDURL"] = ",".join(
+        f"https://h{d}.ics.uci.edu/" for d in range(domains))
+    return Config(cparser)
+
+
+def run_once(shards: int | None, journal: bool, threads: int, pages: int, fanout: int, domains: int,
+             io_delay: float) -> dict:
+    """Crawl `pages` synthetic pages and return throughput and wait times.
+    shards=None runs the GlobalLockFrontier baseline (which ignores journal)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        config = make_config(os.path.join(tmp, "bench.shelve"), shards or 1, journal, threads, domains)
+        frontier = (GlobalLockFrontier if shards is None else Frontier)(config, restart=True)
+
+        fetched = 0
+        fetched_lock = threading.Lock()
+        get_wait = [0.0] * threads
+        add_time = [0.0] * threads
+
+        def worker(worker_id: int):
+            nonlocal fetched
+            rng = random.Random(worker_id)
+            while True:
+                start = time.perf_counter()
+                url = frontier.get_tbd_url()
+                get_wait[worker_id] += time.perf_counter() - start
+                if url is None:
+                    return
+
+                time.sleep(io_delay)  # Stand-in for the download
+
+                with fetched_lock:
+                    fetched += 1
+                    expand = fetched <= pages
+                if expand:
+                    start = time.perf_counter()
+                    for _ in range(fanout):
+                        frontier.add_url(
+                            f"https://h{rng.randrange(domains)}.ics.uci.edu/p/{rng.randrange(10 ** 9)}")
+                    add_time[worker_id] += time.perf_counter() - start
+                frontier.mark_url_complete(url)
+
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - started
+        frontier._db.close()
+
+    return {
+        "pages": fetched,
+        "pages_per_sec": fetched / elapsed,
+        "get_ms": 1000 * sum(get_wait) / max(1, fetched),
+        "add_us": 1e6 * sum(add_time) / max(1, pages * fanout),
+    }
+
+
+def main():
+    cli = ArgumentParser(description="Frontier lock-contention benchmark")
+    cli.add_argument("--threads", type=int, nargs="+", default=[4, 16, 32])
+    cli.add_argument("--shards", type=int, nargs="+", default=[1, 16])
+    cli.add_argument("--journal", choices=["off", "on"], nargs="+", default=["off", "on"],
+                     help="run the frontier without and/or with the write-behind journal")
+    cli.add_argument("--pages", type=int, default=2000, help="pages whose outlinks get added")
+    cli.add_argument("--fanout", type=int, default=20, help="outlinks added per page")
+    cli.add_argument("--domains", type=int, default=256)
+    cli.add_argument("--io-delay", type=float, default=0.002, help="simulated download time (s)")
+    cli.add_argument("--no-baseline", action="store_true", help="skip the original global-RLock frontier")
+    opts = cli.parse_args()
+
+    # Importing the frontier imports scraper, which registers its end-of-crawl
+    # report; this isn't a crawl, so leave Logs/report.txt alone
+    atexit.unregister(scraper._write_report)
+
+    # Measure the frontier itself, not the politeness window
+    frontier_module.POLITENESS_DELAY = 0.0
+
+    runs = [] if opts.no_baseline else [(None, False)]
+    runs += [(shards, journal == "on") for journal in opts.journal for shards in opts.shards]
+
+    print(f"{'threads':>7} {'shards':>6} {'journal':>7} {'pages':>7} {'pages/s':>9} "
+          f"{'get ms/page':>12} {'add us/url':>11}")
+    for threads in opts.threads:
+        for shards, journal in runs:
+            r = run_once(shards, journal, threads, opts.pages, opts.fanout, opts.domains, opts.io_delay)
+            journal_label = "-" if shards is None else ("on" if journal else "off")
+            print(f"{threads:>7} {shards or 'rlock':>6} {journal_label:>7} {r['pages']:>7} "
+                  f"{r['pages_per_sec']:>9.0f} {r['get_ms']:>12.3f} {r['add_us']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
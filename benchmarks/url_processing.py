@@ -0,0 +1,188 @@
+"""URL filtering and normalization microbenchmark.
+
+Builds a seeded corpus of pages with realistic outlinks (relative and
+absolute, in and out of scope, fragments, queries, binary files, mailto: and
+javascript: links, repeats, trailing slashes, uppercase hosts, ports) and
+times what happens to a page's links between the parser and the frontier's
+lock:
+
+    old   per link: urljoin + urldefrag, is_valid in record_page, then
+          normalize + is_valid + get_urlhash + urlparse again in add_url
+    new   scraper._absolute_links, then one link_processor.process pass
+          (parse once, cached host scope, hash from the same parse); the
+          frontier's own process call just passes the Links through
+
+Both must keep the same links with the same hashes; the run stops if not.
+("kept" counts the old path's in-page repeats too: there the frontier's
+dedup dropped them.)
+Also times the binary-extension regex with and without the leading ".*".
+
+    python -m benchmarks.url_processing --pages 2000 --links 60
+"""
+import atexit
+import random
+import re
+import time
+from argparse import ArgumentParser
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import scraper
+from utils import get_urlhash, normalize
+
+IN_SCOPE = ["www.ics.uci.edu", "ics.uci.edu", "www.informatics.uci.edu", "vision.ics.uci.edu",
+            "www.stat.uci.edu", "cs.uci.edu", "sli.ics.uci.edu", "wics.ics.uci.edu"]
+OUT_OF_SCOPE = ["www.uci.edu", "news.uci.edu", "github.com", "www.youtube.com", "twitter.com",
+                "www.linkedin.com", "scholar.google.com", "en.wikipedia.org"]
+WORDS = ["about", "people", "research", "faculty", "news", "events", "courses", "grad",
+         "undergrad", "projects", "publications", "seminar", "contact", "labs", "~eppstein"]
+BINARY = ["pdf", "pptx", "zip", "png", "jpg", "tar.gz", "mp4", "css", "js", "docx"]
+
+
+def _path(rng: random.Random) -> str:
+    path = "/".join(rng.choice(WORDS) for _ in range(rng.randint(0, 4)))
+    if rng.random() < 0.15:
+        path += f"/{rng.randint(1990, 2024)}-{rng.randint(1, 12):02d}"
+    if rng.random() < 0.25:
+        path += rng.choice([".html", ".php", "/"])
+    return "/" + path
+
+
+def _href(rng: random.Random, host: str) -> str:
+    kind = rng.random()
+    if kind < 0.30:  # Relative to the page
+        href = rng.choice(["", "../", "./"]) + _path(rng).lstrip("/")
+    elif kind < 0.50:  # Root-relative
+        href = _path(rng)
+    elif kind < 0.70:  # Absolute, in scope (sometimes shouting or with a port)
+        other = rng.choice(IN_SCOPE)
+        if rng.random() < 0.1:
+            other = other.upper()
+        if rng.random() < 0.05:
+            other += ":8080"
+        href = f"{rng.choice(['http', 'https'])}://{other}{_path(rng)}"
+    elif kind < 0.82:  # Out of scope
+        href = f"https://{rng.choice(OUT_OF_SCOPE)}{_path(rng)}"
+    elif kind < 0.88:  # Files
+        href = f"{_path(rng).rstrip('/')}/{rng.choice(WORDS)}.{rng.choice(BINARY)}"
+    elif kind < 0.92:
+        href = rng.choice(["mailto:someone@ics.uci.edu", "javascript:void(0)", "JavaScript:show()",
+                           "tel:+19495551234", "#top", "#"])
+    else:  # Calendars and trackers
+        href = f"{_path(rng)}?{'&'.join(f'{w}={rng.randint(0, 99)}' for w in rng.sample(WORDS, rng.randint(1, 6)))}"
+    if rng.random() < 0.15:
+        href += "#" + rng.choice(WORDS)
+    if rng.random() < 0.05:
+        href = f"  {href} "
+    return href
+
+
+def make_corpus(pages: int, links: int, seed: int) -> list[tuple[str, list[str]]]:
+    """[(page url, its raw hrefs)], with each page repeating some of its own links (menus, footers)."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(pages):
+        host = rng.choice(IN_SCOPE)
+        base = f"https://{host}{_path(rng)}"
+        hrefs = [_href(rng, host) for _ in range(links)]
+        hrefs += rng.sample(hrefs, links // 5)
+        rng.shuffle(hrefs)
+        corpus.append((base, hrefs))
+    return corpus
+
+
+# --- The per-link path, as it was ---
+
+_OLD_BINARY = re.compile(scraper._BINARY_EXTENSIONS.pattern.join([".*", ""]), scraper._BINARY_EXTENSIONS.flags)
+
+
+def _old_is_valid(url: str) -> bool:
+    try:
+        parsed = urlparse(url)
+        if parsed.scheme not in {"http", "https"}:
+            return False
+        if len(parsed.query) > 50:
+            return False
+        if _OLD_BINARY.match(parsed.path):
+            return False
+        host = parsed.hostname.lower() if parsed.hostname else ""
+        if not host.endswith("uci.edu"):
+            return False
+        if host == "today.uci.edu":
+            in_scope = parsed.path.startswith(scraper.TODAY_PATH_PREFIX)
+        else:
+            in_scope = any(host.endswith(domain) for domain in scraper.ASSIGNMENT_DOMAINS)
+        return in_scope and not scraper.traps.is_trap(parsed)
+    except Exception:
+        return False
+
+
+def old_links(base_url: str, hrefs: list[str]) -> list[tuple[str, str]]:
+    outlinks = []
+    for href in hrefs:
+        href = href.strip()
+        if not href or href.lower().startswith("javascript:"):
+            continue
+        try:
+            outlinks.append(urldefrag(urljoin(base_url, href))[0])
+        except ValueError:
+            continue
+    links = []
+    for link in [link for link in outlinks if _old_is_valid(link)]:  # record_page
+        url = normalize(link)  # add_url
+        if not _old_is_valid(url):
+            continue
+        urlparse(url)  # For its domain
+        links.append((url, get_urlhash(url)))
+    return links
+
+
+def new_links(base_url: str, hrefs: list[str]) -> list[tuple[str, str]]:
+    links = scraper.link_processor.process(scraper._absolute_links(base_url, hrefs))  # record_page
+    return [(str(link), link.hash) for link in scraper.link_processor.process(links)]  # add_urls
+
+
+def _time(fn, corpus, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        kept = sum(len(fn(base, hrefs)) for base, hrefs in corpus)
+        best = min(best, time.perf_counter() - start)
+    return best, kept
+
+
+def main():
+    cli = ArgumentParser(description="URL filtering and normalization microbenchmark")
+    cli.add_argument("--pages", type=int, default=2000)
+    cli.add_argument("--links", type=int, default=60, help="distinct outlinks per page (plus 20%% repeats)")
+    cli.add_argument("--repeat", type=int, default=3, help="runs per variant (best is reported)")
+    cli.add_argument("--seed", type=int, default=0)
+    opts = cli.parse_args()
+
+    # Importing scraper registers its end-of-crawl report; this isn't a crawl
+    atexit.unregister(scraper._write_report)
+
+    corpus = make_corpus(opts.pages, opts.links, opts.seed)
+    hrefs = sum(len(page_hrefs) for _, page_hrefs in corpus)
+    for base, page_hrefs in corpus:
+        old, new = old_links(base, page_hrefs), new_links(base, page_hrefs)
+        if sorted(set(old)) != sorted(new):
+            raise SystemExit(f"Old and new paths disagree on the links of {base}")
+
+    print(f"{hrefs} hrefs on {len(corpus)} pages")
+    print(f"{'variant':>8} {'kept':>8} {'us/href':>8} {'speedup':>8}")
+    old_time, kept = _time(old_links, corpus, opts.repeat)
+    print(f"{'old':>8} {kept:>8} {1e6 * old_time / hrefs:>8.2f} {1.0:>8.2f}")
+    scraper._host_scope.cache_clear()  # Start cold, like a fresh crawl
+    new_time, kept = _time(new_links, corpus, opts.repeat)
+    print(f"{'new':>8} {kept:>8} {1e6 * new_time / hrefs:>8.2f} {old_time / new_time:>8.2f}")
+
+    paths = [urlparse(urljoin(base, href.strip())).path for base, page_hrefs in corpus for href in page_hrefs]
+    for name, check in [("'.*' + match", _OLD_BINARY.match), ("search", scraper._BINARY_EXTENSIONS.search)]:
+        start = time.perf_counter()
+        for path in paths:
+            check(path)
+        print(f"binary-extension regex, {name}: {1e6 * (time.perf_counter() - start) / len(paths):.3f} us/path")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
+import os
+
 from utils import get_logger
+from utils.metrics import metrics
 from crawler.frontier import Frontier
 from crawler.worker import Worker
+import scraper  # scraper.py module (holds the crawl analytics)
 
 # This is the main controller class for running the crawler
 class Crawler(object):
@@ -14,6 +18,23 @@ class Crawler(object):
         # Create the frontier (manages the queue of URLs and politeness)
         self.frontier = frontier_factory(config, restart)
 
+        # Bring back the report statistics from the last checkpoint when resuming
+        self.analytics_path = config.analytics_snapshot
+        if restart and os.path.exists(self.analytics_path):
+            os.remove(self.analytics_path)
+        elif not restart and os.path.exists(self.analytics_path):
+            scraper.analytics.load(self.analytics_path)
+            self.logger.info(f"Resumed crawl analytics from {self.analytics_path}")
+
+        # Feed crawled pages straight into a live search index (see segments.py).
+        # Imported here so crawls without an index don't need the indexer's packages.
+        if config.index_dir:
+            from segments import IndexWriter
+            scraper.index_writer = IndexWriter(
+                config.index_dir, restart, config.index_flush_interval, config.index_memory_mb,
+                config.index_merge_factor, config.index_positions)
+            self.logger.info(f"Indexing pages into {config.index_dir}")
+
         # List to hold all the worker threads
         self.workers = list()
 
@@ -22,6 +43,19 @@ class Crawler(object):
 
     # Starts all the workers asynchronously
     def start_async(self):
+        # Periodically save the report statistics so a crash doesn't lose them
+        scraper.analytics.start_checkpoints(self.analytics_path, self.config.checkpoint_interval)
+
+        # Live metrics: a local text endpoint and a periodic summary in the log
+        if self.config.metrics_port:
+            try:
+                metrics.start_server(self.config.metrics_port)
+                self.logger.info(f"Metrics at http://127.0.0.1:{self.config.metrics_port}/metrics")
+            except OSError as exc:
+                self.logger.warning(f"Metrics endpoint not started: {exc}")
+        if self.config.metrics_interval > 0:
+            metrics.start_summaries(self.config.metrics_interval, get_logger("METRICS"))
+
         # Create a worker thread for each configured thread count
         self.workers = [
             self.worker_factory(worker_id, self.config, self.frontier)
@@ -40,3 +74,17 @@ class Crawler(object):
     def join(self):
         for worker in self.workers:
             worker.join()
+        self._close_index()
+        if self.config.metrics_interval > 0:
+            get_logger("METRICS").info("Crawl finished\n" + metrics.summary())
+
+    # Called on Ctrl-C: save the report statistics before the process exits
+    def stop(self):
+        scraper.analytics.checkpoint(self.analytics_path)
+        self._close_index()
+
+    # Publishes the pages still in memory and stops the index's background work
+    def _close_index(self):
+        if scraper.index_writer is not None:
+            scraper.index_writer.close()
+
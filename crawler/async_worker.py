@@ -0,0 +1,102 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+import aiohttp
+
+from utils.download import download_async
+from utils import get_logger
+from utils.metrics import metrics
+from crawler.priority import page_quality
+import scraper  # scraper.py module
+
+
+class AsyncWorker(Thread):
+    """Crawler worker that keeps many fetches in flight on one event loop.
+
+    Plugs into `Crawler` as a `worker_factory`. Each AsyncWorker is still a
+    Thread, but instead of one blocking download at a time it runs up to
+    ASYNC_CONCURRENCY downloads on its own asyncio loop, all sharing one
+    keep-alive connection pool to the cache server.
+
+    The frontier interface is unchanged: a single dispatcher calls the
+    (blocking) `get_tbd_url` on a helper thread only when a fetch slot is
+    free, and the URL is fetched right away, so per-domain politeness is
+    still decided by the frontier. Scraping is CPU work and runs on the
+    loop's default thread pool so it doesn't stall other fetches."""
+
+    def __init__(self, worker_id: int, config, frontier):
+        self.logger = get_logger(f"AsyncWorker-{worker_id}", "Worker")
+        self.config = config
+        self.frontier = frontier
+        self.concurrency = max(1, config.async_concurrency)
+        super().__init__(daemon=True)
+
+    def run(self):
+        asyncio.run(self._crawl())
+
+    #  Dispatch loop: one URL per free fetch slot
+    async def _crawl(self):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        # get_tbd_url may block on politeness, so it gets its own thread
+        frontier_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frontier")
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=self.config.async_timeout)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            while True:
+                await slots.acquire()
+                start = time.perf_counter()
+                url = await loop.run_in_executor(frontier_pool, self.frontier.get_tbd_url)
+                metrics.observe("worker.get_tbd_url", time.perf_counter() - start)
+                if url is None:
+                    self.logger.info("Frontier empty – shutting down event loop.")
+                    break
+                task = asyncio.create_task(self._fetch(session, url, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        frontier_pool.shutdown()
+
+    #  One fetch–process cycle
+    async def _fetch(self, session, url: str, slots: asyncio.Semaphore):
+        loop = asyncio.get_running_loop()
+        try:
+            try:
+                start = time.perf_counter()
+                resp = await download_async(url, self.config, session, self.logger)
+                metrics.observe("worker.download", time.perf_counter() - start)
+                metrics.count("worker.status", key=resp.status)
+                self.logger.info(
+                    f"Downloaded {url} [status {resp.status}] via cache {self.config.cache_server}")
+
+                # Scrape page and enqueue new links off the event loop
+                await loop.run_in_executor(None, self._process, url, resp)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                metrics.count("worker.error")
+                self.logger.error(f"Failed downloading {url}: {exc!r}")
+            except Exception as exc:
+                metrics.count("worker.error")
+                self.logger.error(f"Failed processing {url}: {exc}")
+            finally:
+                # Mark this URL as processed (also frees its in-flight slot). It
+                # takes frontier locks and writes the save file, so not on the loop.
+                await loop.run_in_executor(None, self.frontier.mark_url_complete, url)
+
+            # global throttle, per fetch slot
+            start = time.perf_counter()
+            await asyncio.sleep(self.config.time_delay)
+            metrics.observe("worker.politeness_sleep", time.perf_counter() - start)
+        finally:
+            slots.release()
+
+    def _process(self, url: str, resp):
+        page = scraper.parse_page(url, resp)
+        quality = page_quality(page)
+        self.frontier.add_urls(scraper.record_page(url, page), url, quality)
@@ -0,0 +1,90 @@
+import math
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over SHA-256 hex digests (as made by get_urlhash).
+
+    The digest is already uniformly random, so the k bit positions are derived
+    from two 64-bit slices of it with double hashing instead of rehashing."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        h1 = int(key[:16], 16)
+        h2 = int(key[16:32], 16) | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, key: str):
+        bits = self._bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+    @property
+    def fp_rate(self) -> float:
+        """Expected false-positive rate at the current fill level."""
+        k, m = self.num_hashes, self.num_bits
+        return (1 - math.exp(-k * self.count / m)) ** k
+
+
+class ScalableBloomFilter:
+    """Chain of Bloom filters that grows as the crawl finds more URLs.
+
+    Each new filter is `growth` times larger with a `tightening` times smaller
+    error rate, so the overall false-positive rate stays below
+    error_rate / (1 - tightening) no matter how far past `capacity` we go."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001,
+                 growth: int = 2, tightening: float = 0.5):
+        self.growth = growth
+        self.tightening = tightening
+        self._filters = [BloomFilter(capacity, error_rate * (1 - tightening))]
+
+    def add(self, key: str):
+        current = self._filters[-1]
+        if current.count >= current.capacity:
+            current = BloomFilter(current.capacity * self.growth,
+                                  current.error_rate * self.tightening)
+            self._filters.append(current)
+        current.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return any(key in f for f in reversed(self._filters))
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self._filters)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(f.memory_bytes for f in self._filters)
+
+    @property
+    def fp_rate(self) -> float:
+        """Expected false-positive rate of a lookup across all filters."""
+        miss = 1.0
+        for f in self._filters:
+            miss *= 1 - f.fp_rate
+        return 1 - miss
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self),
+            "filters": len(self._filters),
+            "memory_bytes": self.memory_bytes,
+            "fp_rate": self.fp_rate,
+        }
@@ -1,125 +1,490 @@
-import os
-import shelve
-import time
-from collections import deque, defaultdict
-from threading import RLock
-from urllib.parse import urlparse
-
-from utils import get_logger, get_urlhash, normalize
-from scraper import is_valid
-
-POLITENESS_DELAY = 0.5  # Wait 0.5 seconds between requests to the same domain
-
-
-class Frontier:
-    """This class controls which URLs get crawled next, making sure we don't overload servers (politeness).
-    It's also thread-safe so multiple threads can use it at once."""
-
-    def __init__(self, config, restart: bool):
-        self.logger = get_logger("FRONTIER")
-        self.config = config
-        self._lock = RLock()  # Lock to protect shared data
-
-        # Queue of normalized URLs waiting to be crawled
-        self.to_be_downloaded: deque[str] = deque()
-
-        # Keeps track of when we last accessed each domain
-        self._domain_last: defaultdict[str, float] = defaultdict(float)
-
-        # Where we save our shelve DB (keeps track of visited and unvisited URLs)
-        self._db_path = self.config.save_file
-
-        # If restarting, delete any old saved data
-        if restart and os.path.exists(self._db_path):
-            self.logger.info("Restart requested – deleting existing save file.")
-            os.remove(self._db_path)
-
-        # Open or create shelve DB
-        self._db = shelve.open(self._db_path, writeback=False)
-
-        # If we’re restarting or this is a new DB, add seed URLs
-        if restart or not self._db:
-            self.logger.info("Seeding frontier from config URLs …")
-            for seed in self.config.seed_urls:
-                self._enqueue_seed(seed)
-        else:
-            self._resume_from_save()
-
-    # --- Public method used by the worker threads ---
-
-    def get_tbd_url(self) -> str | None:
-        """Get a URL that’s ready to crawl (respecting politeness). Returns None if all done."""
-        while True:
-            with self._lock:
-                if not self.to_be_downloaded:
-                    return None
-
-                url = self.to_be_downloaded.pop()  # Use LIFO strategy
-                domain = urlparse(url).netloc
-                wait = POLITENESS_DELAY - (time.time() - self._domain_last[domain])
-
-                if wait <= 0:
-                    # We've waited long enough – update timestamp and return URL
-                    self._domain_last[domain] = time.time()
-                    return url
-
-                # Not polite yet – put the URL back
-                self.to_be_downloaded.appendleft(url)
-
-            # Let other threads do stuff while we wait
-            time.sleep(wait)
-
-    def add_url(self, url: str):
-        """Add a new URL to the frontier if it's valid and not seen before."""
-        url = normalize(url)
-        if not is_valid(url):
-            return
-
-        url_hash = get_urlhash(url)
-        with self._lock:
-            if url_hash not in self._db:
-                self._db[url_hash] = (url, False)
-                self._db.sync()
-                self.to_be_downloaded.append(url)
-
-    def mark_url_complete(self, url: str):
-        """Mark a URL as finished so we don't crawl it again."""
-        url_hash = get_urlhash(url)
-        with self._lock:
-            if url_hash in self._db:
-                self._db[url_hash] = (url, True)
-                self._db.sync()
-            else:
-                self.logger.error(f"Completed URL {url} not present in DB.")
-
-    # --- Helpers ---
-
-    def _enqueue_seed(self, url: str):
-        """Add the seed URL to the frontier when we start crawling."""
-        url = normalize(url)
-        if not is_valid(url):
-            self.logger.warning(f"Seed URL filtered by is_valid: {url}")
-            return
-        url_hash = get_urlhash(url)
-        self._db[url_hash] = (url, False)
-        self.to_be_downloaded.append(url)
-        self._db.sync()
-
-    def _resume_from_save(self):
-        """On resume, load any unfinished URLs back into the queue."""
-        total = len(self._db)
-        resumed = 0
-        for (url, completed) in self._db.values():
-            if not completed and is_valid(url):
-                self.to_be_downloaded.append(url)
-                resumed += 1
-        self.logger.info(f"Resumed {resumed} pending URLs from {total} stored.")
-
-    # --- Clean-up ---
-
-    def __del__(self):
-        """Make sure to close the shelve database when done."""
-        try:
-            self._db.close()
-        except Exception:
-            pass
+import heapq
+import itertools
+import os
+import shelve
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from threading import Condition, Lock
+from typing import Iterable
+from urllib.parse import urlparse
+
+from utils import canonical_host, get_logger, get_urlhash, normalize
+from utils.metrics import metrics
+from scraper import link_processor
+from crawler.bloom import ScalableBloomFilter
+from crawler.priority import PriorityScorer, make_scorer
+from crawler.journal import WriteBehindStore, remove_journal
+from utils.urls import Link
+
+POLITENESS_DELAY = 0.5  # Wait 0.5 seconds between requests to the same domain
+
+
+class _FrontierShard:
+    """The slice of the frontier that owns a subset of domains.
+
+    Dedup, per-domain queues and politeness bookkeeping for those domains all
+    live here behind one lock, so workers touching different shards never
+    wait on each other. A URL always maps to the same shard (by its domain),
+    which keeps the dedup check correct without a global lock.
+
+    Each domain's URLs sit in a heap ordered by the scorer's score. A domain
+    with queued URLs is either waiting out its politeness window (in
+    `waiting`, by the time it ends) or fetchable (in `ready`, by its best
+    URL's score plus its backlog penalty), so handing out the best URL of
+    the best polite domain costs O(log domains + log URLs)."""
+
+    def __init__(self, expected_urls: int, bloom_error_rate: float, scorer: PriorityScorer):
+        self.lock = Lock()
+        self.scorer = scorer
+
+        # Normalized URLs waiting to be crawled, one heap of (score, -order, url, depth, parent quality,
+        # url hash) per domain. -order makes equal scores come out newest first, like the old LIFO queues.
+        self.domain_queues: dict[str, list[tuple]] = {}
+        self._order = itertools.count()
+
+        # (next allowed fetch time, domain) for domains inside their politeness window
+        self.waiting: list[tuple[float, str]] = []
+
+        # (priority, order, domain) for domains that can be fetched now. Entries
+        # go stale when a domain's queue changes; pop_ready() skips or re-files those.
+        self.ready: list[tuple[float, int, str]] = []
+        self.ready_domains: set[str] = set()
+
+        # Keeps track of when we last accessed each domain
+        self.domain_last: defaultdict[str, float] = defaultdict(float)
+
+        # Number of queued URLs, and URLs handed out but not marked complete yet
+        # (with their depth, parent quality and hash, for their record and their links)
+        self.pending = 0
+        self.in_flight: dict[str, tuple[int, float | None, str]] = {}
+
+        # In-memory "definitely new" check in front of the save file. Only
+        # possible hits are confirmed against the DB; misses go straight in.
+        self.seen = ScalableBloomFilter(expected_urls, bloom_error_rate)
+        self.bloom_false_positives = 0
+
+        # Hashes of new URLs claimed by an add_urls() call that is saving them
+        # (without the lock) and hasn't queued them yet
+        self.saving: set[str] = set()
+
+    # --- Called with self.lock held ---
+
+    def claim(self, links: list[Link]) -> tuple[list[Link], list[Link]]:
+        """Split links into new ones, now in `seen` and `saving` for the caller
+        to save and queue, and possible duplicates the seen filter knows of
+        (links some other caller is saving right now are just dropped)."""
+        new, maybe_seen = [], []
+        for link in links:
+            if link.hash not in self.seen:
+                self.seen.add(link.hash)
+                self.saving.add(link.hash)
+                new.append(link)
+            elif link.hash not in self.saving:
+                maybe_seen.append(link)
+        return new, maybe_seen
+
+    def enqueue(self, url: str, domain: str, score: float, depth: int, quality: float | None,
+                url_hash: str) -> bool:
+        """Queue a URL under its domain. Returns True if the domain was idle."""
+        queue = self.domain_queues.get(domain)
+        scheduled = queue is None
+        if scheduled:
+            queue = self.domain_queues[domain] = []
+            ready_at = self.domain_last[domain] + POLITENESS_DELAY
+            heapq.heappush(self.waiting, (ready_at, domain))
+        heapq.heappush(queue, (score, -next(self._order), url, depth, quality, url_hash))
+        self.pending += 1
+        if domain in self.ready_domains and queue[0][2] == url:
+            # A new best URL for a domain that's already up for grabs
+            heapq.heappush(self.ready, (self._priority(queue), next(self._order), domain))
+        return scheduled
+
+    def pop_ready(self) -> tuple[str | None, float | None]:
+        """take_ready() without the locking."""
+        now = time.time()
+        # Domains whose politeness window is over become candidates
+        while self.waiting and self.waiting[0][0] <= now:
+            _, domain = heapq.heappop(self.waiting)
+            self.ready_domains.add(domain)
+            heapq.heappush(self.ready, (self._priority(self.domain_queues[domain]), next(self._order), domain))
+
+        while self.ready:
+            priority, _, domain = heapq.heappop(self.ready)
+            if domain not in self.ready_domains:
+                continue  # Already handed out since this entry was filed
+            queue = self.domain_queues[domain]
+            current = self._priority(queue)
+            if current > priority and self.ready and self.ready[0][0] < current:
+                # Got worse since it was filed (bigger backlog), and isn't the best any more
+                heapq.heappush(self.ready, (current, next(self._order), domain))
+                continue
+
+            _, _, url, depth, quality, url_hash = heapq.heappop(queue)
+            self.ready_domains.discard(domain)
+            self.pending -= 1
+            self.in_flight[url] = (depth, quality, url_hash)
+
+            self.domain_last[domain] = now
+            if queue:
+                heapq.heappush(self.waiting, (now + POLITENESS_DELAY, domain))
+            else:
+                del self.domain_queues[domain]
+            return url, None
+        return None, (self.waiting[0][0] if self.waiting else None)
+
+    def _priority(self, queue: list[tuple]) -> float:
+        return queue[0][0] + self.scorer.backlog_penalty(len(queue))
+
+    # --- Take their own lock ---
+
+    @contextmanager
+    def locked(self):
+        """self.lock, recording how long it took to get."""
+        start = time.perf_counter()
+        with self.lock:
+            metrics.observe("frontier.lock_wait", time.perf_counter() - start)
+            yield
+
+    def take_ready(self) -> tuple[str | None, float | None]:
+        """Pop the best URL from the best domain that is polite right now.
+
+        Returns (url, None) on success, otherwise (None, time the earliest
+        domain becomes ready) or (None, None) if nothing is queued."""
+        start = time.perf_counter()
+        with self.lock:
+            acquired = time.perf_counter()
+            result = self.pop_ready()
+        metrics.observe("frontier.lock_wait", acquired - start)
+        return result
+
+    def busy(self) -> bool:
+        """True while URLs are queued or still being processed."""
+        with self.lock:
+            return bool(self.in_flight or self.pending or self.saving)
+
+    def complete(self, url: str) -> tuple[bool, tuple[int, float | None, str | None]]:
+        """Release a URL's in-flight slot. Returns (whether the shard is now
+        idle, the URL's (depth, parent quality, hash))."""
+        with self.lock:
+            info = self.in_flight.pop(url, (0, None, None))
+            return not self.in_flight and not self.pending, info
+
+
+class Frontier:
+    """This class controls which URLs get crawled next, making sure we don't overload servers (politeness).
+    It's also thread-safe so multiple threads can use it at once.
+
+    Domains are partitioned by hash into SHARDS independently locked shards
+    (see _FrontierShard). Inside a shard, each domain's URLs are ordered by a
+    PriorityScorer (crawler/priority.py; PRIORITY in config.ini), and a worker
+    always gets the best URL of the best domain that is ready right now. When
+    no shard has one, the worker waits on a condition variable until the
+    earliest domain is ready or another worker adds work.
+
+    Every URL's depth (links from a seed) and the quality of the page that
+    linked to it are stored with it, so a resumed crawl keeps its order."""
+
+    def __init__(self, config, restart: bool, scorer: PriorityScorer | None = None):
+        self.logger = get_logger("FRONTIER")
+        self.config = config
+        self.scorer = scorer or make_scorer(config.priority)
+
+        # Independently locked partitions of the frontier state
+        num_shards = max(1, self.config.frontier_shards)
+        self._shards = [
+            _FrontierShard(max(1, self.config.expected_urls // num_shards), self.config.bloom_error_rate,
+                           self.scorer)
+            for _ in range(num_shards)
+        ]
+        self._next_start = itertools.count()  # Spreads workers' shard scans around
+        self._added = 0  # New URLs seen, for periodic filter stats (under _idle)
+
+        # Shard of every URL handed out and not completed yet, so finishing it
+        # (or adding its links) doesn't have to parse it for its domain
+        self._in_flight_shards: dict[str, _FrontierShard] = {}
+
+        # Idle workers park here. _generation is bumped whenever new work shows
+        # up or a shard drains, so a worker can tell it missed a wake-up.
+        self._idle = Condition(Lock())
+        self._generation = 0
+
+        # Where we save our shelve DB (keeps track of visited and unvisited URLs)
+        self._db_path = self.config.save_file
+
+        # If restarting, delete any old saved data
+        if restart and os.path.exists(self._db_path):
+            self.logger.info("Restart requested – deleting existing save file.")
+            os.remove(self._db_path)
+        if restart:
+            remove_journal(self._db_path)
+
+        # Open or create shelve DB. In journal mode writes are batched by a
+        # background flusher and any journal left by a crash is replayed here.
+        # The journal locks internally; a bare shelve needs a lock of its own.
+        self._journaled = self.config.journal
+        if self._journaled:
+            self._db = WriteBehindStore(
+                self._db_path, self.config.journal_batch, self.config.journal_interval)
+            self._db_lock = nullcontext()
+        else:
+            self._db = shelve.open(self._db_path, writeback=False)
+            self._db_lock = Lock()
+
+        # If we’re restarting or this is a new DB, add seed URLs
+        if restart or not self._db:
+            self.logger.info("Seeding frontier from config URLs …")
+            self._enqueue_seeds(self.config.seed_urls)
+        else:
+            self._resume_from_save()
+
+        # Queue depths for utils.metrics (read when the metrics are looked at)
+        metrics.gauge("frontier", self.queue_depths)
+        metrics.gauge("frontier.backlog", self.domain_backlog)
+
+    # --- Public method used by the worker threads ---
+
+    def get_tbd_url(self) -> str | None:
+        """Get a URL that’s ready to crawl (respecting politeness). Returns None if all done.
+
+        Blocks while every queued domain is still inside its politeness window,
+        or while the queue is empty but other workers may still add links."""
+        num_shards = len(self._shards)
+        start = next(self._next_start) % num_shards
+        while True:
+            generation = self._generation
+            earliest = None
+            for i in range(num_shards):
+                shard = self._shards[(start + i) % num_shards]
+                url, ready_at = shard.take_ready()
+                if url is not None:
+                    self._in_flight_shards[url] = shard
+                    return url
+                if ready_at is not None and (earliest is None or ready_at < earliest):
+                    earliest = ready_at
+
+            with self._idle:
+                if self._generation != generation:
+                    continue  # Something changed while we were scanning
+                if earliest is not None:
+                    # Nothing is polite yet – sleep until the earliest domain is
+                    with metrics.timer("frontier.politeness_wait"):
+                        self._idle.wait(max(0.0, earliest - time.time()))
+                elif any(shard.busy() for shard in self._shards):
+                    # Queue is empty but pages being processed may add links
+                    with metrics.timer("frontier.idle_wait"):
+                        self._idle.wait()
+                else:
+                    return None
+
+    def add_url(self, url: str, parent: str | None = None, quality: float | None = None):
+        """Add a new URL to the frontier if it's valid and not seen before.
+
+        parent: the URL (from get_tbd_url) of the page it was found on;
+        quality: that page's priority.page_quality(). Both feed the URL's score."""
+        self.add_urls([url], parent, quality)
+
+    def add_urls(self, urls: Iterable[str], parent: str | None = None, quality: float | None = None):
+        """add_url() for a page's whole outlink list at once.
+
+        URLs are normalized, validated, deduplicated and hashed in one pass
+        (scraper.link_processor; links returned by scraper.record_page already
+        went through it). Each shard's links are claimed under its lock, the
+        DB is read and written without it, and the saved links are queued
+        under it again: a URL is only handed out once its record is stored."""
+        start = time.perf_counter()
+        links = link_processor.process(urls)
+        if not links:
+            return
+        depth = self._depth_of(parent) + 1 if parent is not None else 0
+        by_shard: defaultdict[_FrontierShard, list[Link]] = defaultdict(list)
+        for link in links:
+            by_shard[self._shard_for(link.host)].append(link)
+
+        added = duplicates = false_positives = scheduled = 0
+        for shard, batch in by_shard.items():
+            with shard.locked():
+                new, maybe_seen = shard.claim(batch)
+            duplicates += len(batch) - len(new) - len(maybe_seen)
+
+            # Possible hits are confirmed against the DB
+            unseen = [link for link in maybe_seen if not self._stored(link.hash)]
+            duplicates += len(maybe_seen) - len(unseen)
+            if unseen:
+                with shard.locked():
+                    # Another worker may have claimed (or even stored) one since
+                    missed = [link for link in unseen
+                              if link.hash not in shard.saving and not self._stored(link.hash)]
+                    shard.saving.update(link.hash for link in missed)
+                    shard.bloom_false_positives += len(missed)
+                duplicates += len(unseen) - len(missed)
+                false_positives += len(missed)
+                new += missed
+
+            if new:
+                scheduled += self._save_and_enqueue(shard, new, depth, quality)
+                added += len(new)
+
+        metrics.observe("frontier.add_urls", time.perf_counter() - start)
+        metrics.count("frontier.added", added)
+        metrics.count("frontier.duplicate", duplicates)
+        if false_positives:
+            metrics.count("frontier.bloom_false_positive", false_positives)
+        if scheduled:
+            self._signal(everyone=scheduled > 1)
+        with self._idle:
+            before, self._added = self._added, self._added + added
+        if before // 10_000 != (before + added) // 10_000:
+            self._log_bloom_stats()
+
+    def mark_url_complete(self, url: str):
+        """Mark a URL as finished so we don't crawl it again."""
+        shard = self._in_flight_shards.pop(url, None) or self._shard_for(canonical_host(urlparse(url)))
+        idle, (depth, quality, url_hash) = shard.complete(url)
+        url_hash = url_hash or get_urlhash(url)
+        if self._stored(url_hash):
+            self._save(url_hash, (url, True, depth, quality))
+        else:
+            self.logger.error(f"Completed URL {url} not present in DB.")
+        metrics.count("frontier.completed")
+
+        if idle:
+            # This shard drained – wake everyone so they can re-check for the end
+            self._signal(everyone=True)
+
+    # --- Queue depths ---
+
+    def queue_depths(self) -> dict[str, int]:
+        """URLs queued and in flight, and domains with queued URLs."""
+        queued = in_flight = domains = 0
+        for shard in self._shards:
+            with shard.lock:
+                queued += shard.pending
+                in_flight += len(shard.in_flight)
+                domains += len(shard.domain_queues)
+        return {"queued": queued, "in_flight": in_flight, "domains": domains}
+
+    def domain_backlog(self, top: int = 10) -> dict[str, int]:
+        """Queued URLs of the `top` domains with the most."""
+        backlog = []
+        for shard in self._shards:
+            with shard.lock:
+                backlog.extend((len(queue), domain) for domain, queue in shard.domain_queues.items())
+        return {domain: n for n, domain in heapq.nlargest(top, backlog)}
+
+    # --- Helpers ---
+
+    def _shard_for(self, domain: str) -> _FrontierShard:
+        """Shard of a domain, as given by utils.canonical_host (like the URL hashes)."""
+        return self._shards[hash(domain) % len(self._shards)]
+
+    def _depth_of(self, url: str) -> int:
+        """Depth of a URL that is being processed (0 if it isn't known)."""
+        shard = self._in_flight_shards.get(url)
+        if shard is None:
+            return 0
+        with shard.lock:
+            return shard.in_flight.get(url, (0,))[0]
+
+    def _save_and_enqueue(self, shard: _FrontierShard, links: list[Link], depth: int,
+                          quality: float | None) -> int:
+        """Store the records of links claimed in a shard, then queue them there.
+        Returns how many of their domains were idle."""
+        saved = False
+        try:
+            self._save_many({link.hash: (str(link), False, depth, quality) for link in links})
+            saved = True
+        finally:
+            with shard.locked():
+                # If the save failed they're dropped; the DB check lets them in again later
+                scheduled = sum(self._enqueue(shard, link, depth, quality) for link in links) if saved else 0
+                shard.saving.difference_update(link.hash for link in links)
+        return scheduled
+
+    def _enqueue(self, shard: _FrontierShard, link: Link, depth: int, quality: float | None) -> bool:
+        """Queue a processed link in its shard (lock held). Returns True if its domain was idle."""
+        score = self.scorer.score(link.parsed, depth, quality)
+        return shard.enqueue(str(link), link.host, score, depth, quality, link.hash)
+
+    def _signal(self, everyone: bool = False):
+        """Wake idle workers after new work arrived or a shard drained."""
+        with self._idle:
+            self._generation += 1
+            if everyone:
+                self._idle.notify_all()
+            else:
+                self._idle.notify()
+
+    def _stored(self, url_hash: str) -> bool:
+        with self._db_lock:
+            return url_hash in self._db
+
+    def _save(self, url_hash: str, record: tuple):
+        """Persist one URL record."""
+        self._save_many({url_hash: record})
+
+    def _save_many(self, records: dict[str, tuple]):
+        """Persist URL records, syncing a bare shelve once for all of them (the
+        journal batches syncs for us). Never called with a shard lock held."""
+        with self._db_lock:
+            self._db.update(records)
+            if not self._journaled:
+                self._db.sync()
+
+    def _enqueue_seeds(self, urls: list[str]):
+        """Add the seed URLs to the frontier when we start crawling."""
+        links = link_processor.process(urls)
+        for url in {normalize(url) for url in urls}.difference(links):
+            self.logger.warning(f"Seed URL filtered by is_valid: {url}")
+        self._save_many({link.hash: (str(link), False, 0, None) for link in links})
+        for link in links:
+            shard = self._shard_for(link.host)
+            with shard.lock:
+                shard.seen.add(link.hash)
+                self._enqueue(shard, link, 0, None)
+
+    def _resume_from_save(self):
+        """On resume, load any unfinished URLs back into the queue.
+
+        Scores are recomputed from the stored depth and parent quality, so a
+        different PRIORITY applies to the resumed queue too. Records from
+        before priorities existed are just (url, completed): depth 0."""
+        total = 0
+        pending: dict[str, tuple[int, float | None]] = {}
+        for url_hash, (url, completed, *priority) in self._db.items():
+            total += 1
+            shard = self._shard_for(canonical_host(urlparse(url)))
+            with shard.lock:
+                shard.seen.add(url_hash)  # Rebuild the seen filter from the store
+            if not completed:
+                pending[url] = tuple(priority) if len(priority) == 2 else (0, None)
+
+        links = link_processor.process(pending)
+        for link in links:
+            depth, quality = pending.get(link, (0, None))
+            shard = self._shard_for(link.host)
+            with shard.lock:
+                self._enqueue(shard, link, depth, quality)
+        self.logger.info(f"Resumed {len(links)} pending URLs from {total} stored.")
+        self._log_bloom_stats()
+
+    def _log_bloom_stats(self):
+        """Report size and accuracy of the seen-URL filters across all shards."""
+        stats = [shard.seen.stats() for shard in self._shards]
+        keys = sum(s["keys"] for s in stats)
+        memory = sum(s["memory_bytes"] for s in stats)
+        fp_rate = max(s["fp_rate"] for s in stats)
+        false_positives = sum(shard.bloom_false_positives for shard in self._shards)
+        self.logger.info(
+            f"Seen filter: {keys:,} URLs in {len(stats)} shard(s), "
+            f"{memory / 1024:,.0f} KiB, expected FP rate {fp_rate:.4%}, "
+            f"{false_positives:,} false positives confirmed on disk")
+
+    # --- Clean-up ---
+
+    def __del__(self):
+        """Make sure to close the shelve database when done."""
+        try:
+            self._db.close()
+        except Exception:
+            pass
@@ -0,0 +1,220 @@
+import json
+import os
+import shelve
+import time
+from threading import Condition, Lock, Thread
+
+from utils import get_logger
+
+JOURNAL_SUFFIX = ".journal"
+ROTATED_SUFFIX = ".journal.old"
+
+
+def remove_journal(path: str):
+    """Delete the journal files that belong to a save file (used on --restart)."""
+    for suffix in (JOURNAL_SUFFIX, ROTATED_SUFFIX):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+class WriteBehindStore:
+    """A shelve wrapper that batches writes instead of syncing on every URL.
+
+    Each mutation goes into an in-memory buffer and is appended to a journal
+    file next to the shelve. A background thread applies the buffer to the
+    shelve in batches (every `batch_size` records or `flush_interval` seconds)
+    and only then drops the journal. If the crawler dies before a flush, the
+    journal is replayed into the shelve the next time the store is opened.
+
+    Journal appends are flushed to the OS but only fsynced when a batch is
+    handed to the shelve, so records written since the last flush survive a
+    crash of the process, not necessarily a power loss."""
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 2.0):
+        self.logger = get_logger("JOURNAL", "FRONTIER")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._journal_path = path + JOURNAL_SUFFIX
+        self._rotated_path = path + ROTATED_SUFFIX
+
+        self._db = shelve.open(path, writeback=False)
+        self._db_lock = Lock()  # shelve/dbm objects are not thread safe
+        self._flush_lock = Lock()  # only one batch is written at a time
+
+        # _journal_lock is always taken before _lock (never the other way round)
+        self._lock = Lock()  # Protects the buffers
+        self._journal_lock = Lock()  # Protects the open journal file and orders writes
+        self._flush_wanted = Condition(self._lock)
+        self._buffer: dict[str, tuple] = {}  # Records not yet handed to a flush
+        self._flushing: dict[str, tuple] = {}  # Batch currently being written
+
+        self._replay()
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+        self._closed = False
+
+        self._flusher = Thread(target=self._flush_loop, name="FrontierFlusher", daemon=True)
+        self._flusher.start()
+
+    # --- Mapping interface used by the Frontier ---
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._buffer or key in self._flushing:
+                return True
+        with self._db_lock:
+            return key in self._db
+
+    def __getitem__(self, key: str) -> tuple:
+        with self._lock:
+            if key in self._buffer:
+                return self._buffer[key]
+            if key in self._flushing:
+                return self._flushing[key]
+        with self._db_lock:
+            return self._db[key]
+
+    def __setitem__(self, key: str, value: tuple):
+        line = json.dumps([key, *value], ensure_ascii=False)
+        # The journal lock covers both the buffer update and the append, so two
+        # writes to one key reach the journal in the order the buffer saw them
+        # (replay must end on the same record). The file I/O happens outside
+        # the buffer lock so lookups don't queue behind it.
+        with self._journal_lock:
+            with self._lock:
+                self._buffer[key] = value
+                if len(self._buffer) >= self.batch_size:
+                    self._flush_wanted.notify()
+            self._journal.write(line + "\n")
+            self._journal.flush()  # Survives a process crash once it's in the OS
+
+    def update(self, records: dict[str, tuple]):
+        """__setitem__ for many records, appended to the journal in one write."""
+        lines = "".join(json.dumps([key, *value], ensure_ascii=False) + "\n" for key, value in records.items())
+        with self._journal_lock:
+            with self._lock:
+                self._buffer.update(records)
+                if len(self._buffer) >= self.batch_size:
+                    self._flush_wanted.notify()
+            self._journal.write(lines)
+            self._journal.flush()
+
+    def __len__(self) -> int:
+        with self._lock:
+            overlay = {**self._flushing, **self._buffer}
+        with self._db_lock:
+            return len(self._db) + sum(1 for key in overlay if key not in self._db)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def keys(self):
+        return (key for key, _ in self.items())
+
+    def values(self):
+        return (value for _, value in self.items())
+
+    def items(self):
+        """Snapshot of every record, buffered ones taking precedence."""
+        with self._lock:
+            overlay = {**self._flushing, **self._buffer}
+        with self._db_lock:
+            stored = [(key, self._db[key]) for key in self._db.keys() if key not in overlay]
+        return iter(stored + list(overlay.items()))
+
+    def sync(self):
+        """Write everything buffered so far to the shelve right now.
+
+        If writing a batch fails, it stays in _flushing (still readable) and
+        in the rotated journal, and the next sync retries it merged with
+        whatever was buffered since."""
+        with self._flush_lock:
+            with self._journal_lock, self._lock:
+                if not self._buffer and not self._flushing:
+                    return
+                if self._buffer:
+                    self._rotate_journal()
+                    # Newer records win over those of a batch that failed before
+                    self._flushing = {**self._flushing, **self._buffer}
+                    self._buffer = {}
+
+            with self._db_lock:
+                for key, value in self._flushing.items():
+                    self._db[key] = value
+                self._db.sync()
+
+            with self._lock:
+                self._flushing = {}
+            os.remove(self._rotated_path)
+
+    def _rotate_journal(self):
+        """Make the journal durable and move it aside, appending it to the
+        rotated journal of a failed batch if there is one (journal lock held)."""
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._journal.close()
+        if os.path.exists(self._rotated_path):
+            with open(self._journal_path, "r", encoding="utf-8") as src, \
+                    open(self._rotated_path, "a", encoding="utf-8") as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(self._journal_path)
+        else:
+            os.replace(self._journal_path, self._rotated_path)
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+
+    def close(self):
+        """Flush what's left, stop the background thread and close the shelve."""
+        if self._closed:
+            return
+        self._closed = True
+        with self._lock:
+            self._flush_wanted.notify()
+        self._flusher.join(timeout=self.flush_interval + 1)
+        self.sync()
+        with self._journal_lock:
+            self._journal.close()
+        with self._db_lock:
+            self._db.close()
+        os.remove(self._journal_path)
+
+    # --- Background flushing ---
+
+    def _flush_loop(self):
+        """Flush on a size or time limit until the store is closed."""
+        while not self._closed:
+            deadline = time.time() + self.flush_interval
+            with self._lock:
+                while len(self._buffer) < self.batch_size and not self._closed:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._flush_wanted.wait(remaining)
+            try:
+                self.sync()
+            except Exception as exc:
+                self.logger.error(f"Journal flush failed: {exc}")
+
+    # --- Crash recovery ---
+
+    def _replay(self):
+        """Apply journals left behind by an unclean shutdown to the shelve."""
+        replayed = 0
+        for path in (self._rotated_path, self._journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as fp:
+                for line in fp:
+                    try:
+                        key, *value = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line from a crash mid-write
+                    self._db[key] = tuple(value)
+                    replayed += 1
+        if replayed:
+            self._db.sync()
+            self.logger.info(f"Replayed {replayed} journaled frontier updates.")
+        for path in (self._rotated_path, self._journal_path):
+            if os.path.exists(path):
+                os.remove(path)
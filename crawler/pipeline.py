@@ -0,0 +1,130 @@
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from threading import BoundedSemaphore, Lock, Thread
+
+from crawler.worker import Worker
+from utils.download import download
+from utils import get_logger
+from utils.metrics import metrics
+from crawler.priority import page_quality
+import scraper  # scraper.py module
+
+
+class ParseStage:
+    """Process pool that parses pages for every PipelineWorker.
+
+    Fetch threads hand raw responses to `submit`. At most PARSE_QUEUE pages
+    can be waiting for or inside a parser process; past that `submit`
+    blocks, which slows the fetchers down instead of letting memory grow.
+    A collector thread takes finished parses, records the analytics, adds
+    the outlinks to the frontier and marks the page complete (so the
+    frontier doesn't report the crawl as done while pages are still being
+    parsed)."""
+
+    def __init__(self, config, frontier):
+        self.logger = get_logger("PARSE-STAGE", "Worker")
+        self.frontier = frontier
+        self._slots = BoundedSemaphore(max(1, config.parse_queue))
+        self._results: queue.Queue = queue.Queue()
+
+        processes = config.parse_processes or os.cpu_count() or 1
+        self._pool = ProcessPoolExecutor(max_workers=processes)
+        # Start the parser processes now, before the fetch threads exist
+        self._pool.submit(int).result()
+
+        self._collector = Thread(target=self._collect, name="ParseCollector", daemon=True)
+        self._collector.start()
+        self.logger.info(f"Parsing with {processes} processes, "
+                         f"at most {config.parse_queue} pages queued.")
+
+    def submit(self, url: str, resp):
+        """Queue a downloaded page for parsing (blocks while the queue is full)."""
+        with metrics.timer("pipeline.queue_full_wait"):
+            self._slots.acquire()
+        try:
+            future = self._pool.submit(scraper.parse_page, url, resp)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._results.put((url, f)))
+
+    def close(self):
+        """Stop the collector and the parser processes once everything is done."""
+        self._results.put(None)
+        self._collector.join()
+        self._pool.shutdown()
+
+    def _collect(self):
+        while True:
+            item = self._results.get()
+            if item is None:
+                return
+            url, future = item
+            try:
+                page = future.result()
+                quality = page_quality(page)
+                self.frontier.add_urls(scraper.record_page(url, page), url, quality)
+            except Exception as exc:
+                metrics.count("worker.error")
+                self.logger.error(f"Failed parsing {url}: {exc}")
+            finally:
+                # Mark this URL as processed (also frees its in-flight slot)
+                self.frontier.mark_url_complete(url)
+                self._slots.release()
+
+
+class PipelineWorker(Worker):
+    """Fetch-only worker thread that leaves parsing to a shared ParseStage.
+
+    Plugs into `Crawler` as a `worker_factory`. All PipelineWorkers of a
+    crawl share one ParseStage; it's created by the first worker and shut
+    down by the last one to finish."""
+
+    _stage: ParseStage | None = None
+    _stage_users = 0
+    _stage_lock = Lock()
+
+    def __init__(self, worker_id: int, config, frontier):
+        super().__init__(worker_id, config, frontier)
+        with PipelineWorker._stage_lock:
+            if PipelineWorker._stage is None:
+                PipelineWorker._stage = ParseStage(config, frontier)
+            PipelineWorker._stage_users += 1
+            self.stage = PipelineWorker._stage
+
+    #  Fetch loop: parsing happens in the stage
+    def run(self):
+        try:
+            while True:
+                with metrics.timer("worker.get_tbd_url"):
+                    url = self.frontier.get_tbd_url()
+                if url is None:
+                    self.logger.info("Frontier empty – shutting down thread.")
+                    break
+
+                try:
+                    with metrics.timer("worker.download"):
+                        resp = download(url, self.config, self.logger)
+                    metrics.count("worker.status", key=resp.status)
+                    self.logger.info(
+                        f"Downloaded {url} [status {resp.status}] via cache {self.config.cache_server}")
+                    self.stage.submit(url, resp)
+                except Exception as exc:
+                    metrics.count("worker.error")
+                    self.logger.error(f"Failed downloading {url}: {exc}")
+                    self.frontier.mark_url_complete(url)
+
+                # global throttle
+                with metrics.timer("worker.politeness_sleep"):
+                    time.sleep(self.config.time_delay)
+        finally:
+            self._release_stage()
+
+    def _release_stage(self):
+        with PipelineWorker._stage_lock:
+            PipelineWorker._stage_users -= 1
+            if PipelineWorker._stage_users == 0 and PipelineWorker._stage is not None:
+                PipelineWorker._stage.close()
+                PipelineWorker._stage = None
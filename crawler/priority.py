@@ -0,0 +1,101 @@
+import math
+import re
+from urllib.parse import ParseResult, parse_qsl
+
+# Runs of digits in a path: dates, page numbers, ids (calendars and archives are full of them)
+_DIGITS = re.compile(r"\d+")
+
+
+class PriorityScorer:
+    """Decides which queued URL the frontier hands out next. Lower scores go first.
+
+    The frontier asks `score` once per URL when it's added (or reloaded on
+    resume), and orders each domain's URLs by it. Among the domains that
+    are polite to fetch right now, it picks the one whose best URL plus
+    `backlog_penalty` is lowest.
+
+    This base class scores everything the same, which gives the old
+    behaviour: newest URL first within a domain (LIFO), domains in the
+    order their politeness windows end. Subclass it to plug in other rules
+    (Frontier(config, restart, scorer=...) or the PRIORITY config option)."""
+
+    def score(self, parsed: ParseResult, depth: int, parent_quality: float | None) -> float:
+        """parsed: the normalized URL; depth: links followed from a seed;
+        parent_quality: page_quality() of the page that linked here (None if unknown)."""
+        return 0.0
+
+    def backlog_penalty(self, queued: int) -> float:
+        """Added to a domain's best score when it has `queued` URLs waiting."""
+        return 0.0
+
+
+class BestFirstScorer(PriorityScorer):
+    """Spends the fetch budget on pages likely to be new, real content.
+
+    Penalizes URLs for being deep in the link graph, for query strings (each
+    parameter, and their length), for path segments that repeat (/a/b/a/b,
+    the classic relative-link trap), for long paths and digit runs, and for
+    coming from a thin page (see page_quality). Domains with a big backlog
+    are deprioritized a little (logarithmically), since a huge queue on one
+    host is usually a calendar or a generated archive, not more content."""
+
+    def __init__(self, depth_weight: float = 1.0, param_weight: float = 1.0, query_length_weight: float = 0.02,
+                 repeat_weight: float = 2.0, segment_weight: float = 0.2, digits_weight: float = 0.3,
+                 quality_weight: float = 3.0, backlog_weight: float = 0.5):
+        self.depth_weight = depth_weight
+        self.param_weight = param_weight
+        self.query_length_weight = query_length_weight
+        self.repeat_weight = repeat_weight
+        self.segment_weight = segment_weight
+        self.digits_weight = digits_weight
+        self.quality_weight = quality_weight
+        self.backlog_weight = backlog_weight
+
+    def score(self, parsed: ParseResult, depth: int, parent_quality: float | None) -> float:
+        segments = [segment for segment in parsed.path.lower().split("/") if segment]
+        repeated = len(segments) - len(set(segments))
+        params = len(parse_qsl(parsed.query, keep_blank_values=True)) if parsed.query else 0
+        quality = 0.5 if parent_quality is None else parent_quality
+        return (self.depth_weight * depth
+                + self.param_weight * params
+                + self.query_length_weight * len(parsed.query)
+                + self.repeat_weight * repeated
+                + self.segment_weight * len(segments)
+                + self.digits_weight * len(_DIGITS.findall(parsed.path))
+                + self.quality_weight * (1.0 - quality))
+
+    def backlog_penalty(self, queued: int) -> float:
+        return self.backlog_weight * math.log2(1 + queued)
+
+
+# Names for the PRIORITY config option
+SCORERS = {
+    "best-first": BestFirstScorer,
+    "lifo": PriorityScorer,
+}
+
+
+def make_scorer(name: str) -> PriorityScorer:
+    try:
+        return SCORERS[name.strip().lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown PRIORITY {name!r}, expected one of {', '.join(SCORERS)}") from None
+
+
+# Words on a page past which more text doesn't make it look more like content
+CONTENT_WORDS = 400
+# How many words one outlink "costs": link farms, indexes and calendars are mostly links
+WORDS_PER_LINK = 10
+
+
+def page_quality(page) -> float | None:
+    """How content-bearing a parsed page is, from 0 (empty or all links) to 1.
+
+    Takes a scraper.PageAnalysis (None for errors and non-HTML, which have
+    no outlinks to score anyway)."""
+    if page is None:
+        return None
+    words = page.word_count
+    if not words:
+        return 0.0
+    return min(1.0, words / CONTENT_WORDS) * words / (words + WORDS_PER_LINK * len(page.links))
@@ -4,6 +4,8 @@ from inspect import getsource
 
 from utils.download import download
 from utils import get_logger
+from utils.metrics import metrics
+from crawler.priority import page_quality
 import scraper  # scraper.py module
 
 
@@ -13,8 +15,9 @@ class Worker(Thread):
     Each Worker repeatedly:
       1. asks the Frontier for the next URL (blocking politely),
       2. downloads the page,
-      3. passes the response to `scraper.scraper`,
-      4. enqueues any returned links, and
+      3. parses and records it (`scraper.parse_page` / `scraper.record_page`,
+         what `scraper.scraper` does),
+      4. enqueues the returned links, scored with the page's quality, and
       5. marks the fetched URL complete.
     """
 
@@ -35,23 +38,31 @@ class Worker(Thread):
     #  Main fetch–process loop
     def run(self):
         while True:
-            url = self.frontier.get_tbd_url()
+            with metrics.timer("worker.get_tbd_url"):
+                url = self.frontier.get_tbd_url()
             if url is None:
                 self.logger.info("Frontier empty – shutting down thread.")
                 break
 
-            # Download through provided helper (handles cache server)
-            resp = download(url, self.config, self.logger)
-            self.logger.info(
-                f"Downloaded {url} [status {resp.status}] via cache {self.config.cache_server}")
+            try:
+                # Download through provided helper (handles cache server)
+                with metrics.timer("worker.download"):
+                    resp = download(url, self.config, self.logger)
+                metrics.count("worker.status", key=resp.status)
+                self.logger.info(
+                    f"Downloaded {url} [status {resp.status}] via cache {self.config.cache_server}")
 
-            # Scrape page and enqueue new links
-            outlinks = scraper.scraper(url, resp)
-            for link in outlinks:
-                self.frontier.add_url(link)
-
-            # Mark this URL as processed
-            self.frontier.mark_url_complete(url)
+                # Scrape page and enqueue new links
+                page = scraper.parse_page(url, resp)
+                quality = page_quality(page)
+                self.frontier.add_urls(scraper.record_page(url, page), url, quality)
+            except Exception as exc:
+                metrics.count("worker.error")
+                self.logger.error(f"Failed processing {url}: {exc}")
+            finally:
+                # Mark this URL as processed (also frees its in-flight slot)
+                self.frontier.mark_url_complete(url)
 
             # global throttle 
-            time.sleep(self.config.time_delay)
\ No newline at end of file
+            with metrics.timer("worker.politeness_sleep"):
+                time.sleep(self.config.time_delay)
\ No newline at end of file
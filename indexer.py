@@ -1,93 +1,305 @@
 import os
 import json
-import re
-from collections import defaultdict
-from nltk.stem import PorterStemmer
+import heapq
+import shutil
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from bs4 import BeautifulSoup
 
-# I use this stemmer to reduce words to their root form
-ps = PorterStemmer()
+from postings import (FIELD_TAGS, FIELDS, NO_FIELDS, LexiconEntry, encode_skips, read_run,
+                      read_manifest, rebase_postings, rebase_skips, thin_skips, write_corpus_stats,
+                      write_lexicon, write_manifest, write_run)
+from tokenizer import format_stem_stats, merge_stem_stats, stem, stem_stats, tokenize
 
-# Turns text into a list of lowercase words, removing punctuation
-def tokenize(text):
-    return re.findall(r'\b\w+\b', text.lower())
+# Partial indexes and the final merged index all live in this folder
+INDEX_DIR = "partial_indexes"
+POSTINGS_NAME = "postings.dat"  # every term's binary postings, back to back
+POSITIONS_NAME = "positions.dat"  # token positions of every posting (positional index only)
+SKIPS_NAME = "skips.dat"  # skip table of every term's postings
+LEXICON_NAME = "lexicon.dat"  # sorted term -> postings.LexiconEntry
+STATS_NAME = "stats.json"  # N, average document length, positional or not
+DOC_LENGTHS_NAME = "doc_lengths.dat"  # token count of every doc_id
+CURRENT_NAME = "current.json"  # names the generation folder holding the published files above
+GENERATION_PREFIX = "gen_"
 
-# Extracts all visible words and "important" ones from HTML tags like title, h1, etc.
-def extract_important_words(html):
+# Extracts the stemmed term frequencies of a page: one Counter for all visible
+# text, and one per field (title, headings, bold) so importance is a dict
+# lookup on the stem instead of a scan over unstemmed words. With
+# positions=True also returns where each stem occurs in the visible text.
+def extract_field_terms(html, positions=False):
     soup = BeautifulSoup(html, 'html.parser')
     text = soup.get_text()  # full visible text from HTML
-    important = []
+    field_texts = [' '.join(elem.get_text() for elem in soup.find_all(FIELD_TAGS[field]))  # grab emphasized words
+                   for field in FIELDS]
+    return analyze_text(text, field_texts, positions)
 
-    for tag in ['title', 'h1', 'h2', 'h3', 'strong', 'b']:
-        for elem in soup.find_all(tag):
-            important += tokenize(elem.get_text())  # grab emphasized words
+# Same as extract_field_terms() for a page that's already been parsed: `text`
+# is its visible text and field_texts the text of each field, in FIELDS order
+# (the crawler gets both from its own single-pass parse)
+def analyze_text(text, field_texts, positions=False):
+    stems = [stem(word) for word in tokenize(text)]
+    term_freq = Counter(stems)
 
-    return tokenize(text), important
+    term_positions = None
+    if positions:
+        term_positions = defaultdict(list)
+        for position, stemmed in enumerate(stems):
+            term_positions[stemmed].append(position)
 
-# This function walks through the downloaded data, builds index, and saves it in parts
-def index_corpus(corpus_root, partial_limit=10):
-    inverted_index = defaultdict(list)  # word → list of (doc_id, frequency, importance)
-    doc_id_map = {}  # maps doc_id → URL
-    doc_id = 0
-    partial_count = 0
+    field_freqs = [Counter(stem(word) for word in tokenize(field_text)) for field_text in field_texts]
 
-    print(f"Starting indexing in: {corpus_root}")
+    return term_freq, field_freqs, term_positions
+
+# Rough in-memory cost of the index being built, used to decide when to flush
+# a run: one (doc_id, tf, field_tfs) tuple in a list, and a dict slot plus
+# list for every new term, plus an int in a list for every position kept
+POSTING_BYTES = 100
+TERM_BYTES = 200
+POSITION_BYTES = 36
 
+# Every .json document under corpus_root, sorted so doc IDs (positions in this
+# list) come out the same on every run no matter how the work is split up
+def list_documents(corpus_root):
+    paths = []
     for root, _, files in os.walk(corpus_root):
         for file in files:
-            if not file.endswith('.json'):
-                continue
-
-            file_path = os.path.join(root, file)
-            try:
-                with open(file_path, 'r', encoding='utf8') as f:
-                    data = json.load(f)
-                    url = data.get('url')
-                    html = data.get('content', '')
-                    if not html:
-                        continue
-            except Exception as e:
-                print(f"Skipped {file_path}: {e}")
-                continue
-
-            # Get all words and the "important" ones
-            words, important_words = extract_important_words(html)
-            term_freq = defaultdict(int)
-
-            # Count term frequencies using stemming
-            for word in words:
-                stemmed = ps.stem(word)
-                term_freq[stemmed] += 1
-
-            # Add word info to the inverted index
-            for word, freq in term_freq.items():
-                importance = 2 if word in important_words else 1
-                inverted_index[word].append((doc_id, freq, importance))
-
-            doc_id_map[doc_id] = url
-            doc_id += 1
-
-            # Save partial index every N documents to reduce memory usage
-            if doc_id % partial_limit == 0:
-                print(f"Saving partial index #{partial_count}")
-                with open(f'index_partial_{partial_count}.json', 'w') as out:
-                    json.dump(inverted_index, out)
-                inverted_index = defaultdict(list)
-                partial_count += 1
+            if file.endswith('.json'):
+                paths.append(os.path.join(root, file))
+    paths.sort()
+    return paths
+
+# Reads one crawled page, returns (url, html) or None if it can't be indexed
+def load_document(file_path):
+    try:
+        with open(file_path, 'r', encoding='utf8') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"Skipped {file_path}: {e}")
+        return None
+    html = data.get('content', '')
+    if not html:
+        return None
+    return data.get('url'), html
+
+# Adds one document's postings to an in-memory index (and its positions to
+# `positions`, if given), returns roughly how many bytes that took
+def add_postings(inverted_index, positions, doc_id, term_freq, field_freqs, term_positions):
+    used = 0
+    for word, freq in term_freq.items():
+        field_tfs = tuple(counts.get(word, 0) for counts in field_freqs)
+        postings = inverted_index[word]
+        if not postings:
+            used += TERM_BYTES
+        postings.append((doc_id, freq, field_tfs if any(field_tfs) else NO_FIELDS))
+        used += POSTING_BYTES
+        if positions is not None:
+            positions[word].append(term_positions[word])
+            used += freq * POSITION_BYTES
+    return used
+
+# Indexes one contiguous slice of the document list (SPIMI style): postings go
+# into an in-memory dict until its estimated size passes memory_budget bytes,
+# then it's written out as a sorted run and a fresh one is started. Runs in
+# process pools, so it only returns the slice's doc_id -> URL and doc_id ->
+# length maps, plus the worker's pid and its (cumulative) stem cache stats.
+def index_slice(slice_no, documents, index_dir, memory_budget, positional=False):
+    inverted_index = defaultdict(list)  # word → list of (doc_id, frequency, field frequencies)
+    positions = defaultdict(list) if positional else None  # word → positions list per posting
+    doc_id_map = {}
+    doc_lengths = {}
+    run_no = 0
+    used = 0
+
+    for doc_id, file_path in documents:
+        document = load_document(file_path)
+        if document is None:
+            continue
+        url, html = document
+
+        # Stemmed term frequencies for the whole page and for each field
+        term_freq, field_freqs, term_positions = extract_field_terms(html, positional)
+
+        # Add word info to the inverted index
+        used += add_postings(inverted_index, positions, doc_id, term_freq, field_freqs, term_positions)
+
+        doc_id_map[doc_id] = url
+        doc_lengths[doc_id] = sum(term_freq.values())
+
+        # Flush a run once the in-memory index reaches its budget
+        if used >= memory_budget:
+            write_partial(inverted_index, slice_no, run_no, index_dir, positions)
+            inverted_index = defaultdict(list)
+            positions = defaultdict(list) if positional else None
+            run_no += 1
+            used = 0
 
     # Save anything that’s left after the loop
     if inverted_index:
-        print(f"Saving final partial index #{partial_count}")
-        with open(f'index_partial_{partial_count}.json', 'w') as out:
-            json.dump(inverted_index, out)
+        write_partial(inverted_index, slice_no, run_no, index_dir, positions)
+    return doc_id_map, doc_lengths, os.getpid(), stem_stats()
+
+def _index_slice_task(args):
+    return index_slice(*args)
+
+# Builds the searchable index for everything under corpus_root.
+# The sorted document list is cut into contiguous slices that a pool of
+# `processes` workers index independently (each with its own memory budget in
+# MB); the runs are then merged, in doc ID order, into the final index.
+# positions=True also stores token positions for phrase and proximity queries.
+def index_corpus(corpus_root, processes=1, memory_budget_mb=256, index_dir=INDEX_DIR, positions=False):
+    print(f"Starting indexing in: {corpus_root}")
+    documents = list(enumerate(list_documents(corpus_root)))
+
+    # Runs from an earlier build would be merged in with this one
+    os.makedirs(index_dir, exist_ok=True)
+    for name in os.listdir(index_dir):
+        if name.startswith('index_partial_'):
+            os.remove(os.path.join(index_dir, name))
+
+    # A few slices per process so one slow slice doesn't hold up the rest
+    processes = max(1, processes)
+    slice_size = max(1, -(-len(documents) // (processes * 4)))
+    tasks = [
+        (slice_no, documents[start:start + slice_size], index_dir, memory_budget_mb * 1024 * 1024, positions)
+        for slice_no, start in enumerate(range(0, len(documents), slice_size))
+    ]
+
+    doc_id_map = {}  # maps doc_id → URL
+    doc_lengths = {}  # maps doc_id → number of tokens
+    process_stats = {}  # pid -> most complete stem cache stats seen from it
+    if processes == 1:
+        results = map(_index_slice_task, tasks)
+    else:
+        pool = ProcessPoolExecutor(max_workers=processes)
+        results = pool.map(_index_slice_task, tasks)
+    for slice_map, slice_lengths, pid, stats in results:
+        doc_id_map.update(slice_map)
+        doc_lengths.update(slice_lengths)
+        previous = process_stats.get(pid)
+        if previous is None or stats['hits'] + stats['misses'] > previous['hits'] + previous['misses']:
+            process_stats[pid] = stats
+    if processes > 1:
+        pool.shutdown()
 
     # Save the mapping from document ID to URL
     with open('doc_id_map.json', 'w') as out:
-        json.dump(doc_id_map, out)
+        json.dump(dict(sorted(doc_id_map.items())), out)
 
     print("Indexing complete.")
-    print(f"Total documents indexed: {doc_id}")
+    print(f"Total documents indexed: {len(doc_id_map)}")
+    print(format_stem_stats(merge_stem_stats(process_stats.values())))
+
+    # Combine the runs into the single file search.py reads, and save the
+    # corpus statistics so search doesn't have to recompute N at startup.
+    # Both go into a new generation that only becomes visible once it's complete.
+    out_dir = new_generation(index_dir)
+    merge_partials(index_dir, out_dir)
+    write_corpus_stats(os.path.join(out_dir, STATS_NAME),
+                       os.path.join(out_dir, DOC_LENGTHS_NAME), doc_lengths, positions)
+    publish_generation(index_dir, out_dir)
+
+
+# A merged index is written into a fresh generation folder inside index_dir
+# (gen_000001, gen_000002, ...) and published by replacing current.json, which
+# names it, in one os.replace. A reader opening the index at any point gets
+# the lexicon, postings and stats of one generation, never a mix.
+def new_generation(index_dir):
+    numbers = [int(name[len(GENERATION_PREFIX):]) for name in os.listdir(index_dir)
+               if name.startswith(GENERATION_PREFIX) and name[len(GENERATION_PREFIX):].isdigit()]
+    path = os.path.join(index_dir, f'{GENERATION_PREFIX}{max(numbers, default=0) + 1:06d}')
+    os.makedirs(path)
+    return path
+
+def publish_generation(index_dir, generation_dir):
+    current = os.path.join(index_dir, CURRENT_NAME)
+    previous = read_manifest(current)['files'] if os.path.exists(current) else None
+    name = os.path.basename(generation_dir)
+    write_manifest(current, {'files': name})
+    # A reader may still be opening the generation just replaced; older ones
+    # (and any left unpublished by a crashed build) are no longer reachable
+    for other in os.listdir(index_dir):
+        if other.startswith(GENERATION_PREFIX) and other not in (name, previous):
+            shutil.rmtree(os.path.join(index_dir, other), ignore_errors=True)
+
+
+# Each partial is a binary run sorted by term (format in postings.py), named by
+# its slice and run number, so the merge can stream through all of them at once
+def partial_path(slice_no, run_no, index_dir=INDEX_DIR):
+    return os.path.join(index_dir, f'index_partial_{slice_no}_{run_no}.bin')
+
+def write_partial(inverted_index, slice_no, run_no, index_dir=INDEX_DIR, positions=None):
+    write_run(partial_path(slice_no, run_no, index_dir), inverted_index, positions)
+
+def read_partial(path, run_order):
+    for record in read_run(path):
+        yield record.term, run_order, record
+
+# K-way merge of all sorted partials into the final index files (postings,
+# positions, skip tables) plus a lexicon, written to out_dir (by default
+# index_dir itself, only safe while nothing is reading it; see new_generation).
+# After this, looking a term up is one lexicon lookup into the mapped file.
+def merge_partials(index_dir=INDEX_DIR, out_dir=None):
+    partial_files = sorted(
+        (tuple(int(n) for n in name[len('index_partial_'):-len('.bin')].split('_')),
+         os.path.join(index_dir, name))
+        for name in os.listdir(index_dir)
+        if name.startswith('index_partial_') and name.endswith('.bin')
+    )
+    streams = [read_partial(path, run_order) for run_order, path in partial_files]
+    terms = write_merged(streams, out_dir or index_dir)
+
+    print(f"Merged {len(partial_files)} partial indexes: {terms} terms.")
+
+# Writes the index files for `streams` of (term, run order, RunRecord), each
+# sorted by term, into index_dir and returns the number of terms. index_dir
+# must be a folder no reader has open yet (a new generation or segment):
+# the files only become searchable together, when the caller publishes it.
+# Runs ordered by run order hold increasing doc IDs, so a term's postings stay
+# sorted by doc ID when the lists are concatenated in that order - only the first doc-id gap
+# of each later piece needs re-encoding, the rest of its bytes are copied as is,
+# and its skip entries just move by where the piece lands.
+def write_merged(streams, index_dir):
+    lexicon = {}
+    current_term, current_last_doc = None, 0
+    entry = skips = None
+
+    paths = [os.path.join(index_dir, name) for name in (POSTINGS_NAME, POSITIONS_NAME, SKIPS_NAME)]
+    with open(paths[0], 'wb') as out, open(paths[1], 'wb') as pos_out, open(paths[2], 'wb') as skip_out:
+
+        def finish_term():
+            kept = thin_skips(skips, entry[2])
+            entry[5] = skip_out.tell()
+            entry[6] = len(kept)
+            skip_out.write(encode_skips(kept))
+            lexicon[current_term] = LexiconEntry(*entry)
+
+        for term, _, record in heapq.merge(*streams, key=lambda item: (item[0], item[1])):
+            data = record.data
+            if term != current_term:
+                if current_term is not None:
+                    finish_term()
+                current_term = term
+                # offset, length, df, max tf, field max, skips offset/count, positions offset/length
+                entry = [out.tell(), 0, 0, 0, (0,) * len(FIELDS), 0, 0, pos_out.tell(), 0]
+                skips = list(record.skips)
+            else:
+                data = rebase_postings(data, current_last_doc)
+                skips += rebase_skips(record.skips, current_last_doc, entry[2], entry[1], entry[8],
+                                      len(data) - len(record.data))
+            out.write(data)
+            pos_out.write(record.positions)
+            entry[1] += len(data)
+            entry[2] += record.df
+            entry[3] = max(entry[3], record.max_tf)
+            entry[4] = tuple(max(a, b) for a, b in zip(entry[4], record.field_max))
+            entry[8] += len(record.positions)
+            current_last_doc = record.last_doc
+        if current_term is not None:
+            finish_term()
+
+    write_lexicon(os.path.join(index_dir, LEXICON_NAME), lexicon)
+    return len(lexicon)
 
 # Run the indexer on the developer dataset directory
 if __name__ == '__main__':
-    index_corpus('/home/ralkhlee/ics_data')
+    index_corpus('/home/ralkhlee/ics_data', processes=os.cpu_count() or 1, positions=True)
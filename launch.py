@@ -6,13 +6,28 @@ import signal
 from configparser import ConfigParser
 from argparse import ArgumentParser
 
-from utils.server_registration import get_cache_server
 from utils.config import Config
 from crawler import Crawler
 
 
-def main(config_file: str, restart: bool):
-    """Read config, register with cache server, and start crawler."""
+def _worker_factory(kind: str):
+    """Pick the Worker class for --worker (imported lazily: async needs aiohttp)."""
+    if kind == "async":
+        from crawler.async_worker import AsyncWorker
+        return AsyncWorker
+    if kind == "pipeline":
+        from crawler.pipeline import PipelineWorker
+        return PipelineWorker
+    from crawler.worker import Worker
+    return Worker
+
+
+def main(config_file: str, restart: bool, worker: str = "thread", cache_server: str | None = None):
+    """Read config, register with cache server, and start crawler.
+
+    cache_server ("host:port") skips registration and downloads from that
+    server directly, e.g. a local one from utils/local_cache_server.py.
+    """
 
     # 1) load configuration
     cparser = ConfigParser()
@@ -20,10 +35,15 @@ def main(config_file: str, restart: bool):
     config = Config(cparser)
 
     # 2) obtain cache‑server endpoint (handles registration)
-    config.cache_server = get_cache_server(config, restart)
+    if cache_server:
+        host, _, port = cache_server.rpartition(":")
+        config.cache_server = (host, int(port))
+    else:
+        from utils.server_registration import get_cache_server  # needs spacetime
+        config.cache_server = get_cache_server(config, restart)
 
     # 3) spin up crawler instance
-    crawler = Crawler(config, restart)
+    crawler = Crawler(config, restart, worker_factory=_worker_factory(worker))
 
     # 4) graceful shutdown on Ctrl‑C so atexit hooks execute
     def _sigint_handler(sig, frame):
@@ -54,5 +74,21 @@ if __name__ == "__main__":
         default="config.ini",
         help="Path to config.ini",
     )
+    cli.add_argument(
+        "--worker",
+        choices=("thread", "async", "pipeline"),
+        default="thread",
+        help="thread: one blocking download per thread; "
+             "async: ASYNC_CONCURRENCY pooled downloads per thread; "
+             "pipeline: threads only download, a process pool parses",
+    )
+    cli.add_argument(
+        "--cache_server",
+        type=str,
+        default=None,
+        metavar="HOST:PORT",
+        help="Skip registration and use this cache server "
+             "(e.g. python -m utils.local_cache_server)",
+    )
     opts = cli.parse_args()
-    main(opts.config_file, opts.restart)
+    main(opts.config_file, opts.restart, opts.worker, opts.cache_server)
@@ -0,0 +1,570 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import NamedTuple
+
+# Binary postings format shared by indexer.py and search.py.
+#
+# A term's postings list is a run of (doc_id, tf, field_tfs) entries sorted by
+# doc_id. tf counts the term in the whole visible text; field_tfs holds its
+# count inside each of FIELDS, in that order. Each entry is stored as
+# variable-byte integers: the gap from the previous doc_id (the first one is
+# the gap from 0), tf, a bitmask of the fields the term appears in, then one
+# count per set bit. Most postings never show up in a heading, so a typical
+# one is 3 bytes instead of ~15 characters of JSON.
+#
+# Every SKIP_INTERVAL postings a skip entry records where that block starts
+# (see PostingsCursor.seek), and an optional positions file holds each
+# posting's token positions, delta-encoded, in the same order as the postings.
+
+# Postings per skip block: smaller blocks skip more precisely, bigger ones keep
+# the skip table small
+SKIP_INTERVAL = 64
+
+# Parts of a page that get their own term frequency (bold covers <b> and <strong>)
+FIELDS = ('title', 'h1', 'h2', 'h3', 'bold')
+NO_FIELDS = (0,) * len(FIELDS)
+
+# HTML tags that make up each field in FIELDS
+FIELD_TAGS = {
+    'title': ['title'],
+    'h1': ['h1'],
+    'h2': ['h2'],
+    'h3': ['h3'],
+    'bold': ['strong', 'b'],
+}
+
+
+class RunRecord(NamedTuple):
+    term: str
+    df: int
+    last_doc: int
+    max_tf: int
+    field_max: tuple
+    data: bytes  # encoded postings
+    positions: bytes  # encoded positions, empty without a positional index
+    skips: list  # (doc_id before block, first index, data offset, positions offset)
+
+
+# Maps a whole file read-only; returns None for an empty file (mmap can't map those)
+def map_file(path):
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# Appends n to `out` as a variable-byte integer: 7 bits per byte, high bit set
+# on every byte except the last
+def encode_varint(n, out):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+# Reads one variable-byte integer from buf at pos, returns (value, next pos)
+def decode_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+# Encodes a doc_id-sorted postings list and, optionally, the token positions
+# of each posting (sorted lists, as many as its tf). Returns (postings bytes,
+# positions bytes, skips) where every skip is (doc_id before the block, index of
+# the block's first posting, its offset in the postings bytes, its offset in
+# the positions bytes).
+def encode_term(postings, positions=None):
+    out = bytearray()
+    pos_out = bytearray()
+    skips = []
+    prev = 0
+    for i, (doc_id, tf, field_tfs) in enumerate(postings):
+        if i % SKIP_INTERVAL == 0:
+            skips.append((prev, i, len(out), len(pos_out)))
+        encode_varint(doc_id - prev, out)
+        encode_varint(tf, out)
+        mask = 0
+        for bit, field_tf in enumerate(field_tfs):
+            if field_tf:
+                mask |= 1 << bit
+        encode_varint(mask, out)
+        for field_tf in field_tfs:
+            if field_tf:
+                encode_varint(field_tf, out)
+        if positions is not None:
+            last = 0
+            for position in positions[i]:
+                encode_varint(position - last, pos_out)
+                last = position
+        prev = doc_id
+    return bytes(out), bytes(pos_out), skips
+
+def encode_postings(postings):
+    return encode_term(postings)[0]
+
+# Lazily decodes `count` postings starting at `offset` of buf (bytes, memoryview
+# or an mmap) - nothing is copied out of the buffer. Almost every value fits in
+# one byte, so that case is decoded inline instead of calling decode_varint.
+def iter_postings(buf, offset, count):
+    pos = offset
+    doc_id = 0
+    for _ in range(count):
+        gap = buf[pos]
+        if gap < 0x80:
+            pos += 1
+        else:
+            gap, pos = decode_varint(buf, pos)
+        tf = buf[pos]
+        if tf < 0x80:
+            pos += 1
+        else:
+            tf, pos = decode_varint(buf, pos)
+        mask = buf[pos]  # len(FIELDS) < 7, so always one byte
+        pos += 1
+        doc_id += gap
+        if not mask:
+            yield doc_id, tf, NO_FIELDS
+            continue
+        field_tfs = []
+        for bit in range(len(FIELDS)):
+            if mask & (1 << bit):
+                field_tf, pos = decode_varint(buf, pos)
+                field_tfs.append(field_tf)
+            else:
+                field_tfs.append(0)
+        yield doc_id, tf, tuple(field_tfs)
+
+# Postings lists written for doc IDs that continue after `prev_last_doc` need
+# their first gap re-based; the rest of the bytes can be copied as they are
+def rebase_postings(data, prev_last_doc):
+    first_doc, pos = decode_varint(data, 0)
+    out = bytearray()
+    encode_varint(first_doc - prev_last_doc, out)
+    out += data[pos:]
+    return bytes(out)
+
+# Drops skip entries that would start a block less than SKIP_INTERVAL postings
+# after the previous one (every merged piece brings its own first entry), and
+# the whole table for lists too short to skip through
+def thin_skips(skips, df):
+    if df <= SKIP_INTERVAL:
+        return []
+    kept = []
+    for skip in skips:
+        if not kept or skip[1] - kept[-1][1] >= SKIP_INTERVAL:
+            kept.append(skip)
+    return kept
+
+# Moves a run piece's skips to where the piece lands in the merged list: it
+# starts `index_base` postings, `data_base` postings bytes and `pos_base`
+# positions bytes in, after `prev_last_doc`, and re-basing its first gap grew
+# its postings bytes by `shift`
+def rebase_skips(skips, prev_last_doc, index_base, data_base, pos_base, shift):
+    rebased = []
+    for base_doc, index, data_off, pos_off in skips:
+        if index == 0:
+            rebased.append((prev_last_doc, index_base, data_base, pos_base))
+        else:
+            rebased.append((base_doc, index_base + index, data_base + data_off + shift, pos_base + pos_off))
+    return rebased
+
+
+# --- Skip tables and cursors ---
+#
+# skips.dat holds each term's skip entries back to back as fixed-width
+# (doc_id before the block, index of its first posting, postings byte offset,
+# positions byte offset) records, offsets relative to the term's own lists.
+
+SKIP_ENTRY = struct.Struct('<IIII')
+
+def encode_skips(skips):
+    return b''.join(SKIP_ENTRY.pack(*skip) for skip in skips)
+
+
+class _SkipBases:
+    # The "doc_id before the block" column of a term's skip table, for bisect
+
+    def __init__(self, buf, offset, count):
+        self._buf = buf
+        self._offset = offset
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        return SKIP_ENTRY.unpack_from(self._buf, self._offset + i * SKIP_ENTRY.size)[0]
+
+    def entry(self, i):
+        return SKIP_ENTRY.unpack_from(self._buf, self._offset + i * SKIP_ENTRY.size)
+
+
+class PostingsCursor:
+    # Walks one term's postings in the mapped files without decoding them all.
+    # doc_id / tf / field_tfs describe the current posting (doc_id is None once
+    # the list is exhausted). seek() uses the skip table to jump whole blocks,
+    # and positions() decodes the current posting's token positions only when
+    # asked (the bytes of postings passed over are skipped, not decoded).
+
+    def __init__(self, buf, entry, skips_buf=None, positions_buf=None):
+        self._buf = buf
+        self._offset = entry.offset
+        self.df = entry.df
+        self._skips = None
+        if skips_buf is not None and entry.skip_count > 1:
+            self._skips = _SkipBases(skips_buf, entry.skip_offset, entry.skip_count)
+        self._positions_buf = positions_buf if entry.positions_length else None
+        self._positions_start = entry.positions_offset
+
+        self._pos = entry.offset  # next posting's byte offset
+        self._prev = 0  # doc_id before the next posting
+        self._index = -1  # index of the current posting
+        self._pos_ptr = entry.positions_offset  # positions bytes not yet passed over...
+        self._pos_pending = 0  # ...minus this many values still to skip
+        self._positions_taken = True
+        self._positions = None  # current posting's positions once decoded
+        self.doc_id = None
+        self.tf = 0
+        self.field_tfs = NO_FIELDS
+        self.advance()
+
+    def advance(self):
+        if not self._positions_taken:
+            self._pos_pending += self.tf
+        self._positions_taken = False
+        self._positions = None
+        self._index += 1
+        if self._index >= self.df:
+            self.doc_id = None
+            return
+        buf = self._buf
+        pos = self._pos
+        gap, pos = decode_varint(buf, pos)
+        tf, pos = decode_varint(buf, pos)
+        mask = buf[pos]
+        pos += 1
+        if mask:
+            field_tfs = []
+            for bit in range(len(FIELDS)):
+                if mask & (1 << bit):
+                    field_tf, pos = decode_varint(buf, pos)
+                    field_tfs.append(field_tf)
+                else:
+                    field_tfs.append(0)
+            self.field_tfs = tuple(field_tfs)
+        else:
+            self.field_tfs = NO_FIELDS
+        self._pos = pos
+        self._prev = self.doc_id = self._prev + gap
+        self.tf = tf
+
+    # Moves to the first posting with doc_id >= target
+    def seek(self, target):
+        if self.doc_id is None or self.doc_id >= target:
+            return
+        if self._skips is not None:
+            # Last block that starts after a doc_id < target
+            block = bisect_left(self._skips, target) - 1
+            base_doc, index, data_off, pos_off = self._skips.entry(block)
+            if index > self._index + 1:
+                self._pos = self._offset + data_off
+                self._prev = base_doc
+                self._index = index - 1
+                self._pos_ptr = self._positions_start + pos_off
+                self._pos_pending = 0
+                self._positions_taken = True
+                self.advance()
+        while self.doc_id is not None and self.doc_id < target:
+            self.advance()
+
+    # Sorted token positions of the current posting (needs a positional index)
+    def positions(self):
+        if self._positions is not None:
+            return self._positions
+        if self._positions_buf is None:
+            raise ValueError("index was built without positions")
+        buf = self._positions_buf
+        pos = self._pos_ptr
+        for _ in range(self._pos_pending):
+            while buf[pos] & 0x80:
+                pos += 1
+            pos += 1
+        positions = []
+        position = 0
+        for _ in range(self.tf):
+            delta, pos = decode_varint(buf, pos)
+            position += delta
+            positions.append(position)
+        self._pos_ptr = pos
+        self._pos_pending = 0
+        self._positions_taken = True
+        self._positions = positions
+        return positions
+
+
+# --- Sorted run files (partial indexes) ---
+#
+# One record per term, in term order:
+#   varint len(term) | term (utf-8) | varint df | varint last doc_id |
+#   varint max tf | varint max tf per field | varint len(data) | data |
+#   varint len(positions) | positions | varint skip count | 4 varints per skip
+#
+# The max tfs let search.py bound what a term can add to any document's score.
+
+# Largest tf and largest tf in each field over a postings list
+def max_tfs(postings):
+    max_tf = 0
+    field_max = [0] * len(FIELDS)
+    for _, tf, field_tfs in postings:
+        if tf > max_tf:
+            max_tf = tf
+        if field_tfs is not NO_FIELDS:
+            for i, field_tf in enumerate(field_tfs):
+                if field_tf > field_max[i]:
+                    field_max[i] = field_tf
+    return max_tf, tuple(field_max)
+
+# Encodes an in-memory index (term -> doc_id-sorted postings) as RunRecords in
+# term order. `positions`, if given, maps each term to one positions list per posting
+def run_records(inverted_index, positions=None):
+    for term in sorted(inverted_index):
+        postings = inverted_index[term]
+        data, pos_data, skips = encode_term(postings, positions[term] if positions else None)
+        max_tf, field_max = max_tfs(postings)
+        yield RunRecord(term, len(postings), postings[-1][0], max_tf, field_max, data, pos_data, skips)
+
+def write_run(path, inverted_index, positions=None):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as out:
+        for run in run_records(inverted_index, positions):
+            term_bytes = run.term.encode('utf8')
+            record = bytearray()
+            encode_varint(len(term_bytes), record)
+            record += term_bytes
+            encode_varint(run.df, record)
+            encode_varint(run.last_doc, record)
+            encode_varint(run.max_tf, record)
+            for field_tf in run.field_max:
+                encode_varint(field_tf, record)
+            encode_varint(len(run.data), record)
+            record += run.data
+            encode_varint(len(run.positions), record)
+            record += run.positions
+            encode_varint(len(run.skips), record)
+            for skip in run.skips:
+                for value in skip:
+                    encode_varint(value, record)
+            out.write(record)
+
+# Streams RunRecords back out of a run file
+def read_run(path):
+    with open(path, 'rb') as f:
+        buf = f.read()
+    pos = 0
+    while pos < len(buf):
+        length, pos = decode_varint(buf, pos)
+        term = buf[pos:pos + length].decode('utf8')
+        pos += length
+        df, pos = decode_varint(buf, pos)
+        last_doc, pos = decode_varint(buf, pos)
+        max_tf, pos = decode_varint(buf, pos)
+        field_max = []
+        for _ in FIELDS:
+            field_tf, pos = decode_varint(buf, pos)
+            field_max.append(field_tf)
+        length, pos = decode_varint(buf, pos)
+        data = buf[pos:pos + length]
+        pos += length
+        length, pos = decode_varint(buf, pos)
+        pos_data = buf[pos:pos + length]
+        pos += length
+        count, pos = decode_varint(buf, pos)
+        skips = []
+        for _ in range(count):
+            skip = []
+            for _ in range(4):
+                value, pos = decode_varint(buf, pos)
+                skip.append(value)
+            skips.append(tuple(skip))
+        yield RunRecord(term, df, last_doc, max_tf, tuple(field_max), data, pos_data, skips)
+
+
+# --- Lexicon file ---
+#
+# Sorted, fixed-width index of every term so search.py can map the file and
+# binary-search it instead of parsing a JSON dict of every term at startup:
+#   uint64 count | count x uint64 record offset | records
+# where each record is
+#   uint16 len(term) | term (utf-8) | uint64 postings offset | uint32 postings length |
+#   uint32 df | uint32 max tf | uint32 max tf per field | uint64 skips offset |
+#   uint32 skip count | uint64 positions offset | uint64 positions length
+# Terms are sorted by code point, which is also the order of their utf-8 bytes.
+
+_COUNT = struct.Struct('<Q')
+_TERM_LENGTH = struct.Struct('<H')
+_LEXICON_VALUES = struct.Struct('<QIII' + 'I' * len(FIELDS) + 'QIQQ')
+
+
+class LexiconEntry(NamedTuple):
+    offset: int
+    length: int
+    df: int
+    max_tf: int
+    field_max: tuple
+    skip_offset: int = 0
+    skip_count: int = 0
+    positions_offset: int = 0
+    positions_length: int = 0
+
+
+# entries: term -> LexiconEntry
+def write_lexicon(path, entries):
+    terms = sorted(entries)
+    records = bytearray()
+    offsets = array('Q')
+    start = _COUNT.size * (len(terms) + 1)
+    for term in terms:
+        entry = entries[term]
+        term_bytes = term.encode('utf8')
+        offsets.append(start + len(records))
+        records += _TERM_LENGTH.pack(len(term_bytes))
+        records += term_bytes
+        records += _LEXICON_VALUES.pack(
+            entry.offset, entry.length, entry.df, entry.max_tf, *entry.field_max,
+            entry.skip_offset, entry.skip_count, entry.positions_offset, entry.positions_length)
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    with open(path + '.tmp', 'wb') as out:
+        out.write(_COUNT.pack(len(terms)))
+        out.write(offsets.tobytes())
+        out.write(records)
+    os.replace(path + '.tmp', path)  # Never truncate a file a reader may have mapped
+
+
+class Lexicon:
+    # Read-only view of a lexicon file. Opening it only maps the file; a lookup
+    # is a binary search that touches about log2(terms) records.
+
+    def __init__(self, path):
+        self._buf = map_file(path) or _COUNT.pack(0)
+        self._count = _COUNT.unpack_from(self._buf, 0)[0]
+        self._terms = _SortedTerms(self)
+
+    def __len__(self):
+        return self._count
+
+    # The term's LexiconEntry, or None
+    def get(self, term):
+        term_bytes = term.encode('utf8')
+        i = bisect_left(self._terms, term_bytes)
+        if i == self._count or self._term_at(i) != term_bytes:
+            return None
+        return self._values_at(i)
+
+    def __contains__(self, term):
+        return self.get(term) is not None
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._term_at(i).decode('utf8')
+
+    def items(self):
+        for i in range(self._count):
+            yield self._term_at(i).decode('utf8'), self._values_at(i)
+
+    def close(self):
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+
+    def _record(self, i):
+        return _COUNT.unpack_from(self._buf, _COUNT.size * (i + 1))[0]
+
+    def _term_at(self, i):
+        pos = self._record(i)
+        length = _TERM_LENGTH.unpack_from(self._buf, pos)[0]
+        pos += _TERM_LENGTH.size
+        return self._buf[pos:pos + length]
+
+    def _values_at(self, i):
+        pos = self._record(i)
+        pos += _TERM_LENGTH.size + _TERM_LENGTH.unpack_from(self._buf, pos)[0]
+        values = _LEXICON_VALUES.unpack_from(self._buf, pos)
+        n = len(FIELDS)
+        return LexiconEntry(*values[:4], values[4:4 + n], *values[4 + n:])
+
+
+class _SortedTerms:
+    # Sequence of a Lexicon's terms as bytes, so bisect can search it in place
+
+    def __init__(self, lexicon):
+        self._lexicon = lexicon
+
+    def __len__(self):
+        return self._lexicon._count
+
+    def __getitem__(self, i):
+        return self._lexicon._term_at(i)
+
+
+# --- Corpus statistics ---
+#
+# stats.json holds the corpus-wide numbers (N for idf, total and average
+# document length, whether positions were indexed); doc_lengths.dat is a native uint32 array with the token
+# count of every doc_id (0 for IDs that were skipped), mapped by search.py.
+
+def write_corpus_stats(stats_path, lengths_path, doc_lengths, positional=False):
+    lengths = array('I', [0]) * ((max(doc_lengths) + 1) if doc_lengths else 0)
+    for doc_id, length in doc_lengths.items():
+        lengths[doc_id] = length
+    with open(lengths_path + '.tmp', 'wb') as out:
+        out.write(lengths.tobytes())
+    os.replace(lengths_path + '.tmp', lengths_path)
+
+    total = sum(doc_lengths.values())
+    stats = {
+        'documents': len(doc_lengths),
+        'total_length': total,
+        'average_length': total / len(doc_lengths) if doc_lengths else 0.0,
+        'positional': positional,  # whether positions.dat has token positions
+    }
+    # Written last: readers treat a new stats file as "the index was rebuilt"
+    with open(stats_path + '.tmp', 'w', encoding='utf8') as out:
+        json.dump(stats, out)
+    os.replace(stats_path + '.tmp', stats_path)
+    return stats
+
+def read_corpus_stats(stats_path, lengths_path):
+    with open(stats_path, 'r', encoding='utf8') as f:
+        stats = json.load(f)
+    lengths = map_file(lengths_path)
+    lengths = memoryview(lengths if lengths is not None else array('I')).cast('B').cast('I')
+    return stats, lengths
+
+
+# --- Segment manifest ---
+#
+# A live index (segments.IndexWriter) is a folder of immutable segments, each
+# laid out like a merged index over a contiguous range of doc IDs. The
+# manifest lists the current ones in doc ID order:
+#   {"created": ..., "next_doc_id": ..., "next_segment": ...,
+#    "segments": [{"name": ..., "first_doc": ..., "documents": ..., "level": ...}]}
+# Replacing it is what publishes a flush or a merge, so it's swapped in atomically.
+
+def write_manifest(path, manifest):
+    with open(path + '.tmp', 'w', encoding='utf8') as out:
+        json.dump(manifest, out)
+    os.replace(path + '.tmp', path)
+
+def read_manifest(path):
+    with open(path, 'r', encoding='utf8') as f:
+        return json.load(f)
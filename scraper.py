@@ -1,9 +1,20 @@
 import atexit
+import codecs
 import os
 import re
-from collections import Counter, defaultdict
-from urllib.parse import urldefrag, urljoin, urlparse
-from bs4 import BeautifulSoup
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import NamedTuple
+from urllib.parse import ParseResult, urldefrag, urljoin, urlparse
+from lxml import etree
+
+from postings import FIELD_TAGS, FIELDS
+from utils.analytics import CrawlAnalytics
+from utils.metrics import metrics
+from utils.simhash import SimHashIndex, simhash
+from utils.traps import TrapDetector
+from utils.urls import LinkProcessor
 
 # Set of domains we are allowed to crawl (our scope)
 ASSIGNMENT_DOMAINS = {
@@ -16,17 +27,23 @@ ASSIGNMENT_DOMAINS = {
 # Special case for today.uci.edu — we only allow certain paths
 TODAY_PATH_PREFIX = "/department/information_computer_sciences"
 
-# Store all the URLs we've seen so we don’t crawl duplicates
-unique_urls: set[str] = set()
+# Report statistics: unique pages, longest page, top words (bounded sketch) and
+# pages per subdomain. Each worker thread accumulates its own share; they are
+# merged when the report is written.
+analytics = CrawlAnalytics(word_capacity=5000)
 
-# Maps each URL to the number of non-stop words on its page
-page_word_counts: dict[str, int] = {}
+# SimHash fingerprints of every page so far, for near-duplicate detection
+near_duplicates = SimHashIndex(max_distance=3)
 
-# Stores total word frequency across all crawled pages
-word_frequencies: Counter[str] = Counter()
+# URL families (path patterns) that keep producing near-duplicates get pruned
+traps = TrapDetector(min_pages=20, max_dup_ratio=0.5)
 
-# Counts how many pages we visited per subdomain
-subdomain_counts: defaultdict[str, int] = defaultdict(int)
+# Pages with fewer words than this are too short for a meaningful fingerprint
+MIN_FINGERPRINT_WORDS = 20
+
+# Live search index the crawled pages go into (a segments.IndexWriter), set by
+# the crawler when config.ini names an INDEX folder. None = don't index.
+index_writer = None
 
 # Load the stopwords once (words we want to ignore)
 _STOPWORDS_PATH = os.path.join(os.path.dirname(__file__), "stopwords.txt")
@@ -41,14 +58,71 @@ os.makedirs("Logs", exist_ok=True)
 
 # --- MAIN SCRAPER FUNCTION ---
 
+class PageAnalysis(NamedTuple):
+    """Everything we pull out of one HTML page (small enough to send between processes)."""
+    links: list[str]  # Absolute, defragmented outlinks (not filtered yet)
+    word_counts: Counter  # Non-stop-word token -> count on this page
+    word_count: int  # Total number of non-stop-word tokens
+    fingerprint: int  # SimHash of word_counts
+    index_terms: tuple | None = None  # Stemmed terms for index_writer (IndexWriter.analyze)
+    parse_seconds: float = 0.0  # Time parse_page took (recorded by record_page, see utils/metrics.py)
+
+
 def scraper(url: str, resp):
     """Called by the crawler. This processes the response and returns links to follow."""
-    if resp.status == 200 and _is_html(resp):
-        _process_page(url, resp)  # Update analytics
+    return record_page(url, parse_page(url, resp))
+
+
+def parse_page(url: str, resp) -> PageAnalysis | None:
+    """The CPU-heavy part: parse the page into links and word counts.
+
+    The HTML is parsed once, as a stream (see _PageCollector), and both the
+    outlinks and the word counts come out of that single pass. Touches no
+    shared state, so it can run in a parser process (see crawler/pipeline.py).
+    Returns None for errors and non-HTML responses."""
+    if resp.status != 200 or not _is_html(resp):
+        return None
+
+    start = time.perf_counter()
+    page = _parse_html(url, resp, fields=index_writer is not None)
+    if page is None:
+        return PageAnalysis([], Counter(), 0, 0, parse_seconds=time.perf_counter() - start)
 
     # Extract new URLs to crawl
-    links = extract_next_links(url, resp)
-    return [link for link in links if is_valid(link)]
+    links = _absolute_links(resp.url, page.hrefs)
+    text = page.text()
+    word_counts = _count_words(text)
+    # Stemming for the index happens here too, so it's spread over the parser processes
+    index_terms = index_writer.analyze(text, page.field_texts()) if index_writer is not None else None
+    return PageAnalysis(links, word_counts, sum(word_counts.values()), simhash(word_counts), index_terms,
+                        time.perf_counter() - start)
+
+
+def record_page(url: str, page: PageAnalysis | None) -> list[str]:
+    """Update the analytics with a parsed page and return the links worth following.
+
+    Near-duplicates of a page we already crawled still count in the report,
+    but their outlinks are not followed."""
+    if page is None:
+        return []
+    metrics.observe("scraper.parse", page.parse_seconds)
+    new_page = _process_page(url, page)  # Update analytics
+    if not new_page:
+        metrics.count("scraper.repeat_page")
+
+    near_dup = (page.word_count >= MIN_FINGERPRINT_WORDS
+                and near_duplicates.check_and_add(page.fingerprint))
+    if traps.record(url, near_dup):
+        metrics.count("scraper.trap")
+        print(f"🪤 trap pattern detected, pruning: {urlparse(url).hostname}{urlparse(url).path}")
+    if near_dup:
+        metrics.count("scraper.near_duplicate")
+        return []
+    # Searchable within seconds; near-duplicates would only crowd the results
+    if new_page and index_writer is not None and page.index_terms is not None:
+        index_writer.add_document(urldefrag(url)[0], *page.index_terms)
+    # Valid, deduplicated and already parsed and hashed for the frontier
+    return link_processor.process(page.links)
 
 
 # --- EXTRACT LINKS FROM A PAGE ---
@@ -58,23 +132,127 @@ def extract_next_links(url: str, resp):
     if resp.status != 200 or not _is_html(resp):
         return []
 
+    page = _parse_html(url, resp)
+    return _absolute_links(resp.url, page.hrefs) if page else []
+
+
+def _absolute_links(base_url: str, hrefs: list[str]) -> list[str]:
     outlinks: list[str] = []
+    base_url, _ = urldefrag(base_url)
+    for href in hrefs:
+        href = href.strip()
+        if not href or href[:11].lower() == "javascript:":
+            continue
+        try:
+            # Drop the fragment (#section) before joining: the first "#" always
+            # starts it, so this saves parsing the joined URL a second time
+            abs_url = urljoin(base_url, href.partition("#")[0])
+            outlinks.append(abs_url)
+        except ValueError:
+            continue
+    return outlinks
+
+
+# --- SINGLE-PASS HTML PARSING ---
+
+# Text inside these tags is not visible on the page (BeautifulSoup's get_text skips it too)
+_INVISIBLE_TAGS = {"script", "style", "template"}
+
+# Bytes handed to lxml per feed() call: bounds the copy taken out of the
+# response's memoryview while lxml parses as it goes
+PARSE_CHUNK = 64 * 1024
+
+# Used when the Content-Type header names no charset; lxml would otherwise fall
+# back to Latin-1 for pages without a <meta charset>
+DEFAULT_CHARSET = "utf-8"
+
+_CHARSET_RE = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+
+# Tag -> index of its field in postings.FIELDS (title, headings, bold)
+_FIELD_OF_TAG = {tag: i for i, field in enumerate(FIELDS) for tag in FIELD_TAGS[field]}
+
+
+class _PageCollector:
+    """lxml parser target that collects links and visible text in one streaming pass.
+
+    lxml calls start/end/data as it reads the HTML, so no DOM tree is ever
+    built. A space is added at every tag boundary so words from neighbouring
+    elements don't run together (like get_text(separator=" ")). With
+    fields=True the text inside title, heading and bold tags is also kept
+    per field, for the search index."""
+
+    def __init__(self, fields: bool = False):
+        self.hrefs: list[str] = []
+        self._chunks: list[str] = []
+        self._hidden = 0  # Depth inside script/style/...
+        self._fields = fields
+        self._field_chunks: list[list[str]] = [[] for _ in FIELDS]
+        self._field_depth = [0] * len(FIELDS)  # Depth inside each field's tags
+        self._open_fields: list[int] = []  # Fields the current text belongs to
+
+    def start(self, tag, attrib):
+        if tag in _INVISIBLE_TAGS:
+            self._hidden += 1
+        elif tag == "a":
+            href = attrib.get("href")
+            if href:
+                self.hrefs.append(href)
+        elif self._fields and tag in _FIELD_OF_TAG:
+            self._enter_field(_FIELD_OF_TAG[tag], 1)
+        self._chunks.append(" ")
+
+    def end(self, tag):
+        if tag in _INVISIBLE_TAGS and self._hidden:
+            self._hidden -= 1
+        elif self._fields and tag in _FIELD_OF_TAG and self._field_depth[_FIELD_OF_TAG[tag]]:
+            self._enter_field(_FIELD_OF_TAG[tag], -1)
+        self._chunks.append(" ")
+
+    def data(self, text):
+        if not self._hidden:
+            self._chunks.append(text)
+            for field in self._open_fields:
+                self._field_chunks[field].append(text)
+
+    def _enter_field(self, field: int, step: int):
+        self._field_depth[field] += step
+        self._open_fields = [i for i, depth in enumerate(self._field_depth) if depth]
+        self._field_chunks[field].append(" ")
+
+    def close(self):
+        return self
+
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def field_texts(self) -> list[str]:
+        """Text of each field in postings.FIELDS order (empty unless fields=True)."""
+        return ["".join(chunks) for chunks in self._field_chunks]
+
+
+def _charset(resp) -> str:
+    """Charset from the Content-Type header, or DEFAULT_CHARSET if it names none (or an unknown one)."""
+    match = _CHARSET_RE.search(resp.headers.get("Content-Type", ""))
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return DEFAULT_CHARSET
+
+
+def _parse_html(url: str, resp, fields: bool = False) -> _PageCollector | None:
+    """Stream the response body through lxml once. Returns None if it can't be parsed."""
+    collector = _PageCollector(fields)
     try:
-        soup = BeautifulSoup(resp.raw_response.content, "lxml")
-        for tag in soup.find_all("a", href=True):
-            href = tag["href"].strip()
-            if not href or href.lower().startswith("javascript:"):
-                continue
-            try:
-                abs_url = urljoin(resp.url, href)
-                abs_url, _ = urldefrag(abs_url)  # Remove fragment like #section
-                outlinks.append(abs_url)
-            except ValueError:
-                continue
+        parser = etree.HTMLParser(target=collector, encoding=_charset(resp))
+        content = resp.content
+        for start in range(0, len(content), PARSE_CHUNK):
+            parser.feed(content[start:start + PARSE_CHUNK].tobytes())
+        return parser.close()
     except Exception as exc:
-        print(f"⚠️ extract_next_links error on {url}: {exc}")
-
-    return outlinks
+        print(f"⚠️ parse error on {url}: {exc}")
+        return None
 
 
 # --- FILTER OUT BAD/INVALID URLS ---
@@ -82,84 +260,109 @@ def extract_next_links(url: str, resp):
 def is_valid(url: str) -> bool:
     """Returns True if this URL is safe and in scope to crawl."""
     try:
-        parsed = urlparse(url)
+        return is_valid_parsed(urlparse(url))
+    except Exception as exc:
+        print(f"⚠️ is_valid error on {url}: {exc}")
+        return False
 
-        # Only crawl HTTP or HTTPS
-        if parsed.scheme not in {"http", "https"}:
-            return False
 
-        # Ignore tracking links with very long queries
-        if len(parsed.query) > 50:
-            return False
+def is_valid_parsed(parsed: ParseResult) -> bool:
+    """is_valid() for an already parsed URL."""
+    # Only crawl HTTP or HTTPS
+    if parsed.scheme not in {"http", "https"}:
+        return False
 
-        # Skip media and binary files
-        if _is_binary_resource(parsed.path):
-            return False
+    # Ignore tracking links with very long queries
+    if len(parsed.query) > 50:
+        return False
 
-        # Only allow URLs in our UCI domains
-        host = parsed.hostname.lower() if parsed.hostname else ""
-        if host.endswith("uci.edu"):
-            if host == "today.uci.edu":
-                return parsed.path.startswith(TODAY_PATH_PREFIX)
-            return any(host.endswith(domain) for domain in ASSIGNMENT_DOMAINS)
+    # Only allow URLs in our UCI domains
+    in_scope = _host_scope(parsed.hostname or "")
+    if in_scope is None:
+        in_scope = parsed.path.startswith(TODAY_PATH_PREFIX)
+    if not in_scope:
+        return False
 
+    # Skip media and binary files
+    if _is_binary_resource(parsed.path):
         return False
-    except Exception as exc:
-        print(f"⚠️ is_valid error on {url}: {exc}")
+
+    # Skip URL families that turned out to be traps (mostly near-duplicate pages)
+    return not traps.is_trap(parsed)
+
+
+@lru_cache(maxsize=100_000)
+def _host_scope(host: str) -> bool | None:
+    """Whether a (lowercase) host is in scope, decided once per host.
+
+    None for today.uci.edu, where it depends on the path."""
+    if not host.endswith("uci.edu"):
         return False
+    if host == "today.uci.edu":
+        return None
+    return any(host.endswith(domain) for domain in ASSIGNMENT_DOMAINS)
+
+
+# Outlinks of a page -> valid, deduplicated Links (see utils/urls.py)
+link_processor = LinkProcessor(is_valid_parsed)
 
 
 # --- CHECK IF RESPONSE IS HTML ---
 
 def _is_html(resp) -> bool:
-    content_type = resp.raw_response.headers.get("Content-Type", "").lower()
+    """Decided from the headers alone; the body isn't looked at."""
+    content_type = resp.headers.get("Content-Type", "").lower()
     return "html" in content_type
 
 
 # --- ANALYTICS AND TRACKING FOR EACH PAGE ---
 
-def _process_page(url: str, resp):
-    """Collects data like word counts, unique pages, and subdomains."""
-    url, _ = urldefrag(url)
-    if url in unique_urls:
-        return
+_WORD_RE = re.compile(r"[A-Za-z]+")
 
-    try:
-        html = resp.raw_response.content.decode("utf-8", errors="replace")
-        soup = BeautifulSoup(html, "lxml")
-        text = soup.get_text(separator=" ")
-        tokens = re.findall(r"[A-Za-z]+", text.lower())
-        clean_tokens = [t for t in tokens if t not in STOPWORDS]
 
-        unique_urls.add(url)
-        page_word_counts[url] = len(clean_tokens)
-        word_frequencies.update(clean_tokens)
+def _count_words(text: str) -> Counter:
+    """Counts the non-stop words in the visible text of the page."""
+    tokens = _WORD_RE.findall(text.lower())
+    return Counter(t for t in tokens if t not in STOPWORDS)
+
 
+def _process_page(url: str, page: PageAnalysis) -> bool:
+    """Collects data like word counts, unique pages, and subdomains.
+
+    Returns True if this is the first time the page was counted."""
+    url, _ = urldefrag(url)
+    try:
         host = urlparse(url).hostname or ""
-        if host.endswith("uci.edu"):
-            subdomain_counts[host] += 1
+        subdomain = host if host.endswith("uci.edu") else None
+        total = analytics.add_page(url, page.word_count, page.word_counts, subdomain)
+        if total is None:
+            return False  # Already counted
 
-        print(f"✅ {len(unique_urls):,} pages | {url} ({len(clean_tokens)} words)")
+        print(f"✅ {total:,} pages | {url} ({page.word_count} words)")
+        return True
 
     except Exception as exc:
         print(f"⚠️ _process_page error on {url}: {exc}")
+        return False
 
 
 # --- ON EXIT, WRITE ANALYTICS TO REPORT.TXT ---
 
-def _write_report():
+def _write_report(stats: dict | None = None):
     os.makedirs("Logs", exist_ok=True)
     report_path = os.path.join("Logs", "report.txt")
 
-    longest_url = max(page_word_counts, key=page_word_counts.get, default="")
-    longest_len = page_word_counts.get(longest_url, 0)
-    top50 = word_frequencies.most_common(50)
-    sub_list = sorted(subdomain_counts.items())
+    if stats is None:
+        stats = analytics.snapshot()
+    longest_url = stats["longest_url"]
+    longest_len = stats["longest_words"]
+    top50 = stats["top_words"]
+    sub_list = sorted(stats["subdomains"].items())
 
     with open(report_path, "w", encoding="utf-8") as fp:
         fp.write("ICS Web Crawler – Assignment 2 Report\n")
         fp.write("=" * 60 + "\n\n")
-        fp.write(f"1) Unique pages count: {len(unique_urls):,}\n\n")
+        fp.write(f"1) Unique pages count: {stats['unique_pages']:,}\n\n")
         fp.write(f"2) Longest page by word-count:\n   {longest_url}\n   {longest_len:,} words\n\n")
         fp.write("3) 50 most common words (after stop-word removal):\n")
         for word, freq in top50:
@@ -176,10 +379,17 @@ def _write_report():
 atexit.register(_write_report)
 
 
+def write_report_from_snapshot(snapshot_path: str):
+    """Rebuild Logs/report.txt from an analytics checkpoint, without crawling."""
+    restored = CrawlAnalytics(word_capacity=analytics.word_capacity)
+    restored.load(snapshot_path)
+    _write_report(restored.snapshot())
+
+
 # --- HELPER: Check if path looks like a file (e.g., .pdf, .zip) ---
 
 _BINARY_EXTENSIONS = re.compile(
-    r".*\.(css|js|bmp|gif|jpe?g|ico|png|tiff?|mid|mp2|mp3|mp4|wav|avi|mov|"
+    r"\.(css|js|bmp|gif|jpe?g|ico|png|tiff?|mid|mp2|mp3|mp4|wav|avi|mov|"
     r"mpeg|ram|m4v|mkv|ogg|ogv|pdf|ps|eps|tex|pptx?|docx?|xlsx?|names|data|"
     r"dat|exe|bz2|tar|msi|bin|7z|psd|dmg|iso|epub|dll|cnf|tgz|sha1|thmx|mso|"
     r"arff|rtf|jar|csv|rm|smil|wmv|swf|wma|zip|rar|gz)(/|$)",
@@ -188,4 +398,11 @@ _BINARY_EXTENSIONS = re.compile(
 
 def _is_binary_resource(path: str) -> bool:
     """Returns True if the file has a binary or media extension."""
-    return bool(_BINARY_EXTENSIONS.match(path))
+    return _BINARY_EXTENSIONS.search(path) is not None
+
+
+# Usage: python scraper.py <analytics snapshot>  -> rewrites Logs/report.txt
+if __name__ == "__main__":
+    import sys
+    atexit.unregister(_write_report)  # Don't overwrite it with this process's empty stats
+    write_report_from_snapshot(sys.argv[1] if len(sys.argv) > 1 else os.path.join("Logs", "analytics.snapshot"))
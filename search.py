@@ -1,95 +1,598 @@
 import json
 import os
-import re
+import heapq
 import math
-from nltk.stem import PorterStemmer
+import re
+import sys
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import NamedTuple
 
-# I use PorterStemmer to reduce words to their base/root form (e.g., "running" becomes "run")
-ps = PorterStemmer()
+from postings import (FIELDS, NO_FIELDS, Lexicon, PostingsCursor, iter_postings, map_file,
+                      read_corpus_stats, read_manifest)
+from tokenizer import format_stem_stats, stem_stats, stemmed_tokens
 
 # This is the folder where all my saved index files live
 INDEX_DIR = "partial_indexes"
+POSTINGS_NAME = "postings.dat"  # merged postings written by indexer.merge_partials
+POSITIONS_NAME = "positions.dat"  # token positions (only filled in a positional index)
+SKIPS_NAME = "skips.dat"  # skip table of every term's postings
+LEXICON_NAME = "lexicon.dat"  # sorted term -> postings.LexiconEntry
+STATS_NAME = "stats.json"  # N, average document length, positional or not
+DOC_LENGTHS_NAME = "doc_lengths.dat"  # token count of every doc_id
+SEGMENTS_NAME = "segments.json"  # manifest of a live index written by segments.IndexWriter
+DOC_ID_MAP_NAME = "doc_id_map.json"  # doc_id -> URL inside each live segment
+CURRENT_NAME = "current.json"  # names the generation folder of a merged index (see indexer.py)
 
-# This function breaks text into lowercase words, removing punctuation
-def tokenize(text):
-    return re.findall(r'\b\w+\b', text.lower())
+# How much more an occurrence in each field counts than one in the body text.
+# A posting's weighted tf is tf + sum((weight - 1) * field tf), so a weight of
+# 1 ignores the field. Override per query with tfidf_ranking(field_weights=...).
+DEFAULT_FIELD_WEIGHTS = {'title': 3.0, 'h1': 2.5, 'h2': 2.0, 'h3': 1.5, 'bold': 1.5}
 
-# This function finds where a term appears (which docs it's in and extra info like tf and importance)
-def find_postings(term):
-    postings = []  # list of (doc_id, tf, importance)
-    doc_ids = set()  # set of document IDs where the term appears
-    for file in os.listdir(INDEX_DIR):
-        if file.startswith("index_partial_") and file.endswith(".json"):
+# With a positional index, a document whose query terms sit right next to each
+# other scores up to (1 + PROXIMITY_WEIGHT) times its tf-idf score. Only the
+# best RERANK_DEPTH documents by tf-idf are re-ranked this way.
+PROXIMITY_WEIGHT = 1.0
+RERANK_DEPTH = 100
+
+
+class IndexReader:
+    # One merged index directory, mapped read-only. Nothing is parsed up front:
+    # a term lookup is a binary search in the lexicon and reading its postings
+    # is decoding bytes the OS pages in on demand, so startup time doesn't grow
+    # with the index.
+
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+        files = published_dir(index_dir)
+        self.lexicon = Lexicon(os.path.join(files, LEXICON_NAME))
+        self.postings = map_file(os.path.join(files, POSTINGS_NAME)) or b''
+        self.positions = _map_optional(os.path.join(files, POSITIONS_NAME))
+        self.skips = _map_optional(os.path.join(files, SKIPS_NAME))
+        self.stats, self.doc_lengths = read_corpus_stats(
+            os.path.join(files, STATS_NAME), os.path.join(files, DOC_LENGTHS_NAME))
+
+    @property
+    def positional(self):
+        return bool(self.stats.get('positional')) and self.positions is not None
+
+    # A PostingsCursor (skips and positions included) for a lexicon entry
+    def cursor(self, entry):
+        return PostingsCursor(self.postings, entry, self.skips, self.positions)
+
+
+# Folder holding a merged index's files: the generation current.json names, or
+# index_dir itself (segments, and indexes built before generations)
+def published_dir(index_dir):
+    try:
+        return os.path.join(index_dir, read_manifest(os.path.join(index_dir, CURRENT_NAME))['files'])
+    except FileNotFoundError:
+        return index_dir
+
+def _map_optional(path):
+    return map_file(path) if os.path.exists(path) else None
+
+
+# --- Live (segmented) indexes ---
+
+class _Segment:
+    # One segment listed in a live index's manifest
+    def __init__(self, index_dir, info, created):
+        self.name = info['name']
+        self.key = (created, self.name)  # never reused for other contents
+        self.first_doc = info['first_doc']
+        self.end_doc = info['first_doc'] + info['documents']
+        self.reader = IndexReader(os.path.join(index_dir, self.name))
+        self._doc_id_map = None
+
+    def url(self, doc_id):
+        if self._doc_id_map is None:
+            with open(os.path.join(self.reader.index_dir, DOC_ID_MAP_NAME), 'r', encoding='utf8') as f:
+                self._doc_id_map = json.load(f)
+        return self._doc_id_map.get(str(doc_id))
+
+
+# What SegmentSet's lexicon returns: df and the score bounds summed up over
+# all segments, plus the (segment, LexiconEntry) of every segment with the term
+class SegmentedEntry(NamedTuple):
+    df: int
+    max_tf: int
+    field_max: tuple
+    parts: list
+
+
+class SegmentSet:
+    # A live index written by segments.IndexWriter, searched as if it were one
+    # IndexReader: the same lexicon.get() / cursor() / stats interface, so
+    # top_k() and search_query() work on it unchanged. Segments are immutable,
+    # so passing the previous SegmentSet reuses the mapped segments it already has.
+
+    def __init__(self, index_dir, previous=None):
+        self.index_dir = index_dir
+        self.manifest_path = os.path.join(index_dir, SEGMENTS_NAME)
+        reuse = {segment.key: segment for segment in previous.segments} if previous else {}
+        for attempt in range(3):
+            manifest = read_manifest(self.manifest_path)
             try:
-                with open(os.path.join(INDEX_DIR, file), 'r') as f:
-                    part = json.load(f)
-                    if term in part:
-                        postings.extend(part[term])
-                        for doc_id, _, _ in part[term]:
-                            doc_ids.add(doc_id)
-            except:
-                # If a file can't be read, just skip it
-                continue
-    return postings, doc_ids
-
-# This function ranks documents using TF-IDF scoring based on the query terms
-def tfidf_ranking(query_terms, total_docs):
+                self.segments = [
+                    reuse.get((manifest['created'], info['name'])) or _Segment(index_dir, info, manifest['created'])
+                    for info in manifest['segments']
+                ]
+                break
+            except FileNotFoundError:
+                # Merged away between reading the manifest and opening it
+                if attempt == 2:
+                    raise
+        self._first_docs = [segment.first_doc for segment in self.segments]
+        self.lexicon = _SegmentedLexicon(self.segments)
+        self.doc_lengths = _SegmentedLengths(self)
+
+        total = sum(segment.reader.stats['total_length'] for segment in self.segments)
+        documents = sum(segment.reader.stats['documents'] for segment in self.segments)
+        self.stats = {
+            'documents': documents,
+            'total_length': total,
+            'average_length': total / documents if documents else 0.0,
+            'positional': bool(self.segments) and all(segment.reader.positional for segment in self.segments),
+            'segments': len(self.segments),
+        }
+
+    @property
+    def positional(self):
+        return self.stats['positional']
+
+    # One cursor over the term in every segment. `open_part(segment, entry)`
+    # opens the cursor of one segment (default: its mapped files).
+    def cursor(self, entry, open_part=None):
+        if open_part is None:
+            open_part = lambda segment, part: segment.reader.cursor(part)
+        cursors = [(segment.end_doc, open_part(segment, part)) for segment, part in entry.parts]
+        return cursors[0][1] if len(cursors) == 1 else ChainCursor(cursors)
+
+    def segment_of(self, doc_id):
+        i = bisect_right(self._first_docs, doc_id) - 1
+        if i < 0 or doc_id >= self.segments[i].end_doc:
+            return None
+        return self.segments[i]
+
+    def url(self, doc_id):
+        segment = self.segment_of(doc_id)
+        return segment.url(doc_id) if segment else None
+
+
+class _SegmentedLexicon:
+    def __init__(self, segments):
+        self._segments = segments
+
+    def get(self, term):
+        parts = []
+        for segment in self._segments:
+            entry = segment.reader.lexicon.get(term)
+            if entry is not None:
+                parts.append((segment, entry))
+        if not parts:
+            return None
+        return SegmentedEntry(
+            sum(entry.df for _, entry in parts),
+            max(entry.max_tf for _, entry in parts),
+            tuple(map(max, *(entry.field_max for _, entry in parts))) if len(parts) > 1 else parts[0][1].field_max,
+            parts)
+
+    def __contains__(self, term):
+        return any(term in segment.reader.lexicon for segment in self._segments)
+
+
+class _SegmentedLengths:
+    # doc_id -> token count across segments (each segment stores its own range)
+    def __init__(self, segment_set):
+        self._segment_set = segment_set
+
+    def __len__(self):
+        segments = self._segment_set.segments
+        return segments[-1].end_doc if segments else 0
+
+    def __getitem__(self, doc_id):
+        segment = self._segment_set.segment_of(doc_id)
+        return segment.reader.doc_lengths[doc_id - segment.first_doc] if segment else 0
+
+
+class ChainCursor:
+    # Cursor interface over one term's cursors in consecutive segments, given
+    # as (end doc_id of the segment, cursor) in doc_id order
+
+    def __init__(self, cursors):
+        self._cursors = cursors
+        self._i = 0
+        self.df = sum(cursor.df for _, cursor in cursors)
+        self._settle()
+
+    def advance(self):
+        self._cursors[self._i][1].advance()
+        self._settle()
+
+    def seek(self, target):
+        if self.doc_id is None or self.doc_id >= target:
+            return
+        # Segments that end before the target are passed over without a look
+        while self._i < len(self._cursors) - 1 and self._cursors[self._i][0] <= target:
+            self._i += 1
+        self._cursors[self._i][1].seek(target)
+        self._settle()
+
+    def positions(self):
+        return self._cursors[self._i][1].positions()
+
+    # Moves past exhausted cursors and copies the current posting up
+    def _settle(self):
+        cursor = self._cursors[self._i][1]
+        while cursor.doc_id is None and self._i < len(self._cursors) - 1:
+            self._i += 1
+            cursor = self._cursors[self._i][1]
+        self.doc_id = cursor.doc_id
+        self.tf = cursor.tf
+        self.field_tfs = cursor.field_tfs
+
+
+# A merged index (indexer.py) or a live one (segments.py), whichever index_dir holds
+def open_index_dir(index_dir, previous=None):
+    if os.path.exists(os.path.join(index_dir, SEGMENTS_NAME)):
+        return SegmentSet(index_dir, previous if isinstance(previous, SegmentSet) else None)
+    return IndexReader(index_dir)
+
+# The file that changes whenever the index in index_dir does
+def version_path(index_dir):
+    for name in (SEGMENTS_NAME, CURRENT_NAME):
+        manifest = os.path.join(index_dir, name)
+        if os.path.exists(manifest):
+            return manifest
+    return os.path.join(index_dir, STATS_NAME)
+
+
+# The index this module searches, opened on first use
+_reader = None
+
+def open_reader():
+    global _reader
+    if _reader is None:
+        _reader = open_index_dir(INDEX_DIR)
+    return _reader
+
+# The lexicon and the mapped postings file
+def open_index():
+    reader = open_reader()
+    return reader.lexicon, reader.postings
+
+# Reads one term's postings as a lazy (doc_id, tf, field_tfs) iterator that
+# decodes straight from the mapped file (or files, one per live segment)
+def read_postings(term):
+    reader = open_reader()
+    entry = reader.lexicon.get(term)
+    if entry is None:
+        return iter(())
+    if isinstance(entry, SegmentedEntry):
+        return (posting for segment, part in entry.parts
+                for posting in iter_postings(segment.reader.postings, part.offset, part.df))
+    return iter_postings(reader.postings, entry.offset, entry.df)
+
+# This function finds where a term appears (which docs it's in and extra info
+# like tf and field counts), and in how many documents (df, from the lexicon)
+def find_postings(term):
+    entry = open_reader().lexicon.get(term)
+    if entry is None:
+        return [], 0
+    return list(read_postings(term)), entry.df  # list of (doc_id, tf, field_tfs), df
+
+# Turns a {field: weight} dict into the per-field boosts (weight - 1) in FIELDS order
+def field_boosts(field_weights=None):
+    weights = {**DEFAULT_FIELD_WEIGHTS, **(field_weights or {})}
+    unknown = set(weights) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(weights.get(field, 1.0) - 1.0 for field in FIELDS)
+
+# This function ranks documents using TF-IDF scoring based on the query terms.
+# Occurrences in the title, headings and bold text are boosted by field_weights.
+# It scores every posting, so it's kept as the reference that top_k() must agree with.
+def tfidf_ranking(query_terms, total_docs, field_weights=None):
+    boosts = field_boosts(field_weights)
     scores = {}
     for term in query_terms:
-        postings, doc_ids = find_postings(term)
-        df = len(doc_ids)  # document frequency: how many docs contain this term
+        postings, df = find_postings(term)  # df: how many docs contain this term
         if df == 0:
             continue
         idf = math.log(total_docs / (1 + df))  # inverse document frequency
-        for doc_id, tf, importance in postings:
-            # TF-IDF formula with a weight multiplier
-            score = tf * idf * importance
+        for doc_id, tf, field_tfs in postings:
+            # TF-IDF formula with field-weighted term frequency
+            weighted_tf = tf + sum(boost * field_tf for boost, field_tf in zip(boosts, field_tfs))
+            score = weighted_tf * idf
             scores[doc_id] = scores.get(doc_id, 0) + score
     return sorted(scores.items(), key=lambda x: x[1], reverse=True)
 
-# This counts how many unique documents we have in all the index files
+
+class ListCursor:
+    # PostingsCursor interface over an already decoded postings list (used for
+    # cached postings; there are no positions)
+
+    def __init__(self, postings, doc_ids):
+        self._postings = postings
+        self._doc_ids = doc_ids
+        self._index = -1
+        self.df = len(postings)
+        self.doc_id = None
+        self.tf = 0
+        self.field_tfs = NO_FIELDS
+        self.advance()
+
+    def advance(self):
+        self._move(self._index + 1)
+
+    def seek(self, target):
+        if self.doc_id is not None and self.doc_id < target:
+            self._move(bisect_left(self._doc_ids, target, self._index + 1))
+
+    def _move(self, index):
+        self._index = index
+        if index >= len(self._postings):
+            self.doc_id = None
+        else:
+            self.doc_id, self.tf, self.field_tfs = self._postings[index]
+
+
+# One query term being walked by top_k()
+class _QueryTerm:
+    def __init__(self, cursor, weight, boosts, upper_bound):
+        self.cursor = cursor
+        self.weight = weight  # idf times how often the term is in the query
+        self.boosts = boosts
+        self.upper_bound = upper_bound  # most this term can add to any document
+
+    # What the term adds to the score of the document its cursor is on
+    def score(self):
+        cursor = self.cursor
+        if cursor.field_tfs is NO_FIELDS:
+            return cursor.tf * self.weight
+        weighted_tf = cursor.tf + sum(boost * field_tf for boost, field_tf in zip(self.boosts, cursor.field_tfs))
+        return weighted_tf * self.weight
+
+def _query_terms(query_terms, total_docs, field_weights, lexicon, open_cursor):
+    boosts = field_boosts(field_weights)
+    positive_boosts = [max(0.0, boost) for boost in boosts]
+    terms = []
+    for term, count in Counter(query_terms).items():
+        entry = lexicon.get(term)
+        if entry is None:
+            continue
+        weight = math.log(total_docs / (1 + entry.df)) * count
+        max_weighted_tf = entry.max_tf + sum(b * f for b, f in zip(positive_boosts, entry.field_max))
+        # A term with idf <= 0 never raises a score
+        upper_bound = max(0.0, weight * max_weighted_tf)
+        terms.append(_QueryTerm(open_cursor(term, entry), weight, boosts, upper_bound))
+    return terms
+
+# Same scores as tfidf_ranking(), but only the k best, evaluated one document at
+# a time with MaxScore pruning. Terms are sorted by the most they can add to a
+# score (idf times the largest field-weighted tf, kept in the lexicon). Once the
+# heap holds k documents, the low-bound terms that together can't beat the k-th
+# score become "non-essential": only documents found in the other terms get
+# scored, and their non-essential terms are only looked up (a skip-table seek)
+# while the document can still make it into the top k.
+# `lexicon` and `open_cursor(term, entry)` default to this module's mapped
+# index; the query server passes its own to put a postings cache in between.
+def top_k(query_terms, total_docs, k=10, field_weights=None, lexicon=None, open_cursor=None):
+    if k < 1:
+        return []
+    if lexicon is None:
+        reader = open_reader()
+        lexicon = reader.lexicon
+        open_cursor = lambda term, entry: reader.cursor(entry)
+    terms = _query_terms(query_terms, total_docs, field_weights, lexicon, open_cursor)
+    terms.sort(key=lambda term: term.upper_bound)
+
+    # bound_upto[i] = the most terms 0..i can add together
+    bound_upto = []
+    total = 0.0
+    for term in terms:
+        total += term.upper_bound
+        bound_upto.append(total)
+
+    heap = []  # (score, -doc_id) of the best k so far; heap[0] is the k-th best
+    threshold = -math.inf
+    first_essential = 0
+    while True:
+        while first_essential < len(terms) and bound_upto[first_essential] <= threshold:
+            first_essential += 1
+        essential = [term for term in terms[first_essential:] if term.cursor.doc_id is not None]
+        if not essential:
+            break
+
+        doc_id = min(term.cursor.doc_id for term in essential)
+        score = 0.0
+        for term in essential:
+            if term.cursor.doc_id == doc_id:
+                score += term.score()
+                term.cursor.advance()
+
+        # Non-essential terms, biggest first, while the document still has a chance
+        for i in range(first_essential - 1, -1, -1):
+            if score + bound_upto[i] <= threshold:
+                break
+            term = terms[i]
+            term.cursor.seek(doc_id)
+            if term.cursor.doc_id == doc_id:
+                score += term.score()
+
+        if len(heap) < k:
+            heapq.heappush(heap, (score, -doc_id))
+        elif score > threshold:
+            heapq.heapreplace(heap, (score, -doc_id))
+        else:
+            continue
+        if len(heap) == k:
+            threshold = heap[0][0]
+
+    return [(-neg_doc_id, score) for score, neg_doc_id in sorted(heap, reverse=True)]
+
+# --- Phrase and proximity queries (need an index built with positions=True) ---
+
+# Splits a query into its stemmed terms and its "quoted phrases" (each a list
+# of stemmed terms; single-word quotes are just terms)
+def parse_query(query):
+    phrases = [tokens for tokens in map(stemmed_tokens, re.findall(r'"([^"]*)"', query)) if len(tokens) > 1]
+    return stemmed_tokens(query), phrases
+
+# Yields (doc_id, occurrences) for every document containing the phrase.
+# Cursors leapfrog: each one seeks (through its skip table) to the largest
+# doc_id any of them is on, and positions are only decoded once all agree.
+def phrase_matches(phrase, reader):
+    cursors = {}
+    for term in phrase:
+        if term not in cursors:
+            entry = reader.lexicon.get(term)
+            if entry is None:
+                return
+            cursors[term] = reader.cursor(entry)
+    # Rarest term first: it drives the seeks
+    ordered = sorted(cursors.values(), key=lambda cursor: cursor.df)
+
+    while True:
+        if any(cursor.doc_id is None for cursor in ordered):
+            return
+        target = max(cursor.doc_id for cursor in ordered)
+        for cursor in ordered:
+            cursor.seek(target)
+        if any(cursor.doc_id is None for cursor in ordered):
+            return
+        if all(cursor.doc_id == target for cursor in ordered):
+            positions = {term: set(cursor.positions()) for term, cursor in cursors.items()}
+            occurrences = sum(
+                1 for start in positions[phrase[0]]
+                if all(start + offset in positions[term] for offset, term in enumerate(phrase)))
+            if occurrences:
+                yield target, occurrences
+            ordered[0].advance()
+
+# Smallest span of token positions that holds one occurrence of every term in
+# `positions` (a list of sorted position lists)
+def min_window(positions):
+    events = sorted((position, i) for i, term_positions in enumerate(positions) for position in term_positions)
+    counts = [0] * len(positions)
+    covered = 0
+    best = math.inf
+    left = 0
+    for position, i in events:
+        if counts[i] == 0:
+            covered += 1
+        counts[i] += 1
+        while covered == len(positions):
+            start, j = events[left]
+            best = min(best, position - start)
+            counts[j] -= 1
+            if counts[j] == 0:
+                covered -= 1
+            left += 1
+    return best
+
+# Multiplier for a document given its query terms' positions: 1 + PROXIMITY_WEIGHT
+# when all query terms are adjacent, falling off as they spread out or go missing
+def proximity_boost(positions, query_size):
+    if len(positions) < 2:
+        return 1.0
+    closeness = (len(positions) - 1) / max(1, min_window(positions))
+    return 1.0 + PROXIMITY_WEIGHT * closeness * len(positions) / query_size
+
+# Scores the given doc_ids (ascending) by tf-idf with a proximity boost
+def _rerank(doc_ids, query_terms, reader, field_weights):
+    terms = _query_terms(query_terms, reader.stats['documents'], field_weights, reader.lexicon,
+                         lambda term, entry: reader.cursor(entry))
+    scored = []
+    for doc_id in doc_ids:
+        score = 0.0
+        positions = []
+        for term in terms:
+            term.cursor.seek(doc_id)
+            if term.cursor.doc_id == doc_id:
+                score += term.score()
+                positions.append(term.cursor.positions())
+        scored.append((doc_id, score * proximity_boost(positions, len(terms))))
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored
+
+# Runs a query the way the search box should: "quoted phrases" must appear
+# exactly, and multi-word queries are re-ranked so documents where the words
+# sit close together come first. Without a positional index this is top_k().
+# `open_cursor` is passed on to top_k() (the server's postings cache).
+def search_query(query, k=10, field_weights=None, reader=None, open_cursor=None):
+    reader = reader or open_reader()
+    terms, phrases = parse_query(query)
+    total_docs = reader.stats['documents']
+    if open_cursor is None:
+        open_cursor = lambda term, entry: reader.cursor(entry)
+    if not reader.positional or len(set(terms)) < 2:
+        return top_k(terms, total_docs, k, field_weights, reader.lexicon, open_cursor)
+
+    if phrases:
+        matching = None
+        for phrase in phrases:
+            docs = {doc_id for doc_id, _ in phrase_matches(phrase, reader)}
+            matching = docs if matching is None else matching & docs
+        candidates = sorted(matching)
+    else:
+        candidates = sorted(doc_id for doc_id, _ in top_k(
+            terms, total_docs, max(k, RERANK_DEPTH), field_weights, reader.lexicon, open_cursor))
+    return _rerank(candidates, terms, reader, field_weights)[:k]
+
+# Loads the statistics the indexer saved: N, total and average document
+# length (and whether positions were indexed)
+def corpus_stats():
+    return open_reader().stats
+
+# Number of tokens in a document (for length normalization), 0 if unknown
+def doc_length(doc_id):
+    doc_lengths = open_reader().doc_lengths
+    return doc_lengths[doc_id] if 0 <= doc_id < len(doc_lengths) else 0
+
+# How many documents we have in the index (N for IDF)
 def count_total_documents():
-    seen = set()
-    for file in os.listdir(INDEX_DIR):
-        if file.startswith("index_partial_") and file.endswith(".json"):
-            try:
-                with open(os.path.join(INDEX_DIR, file), 'r') as f:
-                    part = json.load(f)
-                    for postings in part.values():
-                        for doc_id, _, _ in postings:
-                            seen.add(doc_id)
-            except:
-                continue
-    return len(seen)
-
-# Main function that runs the search engine in the terminal
-def main():
-    # First count all the docs (used for IDF)
-    total_docs = count_total_documents()
-
-    # Load mapping from document ID to the URL
-    with open('doc_id_map.json', 'r') as f:
-        doc_id_map = json.load(f)
+    return corpus_stats()['documents']
+
+# Main function that runs the search engine in the terminal. index_dir can
+# also be the live index a running crawl writes, which is reopened whenever
+# new pages get published.
+def main(index_dir=INDEX_DIR):
+    global _reader
+    _reader = open_index_dir(index_dir)
+    doc_id_map = None
+    if not isinstance(_reader, SegmentSet):
+        # Load mapping from document ID to the URL
+        with open('doc_id_map.json', 'r') as f:
+            doc_id_map = json.load(f)
+    version = version_path(index_dir)
+    mtime = os.stat(version).st_mtime_ns
 
     # Interactive search loop
     while True:
         query = input("Search> ")
         if not query.strip():
             break  # If input is empty, stop the program
-        # Tokenize and stem the query
-        terms = [ps.stem(w) for w in tokenize(query)]
-        results = tfidf_ranking(terms, total_docs)
+        if doc_id_map is None and os.stat(version).st_mtime_ns != mtime:
+            mtime = os.stat(version).st_mtime_ns
+            _reader = open_index_dir(index_dir, _reader)
+        # Stems the query the same way the indexer did; "quoted phrases" must match exactly
+        results = search_query(query, k=10)
 
         if not results:
             print("No results found.")
             continue
 
         # Show top 10 results
-        for doc_id, score in results[:10]:
-            url = doc_id_map.get(str(doc_id), "Unknown Document")
-            print(f"{url} — Score: {score:.2f}")
+        for doc_id, score in results:
+            url = _reader.url(doc_id) if doc_id_map is None else doc_id_map.get(str(doc_id))
+            print(f"{url or 'Unknown Document'} — Score: {score:.2f}")
+
+    # How much the shared stem cache helped over this session
+    print(format_stem_stats(stem_stats()))
 
 # Entry point
+# Usage: python search.py [index folder]
 if __name__ == '__main__':
-    main()
-
+    main(sys.argv[1] if len(sys.argv) > 1 else INDEX_DIR)
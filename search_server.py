@@ -0,0 +1,292 @@
+import json
+import os
+import threading
+import time
+from argparse import ArgumentParser
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import search
+from postings import iter_postings
+from tokenizer import stem_stats
+
+# Long-running search service: keeps the index mapped, caches hot postings
+# lists and whole query results, and answers concurrent HTTP requests.
+#
+#   GET /search?q=machine+learning&k=10[&weights=title:4,bold:1]
+#   GET /stats   cache sizes, hit/miss counters, latency percentiles
+#
+# The indexer writes each rebuild into a new generation folder and publishes
+# it by replacing current.json, so when that file changes the engine reopens
+# the index and starts over with empty caches (old entries are keyed by index
+# generation and just age out).
+# A live index (segments.py) is reopened whenever its manifest changes; its
+# segments never change, so their cached postings stay valid across refreshes.
+
+REFRESH_INTERVAL = 1.0  # at most one stat() of the index per second
+MAX_K = 1000  # most results one request can ask for (larger k is clamped)
+
+
+class LRUCache:
+    # Thread-safe LRU map. Capacity is in "cost" units: 1 per entry by default,
+    # or e.g. the number of postings for a cached postings list.
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._entries = OrderedDict()  # key -> (value, cost)
+        self._lock = threading.Lock()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, cost=1):
+        if cost > self.capacity:
+            return  # Would evict everything else
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.used -= old[1]
+            self._entries[key] = (value, cost)
+            self.used += cost
+            while self.used > self.capacity:
+                _, (_, evicted_cost) = self._entries.popitem(last=False)
+                self.used -= evicted_cost
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'capacity': self.capacity,
+                'used': self.used,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+
+class _Index:
+    # One opened version of the on-disk index. Requests grab the current one
+    # and use it throughout, so a refresh never mixes two versions.
+
+    def __init__(self, index_dir, doc_id_map_path, generation, previous=None):
+        self.generation = generation
+        self.reader = search.open_index_dir(index_dir, previous.reader if previous else None)
+        self.segmented = isinstance(self.reader, search.SegmentSet)
+        self.doc_id_map = None
+        if not self.segmented:
+            with open(doc_id_map_path, 'r') as f:
+                self.doc_id_map = json.load(f)
+
+    def url(self, doc_id):
+        if self.segmented:
+            return self.reader.url(doc_id)
+        return self.doc_id_map.get(str(doc_id))
+
+
+class SearchEngine:
+    # Thread-safe query front end over one index directory.
+
+    def __init__(self, index_dir=search.INDEX_DIR, doc_id_map_path='doc_id_map.json',
+                 postings_cache=2_000_000, result_cache=10_000):
+        self.index_dir = index_dir
+        self.doc_id_map_path = doc_id_map_path
+
+        # Decoded postings of hot terms, capacity counted in postings
+        self.postings_cache = LRUCache(postings_cache)
+        # Top-k results keyed by the normalized (stemmed, sorted) query
+        self.result_cache = LRUCache(result_cache)
+
+        self._lock = threading.Lock()  # Guards swapping the index
+        self._generation = 0
+        self._index_mtime = os.stat(search.version_path(index_dir)).st_mtime_ns
+        self._index = _Index(index_dir, doc_id_map_path, self._generation)
+        self._next_refresh = time.monotonic() + REFRESH_INTERVAL
+
+        self._latencies = deque(maxlen=1000)  # Recent query times in ms
+        self.queries = 0
+
+    def search(self, query, k=10, field_weights=None):
+        start = time.perf_counter()
+        self.refresh()
+        index = self._index
+
+        terms, phrases = search.parse_query(query)
+        weights = tuple(sorted((field_weights or {}).items()))
+        key = (index.generation, tuple(sorted(terms)), tuple(map(tuple, phrases)), k, weights)
+        ranked = self.result_cache.get(key)
+        cached = ranked is not None
+        if not cached:
+            ranked = search.search_query(
+                query, k, field_weights, index.reader,
+                lambda term, entry: self._cursor(index, term, entry))
+            self.result_cache.put(key, ranked)
+
+        results = [
+            {'doc_id': doc_id, 'url': index.url(doc_id), 'score': score}
+            for doc_id, score in ranked
+        ]
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.queries += 1
+            self._latencies.append(elapsed)
+        return {'query': query, 'terms': terms, 'results': results,
+                'cached': cached, 'elapsed_ms': round(elapsed, 3)}
+
+    # Reopens the index if the indexer rebuilt it since we last looked
+    def refresh(self):
+        now = time.monotonic()
+        if now < self._next_refresh:
+            return
+        with self._lock:
+            if now < self._next_refresh:
+                return
+            self._next_refresh = now + REFRESH_INTERVAL
+            try:
+                # Looked up each time: once a build publishes current.json, that's what changes
+                mtime = os.stat(search.version_path(self.index_dir)).st_mtime_ns
+            except OSError:
+                return  # Mid-rebuild; keep serving the old index
+            if mtime == self._index_mtime:
+                return
+            self._generation += 1
+            self._index = _Index(self.index_dir, self.doc_id_map_path, self._generation, self._index)
+            self._index_mtime = mtime
+        if not self._index.segmented:
+            self.postings_cache.clear()
+        self.result_cache.clear()
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            queries = self.queries
+        index = self._index
+        size = ({'segments': len(index.reader.segments)} if index.segmented
+                else {'terms': len(index.reader.lexicon)})
+        return {
+            'documents': index.reader.stats['documents'],
+            **size,
+            'positional': index.reader.positional,
+            'index_generation': index.generation,
+            'queries': queries,
+            'latency_ms': {
+                'p50': _percentile(latencies, 0.50),
+                'p99': _percentile(latencies, 0.99),
+                'max': latencies[-1] if latencies else None,
+            },
+            'postings_cache': self.postings_cache.stats(),
+            'result_cache': self.result_cache.stats(),
+            'stem_cache': stem_stats(),
+        }
+
+    # Cursor over the term's postings, decoded once and then served from the
+    # cache (per segment for a live index)
+    def _cursor(self, index, term, entry):
+        if index.segmented:
+            return index.reader.cursor(
+                entry, lambda segment, part: self._list_cursor((segment.key, term), segment.reader, part))
+        return self._list_cursor((index.generation, term), index.reader, entry)
+
+    def _list_cursor(self, key, reader, entry):
+        cached = self.postings_cache.get(key)
+        if cached is None:
+            postings = list(iter_postings(reader.postings, entry.offset, entry.df))
+            cached = (postings, [doc_id for doc_id, _, _ in postings])
+            self.postings_cache.put(key, cached, cost=max(1, entry.df))
+        return search.ListCursor(*cached)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))], 3)
+
+# "title:4,bold:1" -> {'title': 4.0, 'bold': 1.0}
+def _parse_weights(text):
+    weights = {}
+    for part in filter(None, text.split(',')):
+        field, _, weight = part.partition(':')
+        weights[field.strip()] = float(weight)
+    return weights
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    engine: SearchEngine = None  # Set by serve()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        try:
+            if url.path == '/search':
+                query = params.get('q', [''])[0]
+                k = int(params.get('k', ['10'])[0])
+                if k < 1:
+                    raise ValueError(f'k must be at least 1, got {k}')
+                k = min(k, MAX_K)
+                weights = _parse_weights(params.get('weights', [''])[0])
+                self._reply(200, self.engine.search(query, k, weights or None))
+            elif url.path == '/stats':
+                self._reply(200, self.engine.stats())
+            else:
+                self._reply(404, {'error': f'no such endpoint: {url.path}'})
+        except ValueError as exc:
+            self._reply(400, {'error': str(exc)})
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # One line per query is too much at our request rate
+
+
+def serve(engine, host='127.0.0.1', port=8080):
+    SearchRequestHandler.engine = engine
+    server = ThreadingHTTPServer((host, port), SearchRequestHandler)
+    server.daemon_threads = True
+    print(f"Serving {engine.stats()['documents']} documents on http://{host}:{port}/search?q=…")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    cli = ArgumentParser(description="Search service over the merged index")
+    cli.add_argument("--host", default="127.0.0.1")
+    cli.add_argument("--port", type=int, default=8080)
+    cli.add_argument("--index_dir", default=search.INDEX_DIR,
+                     help="Folder with the merged index, or the live index a crawl writes")
+    cli.add_argument("--doc_id_map", default="doc_id_map.json",
+                     help="doc_id -> URL map from the indexer (a live index has its own)")
+    cli.add_argument("--postings_cache", type=int, default=2_000_000,
+                     help="Max decoded postings kept in memory across hot terms")
+    cli.add_argument("--result_cache", type=int, default=10_000, help="Max cached query results")
+    opts = cli.parse_args()
+    serve(SearchEngine(opts.index_dir, opts.doc_id_map, opts.postings_cache, opts.result_cache),
+          opts.host, opts.port)
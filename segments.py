@@ -0,0 +1,282 @@
+import json
+import os
+import shutil
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from indexer import (DOC_LENGTHS_NAME, POSTING_BYTES, STATS_NAME, add_postings, analyze_text,
+                     write_merged)
+from postings import (SKIP_ENTRY, RunRecord, iter_postings, read_manifest, run_records,
+                      write_corpus_stats, write_manifest)
+from search import IndexReader
+
+# Incremental index the crawler writes while it runs, so there's no separate
+# indexing pass over the crawled pages.
+#
+# Pages go into an in-memory segment; a flush thread writes it out every few
+# seconds (or once it's over its memory budget) as a new immutable segment
+# folder and publishes it in the manifest (see postings.py), which is when
+# search.SegmentSet starts seeing those pages. Doc IDs are handed out in
+# order, so each segment covers a contiguous range and later segments hold
+# later IDs.
+#
+# Segments are merged in tiers: every flushed segment is level 0, and as soon
+# as merge_factor neighbouring segments share a level they're merged into one
+# segment of the next level. A merge is the same concatenation indexer.py does
+# for its runs, done in a background process so it doesn't compete with the
+# crawler threads for the GIL. The number of live segments stays about
+# merge_factor * log(pages), and each page is rewritten about log(pages) times.
+
+SEGMENTS_NAME = "segments.json"  # the manifest
+DOC_ID_MAP_NAME = "doc_id_map.json"  # doc_id -> URL of each segment's pages
+
+FLUSH_INTERVAL = 5.0  # seconds pages wait before they can be searched
+MEMORY_BUDGET_MB = 64  # in-memory segment size that forces an early flush
+MERGE_FACTOR = 10  # segments of one level that get merged into the next
+
+
+class _MemorySegment:
+    # Pages added since the last flush, indexed like indexer.index_slice does
+
+    def __init__(self, first_doc, positional):
+        self.first_doc = first_doc
+        self.inverted_index = defaultdict(list)  # word → list of (doc_id, frequency, field frequencies)
+        self.positions = defaultdict(list) if positional else None  # word → positions list per posting
+        self.doc_id_map = {}
+        self.doc_lengths = {}
+        self.used = 0
+
+    def add(self, doc_id, url, term_freq, field_freqs, term_positions):
+        self.used += add_postings(self.inverted_index, self.positions, doc_id,
+                                  term_freq, field_freqs, term_positions)
+        self.used += POSTING_BYTES  # URL and length
+        self.doc_id_map[doc_id] = url
+        self.doc_lengths[doc_id] = sum(term_freq.values())
+
+
+class IndexWriter:
+    # Thread-safe; crawler threads call add_document(), flushing and merging
+    # happen in the background until close().
+
+    def __init__(self, index_dir, restart=False, flush_interval=FLUSH_INTERVAL,
+                 memory_budget_mb=MEMORY_BUDGET_MB, merge_factor=MERGE_FACTOR, positions=True):
+        self.index_dir = index_dir
+        self.flush_interval = flush_interval
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.merge_factor = max(2, merge_factor)
+        self.positions = positions
+        self._manifest_path = os.path.join(index_dir, SEGMENTS_NAME)
+
+        if restart and os.path.exists(index_dir):
+            shutil.rmtree(index_dir)
+        os.makedirs(index_dir, exist_ok=True)
+        if os.path.exists(self._manifest_path):
+            self._manifest = read_manifest(self._manifest_path)
+        else:
+            self._manifest = {'created': time.time_ns(), 'next_doc_id': 0, 'next_segment': 0, 'segments': []}
+            write_manifest(self._manifest_path, self._manifest)
+        self._remove_unlisted()
+
+        self._lock = threading.Lock()  # Guards the in-memory segment
+        self._memory = _MemorySegment(self._manifest['next_doc_id'], positions)
+        self._manifest_lock = threading.Lock()  # Guards self._manifest and the file
+        self._merging = set()  # Names of segments being merged right now
+
+        self._closing = threading.Event()
+        self._flush_wanted = threading.Event()
+        self._merge_wanted = threading.Event()
+
+        # One merge process, started before the crawler threads exist
+        self._pool = ProcessPoolExecutor(max_workers=1)
+        self._pool.submit(int).result()
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="IndexFlusher", daemon=True)
+        self._merger = threading.Thread(target=self._merge_loop, name="IndexMerger", daemon=True)
+        self._flusher.start()
+        self._merger.start()
+        self._merge_wanted.set()  # Segments left over from the last run may need merging
+
+    # Stems a parsed page for add_document(). Pure, so the crawler can run it in
+    # its parser processes: returns (term_freq, field_freqs, term_positions)
+    def analyze(self, text, field_texts):
+        return analyze_text(text, field_texts, self.positions)
+
+    def add_document(self, url, term_freq, field_freqs, term_positions=None):
+        with self._lock:
+            memory = self._memory
+            doc_id = memory.first_doc + len(memory.doc_id_map)
+            memory.add(doc_id, url, term_freq, field_freqs, term_positions)
+            full = memory.used >= self.memory_budget
+        if full:
+            self._flush_wanted.set()
+        return doc_id
+
+    # Flushes what's left and stops the background work (waits for a running merge)
+    def close(self):
+        if self._closing.is_set():
+            return
+        self._closing.set()
+        self._flush_wanted.set()
+        self._merge_wanted.set()
+        self._flusher.join()
+        self._merger.join()
+        self._pool.shutdown()
+
+    # --- Flushing ---
+
+    def _flush_loop(self):
+        while not self._closing.is_set():
+            self._flush_wanted.wait(self.flush_interval)
+            self._flush_wanted.clear()
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        with self._lock:
+            memory = self._memory
+            if not memory.doc_id_map:
+                return
+            self._memory = _MemorySegment(memory.first_doc + len(memory.doc_id_map), self.positions)
+
+        with self._manifest_lock:
+            name = f"seg_{self._manifest['next_segment']:06d}"
+            self._manifest['next_segment'] += 1
+        write_segment(os.path.join(self.index_dir, name), memory)
+
+        with self._manifest_lock:
+            self._manifest['segments'].append(
+                {'name': name, 'first_doc': memory.first_doc, 'documents': len(memory.doc_id_map), 'level': 0})
+            self._manifest['next_doc_id'] = memory.first_doc + len(memory.doc_id_map)
+            write_manifest(self._manifest_path, self._manifest)
+        self._merge_wanted.set()
+
+    # --- Tiered merging ---
+
+    def _merge_loop(self):
+        while True:
+            self._merge_wanted.wait()
+            self._merge_wanted.clear()
+            # Keep merging while merges make further merges possible
+            while not self._closing.is_set() and self._merge_once():
+                pass
+            if self._closing.is_set():
+                return
+
+    # Merges the first merge_factor neighbouring segments of the lowest level
+    # that has that many, returns False if there are none
+    def _merge_once(self):
+        with self._manifest_lock:
+            group = _pick_merge(self._manifest['segments'], self.merge_factor, self._merging)
+            if group is None:
+                return False
+            name = f"seg_{self._manifest['next_segment']:06d}"
+            self._manifest['next_segment'] += 1
+            names = [segment['name'] for segment in group]
+            self._merging.update(names)
+
+        try:
+            self._pool.submit(merge_segments, self.index_dir, group, name).result()
+        except Exception as exc:
+            # Leave the segments as they are; the next flush tries again
+            print(f"⚠️ merging {names[0]}..{names[-1]} failed: {exc}")
+            shutil.rmtree(os.path.join(self.index_dir, name), ignore_errors=True)
+            with self._manifest_lock:
+                self._merging.difference_update(names)
+            return False
+
+        merged = {'name': name, 'first_doc': group[0]['first_doc'],
+                  'documents': sum(segment['documents'] for segment in group),
+                  'level': group[0]['level'] + 1}
+        with self._manifest_lock:
+            segments = self._manifest['segments']
+            start = next(i for i, segment in enumerate(segments) if segment['name'] == names[0])
+            segments[start:start + len(names)] = [merged]
+            write_manifest(self._manifest_path, self._manifest)
+            self._merging.difference_update(names)
+        # Readers that already mapped these keep their files until they let go
+        for old in names:
+            shutil.rmtree(os.path.join(self.index_dir, old), ignore_errors=True)
+        return True
+
+    # Segment folders from a flush or merge that was cut off before it was published
+    def _remove_unlisted(self):
+        listed = {segment['name'] for segment in self._manifest['segments']}
+        for name in os.listdir(self.index_dir):
+            if name.startswith('seg_') and name not in listed:
+                shutil.rmtree(os.path.join(self.index_dir, name), ignore_errors=True)
+
+
+def _pick_merge(segments, merge_factor, busy):
+    best = None
+    start = 0
+    while start < len(segments):
+        end = start
+        while (end < len(segments) and segments[end]['level'] == segments[start]['level']
+               and segments[end]['name'] not in busy):
+            end += 1
+        if end - start >= merge_factor and (best is None or segments[start]['level'] < best[0]['level']):
+            best = segments[start:start + merge_factor]
+        start = max(end, start + 1)
+    return best
+
+
+# Writes an in-memory segment out as a segment folder
+def write_segment(segment_dir, memory):
+    os.makedirs(segment_dir, exist_ok=True)
+    records = run_records(memory.inverted_index, memory.positions)
+    write_merged([((record.term, 0, record) for record in records)], segment_dir)
+    _write_segment_docs(segment_dir, memory.first_doc, memory.doc_id_map, memory.doc_lengths,
+                        memory.positions is not None)
+
+# Merges neighbouring segments (manifest entries, in doc ID order) into a new
+# segment folder `out_name`. Runs in the merge process.
+def merge_segments(index_dir, segments, out_name):
+    readers = [IndexReader(os.path.join(index_dir, segment['name'])) for segment in segments]
+    streams = [segment_records(reader, order) for order, reader in enumerate(readers)]
+    out_dir = os.path.join(index_dir, out_name)
+    os.makedirs(out_dir, exist_ok=True)
+    write_merged(streams, out_dir)
+
+    doc_id_map = {}
+    doc_lengths = {}
+    for segment, reader in zip(segments, readers):
+        with open(os.path.join(index_dir, segment['name'], DOC_ID_MAP_NAME), 'r', encoding='utf8') as f:
+            doc_id_map.update((int(doc_id), url) for doc_id, url in json.load(f).items())
+        for i, length in enumerate(reader.doc_lengths):
+            doc_lengths[segment['first_doc'] + i] = length
+    _write_segment_docs(out_dir, segments[0]['first_doc'], doc_id_map, doc_lengths,
+                        all(reader.positional for reader in readers))
+
+# Segment stats are kept relative to the segment's first doc ID, so its
+# doc_lengths.dat only covers its own pages
+def _write_segment_docs(segment_dir, first_doc, doc_id_map, doc_lengths, positional):
+    with open(os.path.join(segment_dir, DOC_ID_MAP_NAME), 'w', encoding='utf8') as out:
+        json.dump({str(doc_id): url for doc_id, url in sorted(doc_id_map.items())}, out)
+    write_corpus_stats(os.path.join(segment_dir, STATS_NAME), os.path.join(segment_dir, DOC_LENGTHS_NAME),
+                       {doc_id - first_doc: length for doc_id, length in doc_lengths.items()}, positional)
+
+# A segment's terms as (term, run order, RunRecord) in term order, for write_merged()
+def segment_records(reader, order):
+    for term, entry in reader.lexicon.items():
+        skips = []
+        if reader.skips is not None and entry.skip_count:
+            start = entry.skip_offset
+            skips = list(SKIP_ENTRY.iter_unpack(reader.skips[start:start + entry.skip_count * SKIP_ENTRY.size]))
+        # Every piece starts with a skip entry, so the merged table starts with one too
+        skips = skips or [(0, 0, 0, 0)]
+        positions = b''
+        if reader.positions is not None and entry.positions_length:
+            positions = reader.positions[entry.positions_offset:entry.positions_offset + entry.positions_length]
+        data = reader.postings[entry.offset:entry.offset + entry.length]
+        yield term, order, RunRecord(term, entry.df, _last_doc(data, entry.df, skips[-1]), entry.max_tf,
+                                     entry.field_max, data, positions, skips)
+
+# doc_id of a list's last posting, decoding only its last skip block
+def _last_doc(data, df, last_skip):
+    base_doc, index, data_off, _ = last_skip
+    last_doc = 0
+    for last_doc, _, _ in iter_postings(data, data_off, df - index):
+        pass
+    return base_doc + last_doc
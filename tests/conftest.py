@@ -0,0 +1,42 @@
+import atexit
+import json
+
+import pytest
+
+import scraper
+from indexer import index_corpus
+
+# Importing scraper registers its end-of-crawl report; tests aren't crawls
+atexit.unregister(scraper._write_report)
+
+DOCS = 12
+
+
+def make_page(i: int) -> str:
+    """Doc i: 'common' in every doc (idf < 0), 'nearly' in all but one (idf 0),
+    'alpha' and 'beta' in a few, with tfs that keep the scores apart."""
+    body = ["common"] * (i + 1)
+    if i < DOCS - 1:
+        body.append("nearly")
+    if i % 2 == 0:
+        body += ["alpha"] * (i + 1)
+    if i % 3 == 0:
+        body += ["beta"] * (2 * i + 1)
+    title = "beta" if i % 4 == 0 else "page"
+    return f"<html><head><title>{title}</title></head><body><p>{' '.join(body)}</p></body></html>"
+
+
+@pytest.fixture(scope="session")
+def index_dir(tmp_path_factory):
+    """A merged index of DOCS small pages; its doc_id_map.json is next to it."""
+    root = tmp_path_factory.mktemp("search")
+    corpus = root / "corpus"
+    corpus.mkdir()
+    for i in range(DOCS):
+        (corpus / f"{i:02d}.json").write_text(
+            json.dumps({"url": f"https://www.ics.uci.edu/{i}", "content": make_page(i)}))
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(root)  # index_corpus writes doc_id_map.json to the working directory
+        index_corpus(str(corpus), index_dir=str(root / "index"))
+    return root / "index"
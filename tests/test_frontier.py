@@ -0,0 +1,109 @@
+from configparser import ConfigParser
+
+import pytest
+
+import crawler.frontier as frontier_module
+from crawler.frontier import Frontier
+from utils import get_urlhash
+from utils.config import Config
+
+
+def make_config(save_file: str, seeds: list[str], journal: bool) -> Config:
+    cparser = ConfigParser()
+    cparser.read("config.ini")
+    cparser["LOCAL PROPERTIES"]["SAVE"] = save_file
+    cparser["LOCAL PROPERTIES"]["JOURNAL"] = str(journal)
+    cparser["LOCAL PROPERTIES"]["SHARDS"] = "16"
+    cparser["CRAWLER"]["SEEDURL"] = ",".join(seeds)
+    return Config(cparser)
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_completed_url_not_requeued_by_case_or_port_variants(tmp_path, monkeypatch, journal):
+    monkeypatch.setattr(frontier_module, "POLITENESS_DELAY", 0.0)
+    url = "https://www.ics.uci.edu/a"
+    config = make_config(str(tmp_path / "frontier.shelve"), [url], journal)
+    frontier = Frontier(config, restart=True)
+    try:
+        assert frontier.get_tbd_url() == url
+        frontier.mark_url_complete(url)
+
+        variants = [
+            "https://WWW.ICS.UCI.EDU/a",
+            "https://www.ics.uci.edu:443/a",
+            "http://www.ics.uci.edu:80/a",
+            "http://Www.Ics.Uci.Edu:80/a/",
+        ]
+        frontier.add_urls(variants)
+        for variant in variants:
+            frontier.add_url(variant)
+
+        assert frontier.queue_depths()["queued"] == 0
+        assert frontier._db[get_urlhash(url)][:2] == (url, True)
+    finally:
+        frontier._db.close()
+
+
+def test_case_variants_share_a_shard_and_domain(tmp_path, monkeypatch):
+    monkeypatch.setattr(frontier_module, "POLITENESS_DELAY", 0.0)
+    config = make_config(str(tmp_path / "frontier.shelve"), ["https://www.ics.uci.edu/a"], False)
+    frontier = Frontier(config, restart=True)
+    try:
+        frontier.add_urls(["https://WWW.ICS.UCI.EDU:443/b", "https://www.ics.uci.edu/c"])
+        assert frontier.queue_depths() == {"queued": 3, "in_flight": 0, "domains": 1}
+    finally:
+        frontier._db.close()
+
+
+class _ShardLockCheckingStore:
+    """Wraps the frontier's store and records any use of it while a shard lock is held."""
+
+    def __init__(self, frontier):
+        self.frontier = frontier
+        self.store = frontier._db
+        self.locked_calls = []
+
+    def _check(self, name):
+        if any(shard.lock.locked() for shard in self.frontier._shards):
+            self.locked_calls.append(name)
+
+    def __contains__(self, key):
+        self._check("__contains__")
+        return key in self.store
+
+    def __getitem__(self, key):
+        return self.store[key]
+
+    def __setitem__(self, key, value):
+        self._check("__setitem__")
+        self.store[key] = value
+
+    def update(self, records):
+        self._check("update")
+        self.store.update(records)
+
+    def sync(self):
+        self._check("sync")
+        self.store.sync()
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_store_is_not_used_under_a_shard_lock(tmp_path, monkeypatch, journal):
+    monkeypatch.setattr(frontier_module, "POLITENESS_DELAY", 0.0)
+    url = "https://www.ics.uci.edu/a"
+    config = make_config(str(tmp_path / "frontier.shelve"), [url], journal)
+    frontier = Frontier(config, restart=True)
+    store = frontier._db
+    frontier._db = checking = _ShardLockCheckingStore(frontier)
+    try:
+        assert frontier.get_tbd_url() == url
+        links = [f"https://www.ics.uci.edu/page{i}" for i in range(50)]
+        frontier.add_urls(links, parent=url)
+        frontier.add_urls(links + [url], parent=url)  # All duplicates by now
+        frontier.mark_url_complete(url)
+
+        assert checking.locked_calls == []
+        assert frontier.queue_depths()["queued"] == 50
+        assert all(store[get_urlhash(link)][:2] == (link, False) for link in links)
+    finally:
+        store.close()
@@ -0,0 +1,51 @@
+import json
+import os
+
+import indexer
+import search
+from indexer import CURRENT_NAME, index_corpus
+from tests.conftest import make_page
+
+
+def build(root, pages: int):
+    corpus = root / "corpus"
+    corpus.mkdir(exist_ok=True)
+    for i in range(pages):
+        (corpus / f"{i:02d}.json").write_text(
+            json.dumps({"url": f"https://www.ics.uci.edu/{i}", "content": make_page(i)}))
+    index_corpus(str(corpus), index_dir=str(root / "index"))
+
+
+def published(index_dir) -> str:
+    with open(os.path.join(index_dir, CURRENT_NAME), encoding="utf8") as f:
+        return json.load(f)["files"]
+
+
+def test_rebuild_publishes_a_new_generation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # index_corpus writes doc_id_map.json here
+    index_dir = tmp_path / "index"
+
+    build(tmp_path, 4)
+    first = published(index_dir)
+    old = search.IndexReader(str(index_dir))
+
+    build(tmp_path, 8)
+    second = published(index_dir)
+    assert second != first
+    # A reader that opened the old generation keeps a consistent view of it
+    assert old.stats["documents"] == 4
+    assert old.lexicon.get("alpha").df == 2
+    new = search.IndexReader(str(index_dir))
+    assert new.stats["documents"] == 8
+    assert new.lexicon.get("alpha").df == 4
+    assert [doc_id for doc_id, _, _ in search.iter_postings(new.postings, *_where(new, "alpha"))] == [0, 2, 4, 6]
+
+    # Only the current and the previous generation are kept
+    build(tmp_path, 8)
+    generations = sorted(name for name in os.listdir(index_dir) if name.startswith(indexer.GENERATION_PREFIX))
+    assert generations == [second, published(index_dir)]
+
+
+def _where(reader, term):
+    entry = reader.lexicon.get(term)
+    return entry.offset, entry.df
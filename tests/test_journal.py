@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from crawler.journal import JOURNAL_SUFFIX, ROTATED_SUFFIX, WriteBehindStore
+
+
+class _StallAfterRelease:
+    """Wraps the store's buffer lock; the first thread to release it stalls
+    right after, which is where a competing write used to overtake it."""
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.stalled = threading.Event()
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, *exc):
+        self.lock.release()
+        if not self.stalled.is_set():
+            self.stalled.set()
+            time.sleep(0.3)
+
+
+def replayed_records(path: str) -> dict:
+    """What a replay after a crash right now would end up with."""
+    records = {}
+    with open(path + JOURNAL_SUFFIX, encoding="utf-8") as fp:
+        for line in fp:
+            key, *value = json.loads(line)
+            records[key] = tuple(value)
+    return records
+
+
+def test_journal_order_matches_buffer_order(tmp_path):
+    path = str(tmp_path / "frontier.shelve")
+    store = WriteBehindStore(path, batch_size=10 ** 9, flush_interval=3600)
+    lock, store._lock = store._lock, _StallAfterRelease(store._lock)
+    try:
+        # A pending save stalls between buffer and journal; the completion races it
+        pending = threading.Thread(target=store.__setitem__, args=("a", ("https://www.ics.uci.edu/a", False)))
+        pending.start()
+        store._lock.stalled.wait()
+        completed = threading.Thread(target=store.__setitem__, args=("a", ("https://www.ics.uci.edu/a", True)))
+        completed.start()
+        pending.join()
+        completed.join()
+
+        assert replayed_records(path) == {"a": store["a"]}
+    finally:
+        store._lock = lock
+        store.close()
+
+
+def test_replay_restores_unflushed_writes(tmp_path):
+    path = str(tmp_path / "frontier.shelve")
+    store = WriteBehindStore(path, batch_size=10 ** 9, flush_interval=3600)
+    store["a"] = ("https://www.ics.uci.edu/a", False, 0, None)
+    store["a"] = ("https://www.ics.uci.edu/a", True, 0, None)
+    store._journal.close()  # "Crash": nothing was flushed to the shelve
+    store._closed = True
+    with store._db_lock:
+        store._db.close()
+
+    reopened = WriteBehindStore(path)
+    try:
+        assert reopened["a"] == ("https://www.ics.uci.edu/a", True, 0, None)
+    finally:
+        reopened.close()
+
+
+class _FailingShelf:
+    """Wraps the store's shelve; writes to it fail while `failing` is set."""
+
+    def __init__(self, shelf):
+        self.shelf = shelf
+        self.failing = True
+
+    def __setitem__(self, key, value):
+        if self.failing:
+            raise OSError("disk full")
+        self.shelf[key] = value
+
+    def __getattr__(self, name):
+        return getattr(self.shelf, name)
+
+
+def test_failed_flush_is_retried_with_the_next_batch(tmp_path):
+    path = str(tmp_path / "frontier.shelve")
+    store = WriteBehindStore(path, batch_size=10 ** 9, flush_interval=3600)
+    store._db = shelf = _FailingShelf(store._db)
+    try:
+        store["a"] = ("https://www.ics.uci.edu/a", False, 0, None)
+        with pytest.raises(OSError):
+            store.sync()
+        store["b"] = ("https://www.ics.uci.edu/b", False, 0, None)
+        store["a"] = ("https://www.ics.uci.edu/a", True, 0, None)
+        with pytest.raises(OSError):
+            store.sync()
+        assert store["a"][1] is True and "b" in store
+
+        shelf.failing = False
+        store.sync()
+        assert not os.path.exists(path + ROTATED_SUFFIX)
+        with store._db_lock:
+            assert dict(shelf.shelf) == {"a": ("https://www.ics.uci.edu/a", True, 0, None),
+                                     "b": ("https://www.ics.uci.edu/b", False, 0, None)}
+    finally:
+        store.close()
+
+
+def test_replay_after_failed_flushes_keeps_every_batch(tmp_path):
+    path = str(tmp_path / "frontier.shelve")
+    store = WriteBehindStore(path, batch_size=10 ** 9, flush_interval=3600)
+    store._db = _FailingShelf(store._db)
+    store["a"] = ("https://www.ics.uci.edu/a", False, 0, None)
+    with pytest.raises(OSError):
+        store.sync()
+    store["b"] = ("https://www.ics.uci.edu/b", False, 0, None)
+    with pytest.raises(OSError):
+        store.sync()  # Used to replace the rotated journal holding "a"
+    store._journal.close()  # "Crash"
+    store._closed = True
+    with store._db_lock:
+        store._db.close()
+
+    reopened = WriteBehindStore(path)
+    try:
+        assert reopened["a"] == ("https://www.ics.uci.edu/a", False, 0, None)
+        assert reopened["b"] == ("https://www.ics.uci.edu/b", False, 0, None)
+    finally:
+        reopened.close()
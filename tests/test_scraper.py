@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+import scraper
+
+PAGE = '<html><body><h1>Café naïve</h1><a href="/résumé">CV</a></body></html>'
+
+
+def make_response(body: bytes, content_type: str) -> SimpleNamespace:
+    return SimpleNamespace(status=200, url="https://www.ics.uci.edu/", headers={"Content-Type": content_type},
+                           content=memoryview(body))
+
+
+def test_utf8_page_without_declared_charset():
+    page = scraper._parse_html("https://www.ics.uci.edu/", make_response(PAGE.encode("utf-8"), "text/html"))
+    assert "Café naïve" in page.text()
+    assert page.hrefs == ["/résumé"]
+
+
+def test_charset_from_content_type():
+    resp = make_response(PAGE.encode("latin-1"), "text/html; charset=ISO-8859-1")
+    page = scraper._parse_html("https://www.ics.uci.edu/", resp)
+    assert "Café naïve" in page.text()
+    assert page.hrefs == ["/résumé"]
@@ -0,0 +1,25 @@
+import pytest
+
+import search
+from tests.conftest import DOCS
+from tokenizer import stemmed_tokens
+
+
+@pytest.fixture
+def index(index_dir, monkeypatch):
+    monkeypatch.setattr(search, "_reader", search.IndexReader(str(index_dir)))
+
+
+@pytest.mark.parametrize("query", ["alpha alpha beta", "alpha beta common nearly", "common", "nearly beta"])
+@pytest.mark.parametrize("k", [1, 5, 10])
+def test_top_k_matches_tfidf_ranking(index, query, k):
+    terms = stemmed_tokens(query)
+    expected = search.tfidf_ranking(terms, DOCS)[:k]
+    result = search.top_k(terms, DOCS, k)
+    assert [doc_id for doc_id, _ in result] == [doc_id for doc_id, _ in expected]
+    assert [score for _, score in result] == pytest.approx([score for _, score in expected])
+
+
+@pytest.mark.parametrize("k", [0, -3])
+def test_top_k_without_room_returns_nothing(index, k):
+    assert search.top_k(stemmed_tokens("alpha beta"), DOCS, k) == []
@@ -0,0 +1,44 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+import search_server
+from search_server import SearchEngine, SearchRequestHandler
+
+
+@pytest.fixture
+def server_url(index_dir, monkeypatch):
+    monkeypatch.setattr(SearchRequestHandler, "engine",
+                        SearchEngine(str(index_dir), str(index_dir.parent / "doc_id_map.json")))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SearchRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url):
+    try:
+        with urlopen(url, timeout=5) as resp:
+            return resp.status, json.load(resp)
+    except HTTPError as exc:
+        return exc.code, json.load(exc)
+
+
+@pytest.mark.parametrize("k", ["0", "-1", "ten"])
+def test_bad_k_is_a_400(server_url, k):
+    status, body = get(f"{server_url}/search?q=alpha&k={k}")
+    assert status == 400
+    assert "error" in body
+
+
+def test_large_k_is_clamped(server_url, monkeypatch):
+    monkeypatch.setattr(search_server, "MAX_K", 2)
+    status, body = get(f"{server_url}/search?q=common&k=50")
+    assert status == 200
+    assert len(body["results"]) == 2
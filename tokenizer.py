@@ -0,0 +1,88 @@
+import re
+import time
+from functools import lru_cache
+from nltk.stem import PorterStemmer
+
+# Text normalization shared by indexer.py and search.py, so a query term is
+# always turned into exactly the same token the indexer stored.
+#
+# Word frequencies are heavily skewed (a few thousand words make up most of any
+# page), so stemming every occurrence from scratch mostly repeats work. stem()
+# keeps the most recent STEM_CACHE_SIZE results in an LRU cache instead.
+
+STEM_CACHE_SIZE = 50_000
+
+# I use this stemmer to reduce words to their root form
+ps = PorterStemmer()
+
+_TOKEN_RE = re.compile(r'\b\w+\b')
+
+# Time spent actually running the stemmer (cache misses only)
+_miss_seconds = 0.0
+
+# The first calls pay one-off warm-up costs (several times a steady-state
+# stem), so the per-miss cost behind the saved-time estimate is only
+# measured over the misses after the first STEM_WARMUP_MISSES
+STEM_WARMUP_MISSES = 100
+_warmup_left = STEM_WARMUP_MISSES
+_warm_misses = 0
+_warm_seconds = 0.0
+
+# Turns text into a list of lowercase words, removing punctuation
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+# Stems one lowercase word, memoized
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word):
+    global _miss_seconds, _warmup_left, _warm_misses, _warm_seconds
+    start = time.perf_counter()
+    stemmed = ps.stem(word)
+    elapsed = time.perf_counter() - start
+    _miss_seconds += elapsed
+    if _warmup_left:
+        _warmup_left -= 1
+    else:
+        _warm_misses += 1
+        _warm_seconds += elapsed
+    return stemmed
+
+# Tokenizes and stems text in one go (what both the indexer and queries need)
+def stemmed_tokens(text):
+    return [stem(word) for word in tokenize(text)]
+
+# Hit rate of the stem cache and an estimate of the time it saved: every hit
+# would have cost about as much as an average warm miss (None until there
+# have been any)
+def stem_stats():
+    info = stem.cache_info()
+    lookups = info.hits + info.misses
+    miss_cost = _warm_seconds / _warm_misses if _warm_misses else None
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'hit_rate': info.hits / lookups if lookups else 0.0,
+        'cached_words': info.currsize,
+        'stem_seconds': _miss_seconds,
+        'saved_seconds': info.hits * miss_cost if miss_cost is not None else None,
+    }
+
+# Adds up stem_stats() dicts from several processes (saved_seconds over
+# those that have an estimate)
+def merge_stem_stats(all_stats):
+    total = {'hits': 0, 'misses': 0, 'cached_words': 0, 'stem_seconds': 0.0}
+    saved = None
+    for stats in all_stats:
+        for key in total:
+            total[key] += stats[key]
+        if stats['saved_seconds'] is not None:
+            saved = (saved or 0.0) + stats['saved_seconds']
+    total['saved_seconds'] = saved
+    lookups = total['hits'] + total['misses']
+    total['hit_rate'] = total['hits'] / lookups if lookups else 0.0
+    return total
+
+def format_stem_stats(stats):
+    saved = f", ~{stats['saved_seconds']:.3f}s saved" if stats['saved_seconds'] is not None else ""
+    return (f"Stem cache: {stats['hits']:,} hits / {stats['misses']:,} misses "
+            f"({stats['hit_rate']:.1%} hit rate), {stats['stem_seconds']:.3f}s stemming{saved}")
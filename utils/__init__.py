@@ -45,16 +45,13 @@ def canonicalise(url: str) -> str:
     This turns URLs into a consistent form, so that similar-looking ones 
     (like with or without a trailing slash) are treated the same.
     """
-    parsed = urlparse(url.strip())
+    return canonical_parsed(urlparse(url.strip()))
 
-    # Lowercase the hostname
-    host = (parsed.hostname or "").lower()
-
-    # Remove default ports from netloc
-    if parsed.port and parsed.port in {80, 443}:
-        netloc = host
-    else:
-        netloc = parsed.netloc.lower()
+def canonical_parsed(parsed) -> str:
+    """
+    canonicalise() for a URL that was already parsed (see utils/urls.py).
+    """
+    netloc = canonical_host(parsed)
 
     # Normalize the path by removing trailing slash if needed
     path = parsed.path or "/"
@@ -64,9 +61,45 @@ def canonicalise(url: str) -> str:
     # Rebuild the URL without the scheme, params, or fragment
     return urlunparse(("", netloc, path, "", parsed.query, ""))
 
+def canonical_host(parsed) -> str:
+    """
+    The netloc part of canonicalise(): lowercased, default ports removed.
+    The frontier keys its shards and domains by it, so every spelling of a
+    URL that hashes the same also lands in the same shard.
+    """
+    # Lowercase the hostname
+    host = (parsed.hostname or "").lower()
+
+    # Remove default ports from netloc
+    if parsed.port and parsed.port in {80, 443}:
+        return host
+    return parsed.netloc.lower()
+
 def url_hash(url: str) -> str:
     """
     Hash the canonical form of the URL using SHA256.
     This gives a unique, consistent ID for any URL.
     """
     return sha256(canonicalise(url).encode("utf-8")).hexdigest()
+
+def url_hash_parsed(parsed) -> str:
+    """
+    url_hash() for a URL that was already parsed.
+    """
+    return sha256(canonical_parsed(parsed).encode("utf-8")).hexdigest()
+
+def normalize(url: str) -> str:
+    """
+    Light normalization used by the frontier: drop a trailing slash so
+    "/about" and "/about/" end up as the same entry.
+    """
+    url = url.strip()
+    if url.endswith("/"):
+        return url.rstrip("/")
+    return url
+
+def get_urlhash(url: str) -> str:
+    """
+    Key used by the frontier's save file (same as url_hash).
+    """
+    return url_hash(url)
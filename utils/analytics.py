@@ -0,0 +1,194 @@
+import atexit
+import heapq
+import os
+import pickle
+import threading
+import time
+import zlib
+from collections import Counter
+from operator import itemgetter
+from typing import Mapping
+
+
+class HeavyHitters:
+    """
+    Approximate word counter with bounded memory (a batched Space-Saving sketch).
+
+    Keeps at most 2 * capacity counters. When it gets that big, only the
+    `capacity` largest are kept and `floor` remembers the largest count that
+    was dropped. A word that shows up again starts from `floor`, so a count is
+    never underestimated and overestimated by at most `floor` - plenty accurate
+    for a top-50 list when capacity is in the thousands.
+    """
+
+    def __init__(self, capacity: int = 5000):
+        self.capacity = capacity
+        self.floor = 0
+        self._counts: dict[str, int] = {}
+
+    def update(self, counts: Mapping[str, int]):
+        table = self._counts
+        floor = self.floor
+        for item, n in counts.items():
+            if item in table:
+                table[item] += n
+            else:
+                table[item] = floor + n
+        if len(table) > 2 * self.capacity:
+            self._prune()
+
+    def merge(self, other: "HeavyHitters"):
+        """Fold another sketch into this one (used to combine per-thread sketches)."""
+        merged = {}
+        for item in self._counts.keys() | other._counts.keys():
+            merged[item] = self._counts.get(item, self.floor) + other._counts.get(item, other.floor)
+        self._counts = merged
+        self.floor += other.floor
+        if len(merged) > 2 * self.capacity:
+            self._prune()
+
+    def most_common(self, n: int) -> list[tuple[str, int]]:
+        return heapq.nlargest(n, self._counts.items(), key=itemgetter(1))
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def _prune(self):
+        ranked = sorted(self._counts.items(), key=itemgetter(1), reverse=True)
+        self.floor = max(self.floor, ranked[self.capacity][1])
+        self._counts = dict(ranked[:self.capacity])
+
+
+class _ThreadStats:
+    """One thread's share of the analytics. Only its owner writes to it."""
+
+    def __init__(self, word_capacity: int):
+        self.lock = threading.Lock()  # Uncontended except while a report is merged
+        self.longest_url = ""
+        self.longest_words = 0
+        self.words = HeavyHitters(word_capacity)
+        self.subdomains: Counter[str] = Counter()
+
+
+class CrawlAnalytics:
+    """
+    Report statistics collected from many worker threads without a shared hot lock.
+
+    Each thread that records pages gets its own accumulator (word sketch,
+    longest page, subdomain counts); they are only merged when a report is
+    built. The one thing that has to be global - whether a URL was already
+    counted - is a set behind a short lock. Parser processes never touch this:
+    they send a PageAnalysis back and the parent records it.
+    """
+
+    def __init__(self, word_capacity: int = 5000):
+        self.word_capacity = word_capacity
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._unique_urls: set[str] = set()
+        self._all_stats: list[_ThreadStats] = []  # Kept after a thread exits
+
+    def add_page(self, url: str, word_count: int, word_counts: Mapping[str, int],
+                 subdomain: str | None) -> int | None:
+        """Record one page. Returns the new unique-page count, or None if the URL was seen."""
+        with self._lock:
+            if url in self._unique_urls:
+                return None
+            self._unique_urls.add(url)
+            total = len(self._unique_urls)
+
+        stats = self._thread_stats()
+        with stats.lock:
+            if word_count > stats.longest_words:
+                stats.longest_url, stats.longest_words = url, word_count
+            stats.words.update(word_counts)
+            if subdomain:
+                stats.subdomains[subdomain] += 1
+        return total
+
+    def snapshot(self) -> dict:
+        """Merge every thread's accumulator into one report-ready dict."""
+        unique, _, words, subdomains, longest = self._merged()
+        return {
+            "unique_pages": unique,
+            "longest_url": longest[0],
+            "longest_words": longest[1],
+            "top_words": words.most_common(50),
+            "word_count_error": words.floor,
+            "subdomains": dict(subdomains),
+        }
+
+    # --- Checkpoints ---
+
+    def save(self, path: str):
+        """Write the merged state to `path` as a zlib-compressed pickle (atomically)."""
+        _, unique_urls, words, subdomains, longest = self._merged(with_urls=True)
+        state = {
+            "version": 1,
+            "unique_urls": unique_urls,
+            "longest": longest,
+            "words": (words.floor, words._counts),
+            "subdomains": dict(subdomains),
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as fp:
+            fp.write(zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL), 6))
+        os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        """Add the state from a checkpoint written by save() (used on resume)."""
+        with open(path, "rb") as fp:
+            state = pickle.loads(zlib.decompress(fp.read()))
+
+        restored = _ThreadStats(self.word_capacity)
+        restored.longest_url, restored.longest_words = state["longest"]
+        restored.words.floor, restored.words._counts = state["words"]
+        restored.subdomains.update(state["subdomains"])
+        with self._lock:
+            self._unique_urls.update(state["unique_urls"])
+            self._all_stats.append(restored)
+
+    def start_checkpoints(self, path: str, interval: float):
+        """Save a checkpoint every `interval` seconds, and once more at exit."""
+        def _loop():
+            while True:
+                time.sleep(interval)
+                self.checkpoint(path)
+
+        threading.Thread(target=_loop, name="AnalyticsCheckpoint", daemon=True).start()
+        atexit.register(self.checkpoint, path)
+
+    def checkpoint(self, path: str):
+        """save(), but only logs on failure (safe to call from exit paths)."""
+        try:
+            self.save(path)
+        except Exception as exc:
+            print(f"⚠️ analytics checkpoint failed: {exc}")
+
+    # --- Helpers ---
+
+    def _merged(self, with_urls: bool = False):
+        """(unique count, unique URLs or None, words, subdomains, (longest url, words))."""
+        with self._lock:
+            unique = len(self._unique_urls)
+            unique_urls = list(self._unique_urls) if with_urls else None
+            all_stats = list(self._all_stats)
+
+        words = HeavyHitters(self.word_capacity)
+        subdomains: Counter[str] = Counter()
+        longest = ("", 0)
+        for stats in all_stats:
+            with stats.lock:
+                words.merge(stats.words)
+                subdomains.update(stats.subdomains)
+                if stats.longest_words > longest[1]:
+                    longest = (stats.longest_url, stats.longest_words)
+        return unique, unique_urls, words, subdomains, longest
+
+    def _thread_stats(self) -> _ThreadStats:
+        stats = getattr(self._local, "stats", None)
+        if stats is None:
+            stats = self._local.stats = _ThreadStats(self.word_capacity)
+            with self._lock:
+                self._all_stats.append(stats)
+        return stats
@@ -16,9 +16,50 @@ class Config(object):
         # Number of threads the crawler will use
         self.threads_count = int(config["LOCAL PROPERTIES"]["THREADCOUNT"])
 
+        # In-flight downloads per worker when running the async worker (launch.py --worker async)
+        self.async_concurrency = config["LOCAL PROPERTIES"].getint("ASYNC_CONCURRENCY", fallback=100)
+        self.async_timeout = config["LOCAL PROPERTIES"].getfloat("ASYNC_TIMEOUT", fallback=60.0)
+
+        # Parser processes (0 = one per CPU) and max pages waiting for them (launch.py --worker pipeline)
+        self.parse_processes = config["LOCAL PROPERTIES"].getint("PARSE_PROCESSES", fallback=0)
+        self.parse_queue = config["LOCAL PROPERTIES"].getint("PARSE_QUEUE", fallback=64)
+
         # Path where crawl data or state will be saved
         self.save_file = config["LOCAL PROPERTIES"]["SAVE"]
 
+        # Write-behind journal for the save file (batched syncs instead of one per URL)
+        self.journal = config["LOCAL PROPERTIES"].getboolean("JOURNAL", fallback=True)
+        self.journal_batch = config["LOCAL PROPERTIES"].getint("JOURNAL_BATCH", fallback=500)
+        self.journal_interval = config["LOCAL PROPERTIES"].getfloat("JOURNAL_INTERVAL", fallback=2.0)
+
+        # Crawl analytics checkpoint (reloaded on resume) and how often it's written, in seconds
+        self.analytics_snapshot = config["LOCAL PROPERTIES"].get("ANALYTICS_SNAPSHOT", fallback="Logs/analytics.snapshot")
+        self.checkpoint_interval = config["LOCAL PROPERTIES"].getfloat("CHECKPOINT_INTERVAL", fallback=60.0)
+
+        # Live search index the crawled pages are added to (empty = don't index), how
+        # often new pages are published (seconds), the in-memory size (MB) that
+        # forces an earlier flush, segments merged per tier, and whether to keep positions
+        self.index_dir = config["LOCAL PROPERTIES"].get("INDEX", fallback="").strip()
+        self.index_flush_interval = config["LOCAL PROPERTIES"].getfloat("INDEX_FLUSH_INTERVAL", fallback=5.0)
+        self.index_memory_mb = config["LOCAL PROPERTIES"].getint("INDEX_MEMORY_MB", fallback=64)
+        self.index_merge_factor = config["LOCAL PROPERTIES"].getint("INDEX_MERGE_FACTOR", fallback=10)
+        self.index_positions = config["LOCAL PROPERTIES"].getboolean("INDEX_POSITIONS", fallback=True)
+
+        # Live crawl metrics: port of the local /metrics text endpoint and seconds
+        # between summaries in the log (0 turns either off)
+        self.metrics_port = config["LOCAL PROPERTIES"].getint("METRICS_PORT", fallback=0)
+        self.metrics_interval = config["LOCAL PROPERTIES"].getfloat("METRICS_INTERVAL", fallback=60.0)
+
+        # Number of independently locked frontier partitions (by domain hash)
+        self.frontier_shards = config["LOCAL PROPERTIES"].getint("SHARDS", fallback=8)
+
+        # Order URLs are crawled in (a name from crawler/priority.py SCORERS)
+        self.priority = config["LOCAL PROPERTIES"].get("PRIORITY", fallback="best-first")
+
+        # Sizing of the in-memory seen-URL filter (grows past this if needed)
+        self.expected_urls = config["LOCAL PROPERTIES"].getint("EXPECTED_URLS", fallback=200_000)
+        self.bloom_error_rate = config["LOCAL PROPERTIES"].getfloat("BLOOM_ERROR_RATE", fallback=0.001)
+
         # Server host and port for connecting (can be for caching or other services)
         self.host = config["CONNECTION"]["HOST"]
         self.port = int(config["CONNECTION"]["PORT"])
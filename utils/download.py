@@ -31,3 +31,28 @@ def download(url, config, logger=None):
         "status": resp.status_code,
         "url": url})
 
+
+# Same as download(), but for the async worker: it goes through a shared
+# aiohttp ClientSession so connections to the cache server are kept alive
+# and reused instead of opening a new one per request.
+async def download_async(url, config, session, logger=None):
+    host, port = config.cache_server
+
+    async with session.get(
+            f"http://{host}:{port}/",
+            params=[("q", f"{url}"), ("u", f"{config.user_agent}")]) as resp:
+        status = resp.status
+        content = await resp.read()
+
+    try:
+        if status < 400 and content:
+            return Response(cbor.loads(content))
+    except (EOFError, ValueError) as e:
+        pass
+
+    logger.error(f"Spacetime Response error {status} with url {url}.")
+
+    return Response({
+        "error": f"Spacetime Response error {status} with url {url}.",
+        "status": status,
+        "url": url})
@@ -0,0 +1,212 @@
+"""Local stand-in for the spacetime cache server.
+
+Serves a synthetic web graph over the same protocol utils.download expects:
+GET /?q=<url>&u=<user agent> answers with a CBOR dict holding the url, the
+status and either a pickled requests.Response or, for the cache's own 6xx
+errors, an error message. Lets the crawler run (and be benchmarked) offline:
+
+    python -m utils.local_cache_server --port 9100 --pages 5000 --latency 0.05
+    python launch.py --restart --cache_server 127.0.0.1:9100 --config_file <config with SEEDURL from --print-seeds>
+
+Every page is generated from (seed, page number), so the same settings always
+serve the same graph, and a URL always gets the same status.
+"""
+import pickle
+import random
+import re
+import threading
+import time
+from argparse import ArgumentParser
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cbor
+import requests
+
+# Status codes the real cache server uses for its own failures
+CACHE_ERROR_CODES = range(600, 607)
+HTTP_ERROR_CODES = (404, 500, 503)
+
+_PAGE_PATH = re.compile(r"^/p/(\d+)$")
+_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def _word(i: int) -> str:
+    """Letters-only word for vocabulary entry i (the scraper only counts [A-Za-z]+)."""
+    chars = []
+    i += 26 * 26  # At least three letters
+    while i:
+        i, digit = divmod(i, 26)
+        chars.append(_LETTERS[digit])
+    return "".join(reversed(chars))
+
+
+class SyntheticWeb:
+    """
+    `pages` pages spread round-robin over `hosts` hosts (h<i>.ics.uci.edu, so
+    they pass scraper.is_valid), each linking to `fanout` random pages.
+    Page sizes vary around `page_bytes`. Each URL independently gets a cache
+    error (6xx) with probability cache_error_rate, an HTTP error with
+    error_rate, or a non-HTML body with binary_rate. Responses are delayed by
+    `latency` seconds on average (uniformly between half and 1.5x).
+    """
+
+    def __init__(self, pages: int = 1000, fanout: int = 10, hosts: int = 20, page_bytes: int = 10_000,
+                 latency: float = 0.02, error_rate: float = 0.02, cache_error_rate: float = 0.01,
+                 binary_rate: float = 0.02, vocabulary: int = 5000, seed: int = 0):
+        self.pages = pages
+        self.fanout = fanout
+        self.hosts = max(1, hosts)
+        self.page_bytes = page_bytes
+        self.latency = latency
+        self.error_rate = error_rate
+        self.cache_error_rate = cache_error_rate
+        self.binary_rate = binary_rate
+        self.seed = seed
+        self._words = [_word(i) for i in range(vocabulary)]
+
+    def url(self, n: int) -> str:
+        return f"https://h{n % self.hosts}.ics.uci.edu/p/{n}"
+
+    def seed_urls(self) -> list[str]:
+        """One page on every host."""
+        return [self.url(n) for n in range(min(self.hosts, self.pages))]
+
+    def page_number(self, url: str) -> int | None:
+        parsed = urlparse(url)
+        match = _PAGE_PATH.match(parsed.path)
+        if not match:
+            return None
+        n = int(match.group(1))
+        if n >= self.pages or parsed.hostname != f"h{n % self.hosts}.ics.uci.edu":
+            return None
+        return n
+
+    def delay(self) -> float:
+        return random.uniform(0.5, 1.5) * self.latency
+
+    def respond(self, url: str) -> bytes:
+        """CBOR payload for one request, as the cache server would send it."""
+        n = self.page_number(url)
+        if n is None:
+            return self._http_response(url, 404, "text/html", b"<html><body>Not found</body></html>")
+
+        rng = random.Random(self.seed * 1_000_003 + n)
+        roll = rng.random()
+        if roll < self.cache_error_rate:
+            status = rng.choice(CACHE_ERROR_CODES)
+            return cbor.dumps({"url": url, "status": status, "error": f"Cache error {status} for {url}"})
+        roll -= self.cache_error_rate
+        if roll < self.error_rate:
+            status = rng.choice(HTTP_ERROR_CODES)
+            return self._http_response(url, status, "text/html", f"<html><body>Error {status}</body></html>".encode())
+        roll -= self.error_rate
+        if roll < self.binary_rate:
+            return self._http_response(url, 200, "application/pdf", rng.randbytes(self._size(rng)))
+        return self._http_response(url, 200, "text/html; charset=utf-8", self._html(n, rng))
+
+    def _size(self, rng: random.Random) -> int:
+        return max(200, int(self.page_bytes * rng.uniform(0.5, 1.5)))
+
+    def _html(self, n: int, rng: random.Random) -> bytes:
+        words = self._words
+        parts = [f"<html><head><title>{' '.join(rng.choices(words, k=5))}</title></head><body>",
+                 f"<h1>{' '.join(rng.choices(words, k=4))}</h1>"]
+        for _ in range(self.fanout):
+            target = rng.randrange(self.pages)
+            # Same-host links relative, the rest absolute, like real sites
+            href = f"/p/{target}" if target % self.hosts == n % self.hosts else self.url(target)
+            parts.append(f'<a href="{href}">{rng.choice(words)}</a> ')
+        size = self._size(rng)
+        length = sum(map(len, parts))
+        while length < size:
+            paragraph = f"<p>{' '.join(rng.choices(words, k=60))} <b>{rng.choice(words)}</b></p>"
+            parts.append(paragraph)
+            length += len(paragraph)
+        parts.append("</body></html>")
+        return "".join(parts).encode("utf-8")
+
+    def _http_response(self, url: str, status: int, content_type: str, body: bytes) -> bytes:
+        resp = requests.models.Response()
+        resp.status_code = status
+        resp._content = body
+        resp.headers["Content-Type"] = content_type
+        resp.headers["Content-Length"] = str(len(body))
+        resp.url = url
+        resp.encoding = "utf-8" if "html" in content_type else None
+        resp.reason = requests.status_codes._codes.get(status, ("",))[0].upper()
+        resp.elapsed = timedelta(seconds=self.latency)
+        resp.request = requests.Request("GET", url).prepare()
+        return cbor.dumps({"url": url, "status": status, "response": pickle.dumps(resp)})
+
+
+class _CacheRequestHandler(BaseHTTPRequestHandler):
+    web: SyntheticWeb = None  # Set by make_server()
+
+    def do_GET(self):
+        url = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        time.sleep(self.web.delay())
+        payload = self.web.respond(url)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/cbor")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # One line per page is too much
+
+
+def make_server(web: SyntheticWeb, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """HTTP server for `web` (port 0 picks a free one: see server.server_address)."""
+    handler = type("CacheRequestHandler", (_CacheRequestHandler,), {"web": web})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.request_queue_size = 128  # Many crawler threads connect at once
+    return server
+
+
+def start_in_background(web: SyntheticWeb, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve from a daemon thread of this process; call .shutdown() to stop."""
+    server = make_server(web, host, port)
+    threading.Thread(target=server.serve_forever, name="LocalCacheServer", daemon=True).start()
+    return server
+
+
+def add_web_arguments(cli: ArgumentParser):
+    cli.add_argument("--pages", type=int, default=1000, help="pages in the synthetic graph")
+    cli.add_argument("--fanout", type=int, default=10, help="links per page")
+    cli.add_argument("--hosts", type=int, default=20, help="hosts the pages are spread over")
+    cli.add_argument("--page-bytes", type=int, default=10_000, help="average HTML page size")
+    cli.add_argument("--latency", type=float, default=0.02, help="average response delay (s)")
+    cli.add_argument("--error-rate", type=float, default=0.02, help="share of 404/500/503 pages")
+    cli.add_argument("--cache-error-rate", type=float, default=0.01, help="share of 6xx cache errors")
+    cli.add_argument("--binary-rate", type=float, default=0.02, help="share of non-HTML pages")
+    cli.add_argument("--seed", type=int, default=0)
+
+
+def web_from_arguments(opts) -> SyntheticWeb:
+    return SyntheticWeb(opts.pages, opts.fanout, opts.hosts, opts.page_bytes, opts.latency,
+                        opts.error_rate, opts.cache_error_rate, opts.binary_rate, seed=opts.seed)
+
+
+if __name__ == "__main__":
+    cli = ArgumentParser(description="Local cache server serving a synthetic web graph")
+    cli.add_argument("--host", default="127.0.0.1")
+    cli.add_argument("--port", type=int, default=9100)
+    cli.add_argument("--print-seeds", action="store_true", help="print a SEEDURL line for config.ini and exit")
+    add_web_arguments(cli)
+    opts = cli.parse_args()
+    web = web_from_arguments(opts)
+    if opts.print_seeds:
+        print("SEEDURL = " + ",".join(web.seed_urls()))
+    else:
+        server = make_server(web, opts.host, opts.port)
+        print(f"Serving {web.pages} pages on http://{opts.host}:{opts.port}/ (seeds: {web.seed_urls()[0]} …)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,277 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+# Histogram bucket upper bounds in seconds: 1 µs to ~110 s, four per doubling,
+# so a quantile read off a bucket is within ~19% of the true value
+BUCKET_BOUNDS = [1e-6 * 2 ** (i / 4) for i in range(108)]
+
+
+class Histogram:
+    """Counts of observed durations per log-spaced bucket, plus count/sum/max."""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)  # Last one: over the top bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "Histogram"):
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (capped at the max seen)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(self.max, BUCKET_BOUNDS[i]) if i < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+class _ThreadMetrics:
+    """One thread's counters and histograms. Only its owner writes to it."""
+
+    def __init__(self):
+        self.lock = threading.Lock()  # Uncontended except while a snapshot is merged
+        self.counters: Counter[tuple[str, str | None]] = Counter()
+        self.histograms: dict[str, Histogram] = {}
+
+
+class Metrics:
+    """
+    Crawl instrumentation: timings, counters and gauges from every thread.
+
+    Like CrawlAnalytics, each thread records into its own accumulator and
+    they're only merged when someone looks (the /metrics endpoint or the
+    periodic summary), so recording never waits on another thread.
+    Gauges (queue depths and the like) aren't recorded at all: they're
+    callables registered by whoever owns the state and read on snapshot.
+
+    Parser processes can't record here; they pass their timings back with
+    their results (see scraper.PageAnalysis).
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all_metrics: list[_ThreadMetrics] = []  # Kept after a thread exits
+        self._gauges: dict[str, Callable[[], float | dict]] = {}
+
+    # --- Recording ---
+
+    def count(self, name: str, n: int = 1, key=None):
+        """Add n to a counter; `key` splits it by a label (e.g. the status code)."""
+        stats = self._thread_metrics()
+        with stats.lock:
+            stats.counters[name, None if key is None else str(key)] += n
+
+    def observe(self, name: str, seconds: float):
+        """Add one duration to a histogram."""
+        stats = self._thread_metrics()
+        with stats.lock:
+            histogram = stats.histograms.get(name)
+            if histogram is None:
+                histogram = stats.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Observe how long the with-block took."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def gauge(self, name: str, read: Callable[[], float | dict]):
+        """Register a gauge: `read` returns a number or a {label: number} dict."""
+        with self._lock:
+            self._gauges[name] = read
+
+    # --- Reading ---
+
+    def snapshot(self) -> dict:
+        """Merged counters, histogram summaries and current gauge values."""
+        with self._lock:
+            all_metrics = list(self._all_metrics)
+            gauges = dict(self._gauges)
+
+        counters: Counter[tuple[str, str | None]] = Counter()
+        histograms: dict[str, Histogram] = {}
+        for stats in all_metrics:
+            with stats.lock:
+                counters.update(stats.counters)
+                for name, histogram in stats.histograms.items():
+                    histograms.setdefault(name, Histogram()).merge(histogram)
+
+        counter_values: dict[str, int | dict[str, int]] = {}
+        for (name, key), n in sorted(counters.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+            if key is None:
+                counter_values[name] = n
+            else:
+                counter_values.setdefault(name, {})[key] = n
+
+        gauge_values = {}
+        for name, read in gauges.items():
+            try:
+                gauge_values[name] = read()
+            except Exception as exc:
+                gauge_values[name] = f"error: {exc}"
+
+        return {
+            "uptime": time.time() - self.started,
+            "counters": counter_values,
+            "histograms": {name: histograms[name].summary() for name in sorted(histograms)},
+            "gauges": gauge_values,
+        }
+
+    def render(self, snapshot: dict | None = None) -> str:
+        """The snapshot as text, one `name{label} value` line per number
+        (the Prometheus text format, so it can be scraped as well as read)."""
+        snapshot = snapshot or self.snapshot()
+        lines = [f"# crawler metrics, up {snapshot['uptime']:.0f} s"]
+        for name, value in snapshot["counters"].items():
+            lines.extend(_lines(f"crawler_{_metric_name(name)}_total", value))
+        for name, value in snapshot["gauges"].items():
+            lines.extend(_lines(f"crawler_{_metric_name(name)}", value))
+        for name, summary in snapshot["histograms"].items():
+            metric = f"crawler_{_metric_name(name)}_seconds"
+            for q in ("p50", "p90", "p99"):
+                lines.append(f'{metric}{{quantile="0.{q[1:]}"}} {summary[q]:.6f}')
+            lines.append(f"{metric}_max {summary['max']:.6f}")
+            lines.append(f"{metric}_sum {summary['sum']:.6f}")
+            lines.append(f"{metric}_count {summary['count']}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, snapshot: dict | None = None) -> str:
+        """Short human-readable digest for the log."""
+        snapshot = snapshot or self.snapshot()
+        lines = []
+        gauges = "  ".join(f"{name} {_short(value)}" for name, value in snapshot["gauges"].items())
+        if gauges:
+            lines.append(gauges)
+        for name, s in snapshot["histograms"].items():
+            lines.append(f"{name:<26} n={s['count']:<8,} p50 {_duration(s['p50']):>8}  "
+                         f"p99 {_duration(s['p99']):>8}  max {_duration(s['max']):>8}  "
+                         f"total {_duration(s['sum']):>8}")
+        counters = "  ".join(f"{name} {_short(value)}" for name, value in snapshot["counters"].items())
+        if counters:
+            lines.append(counters)
+        return "\n".join(lines)
+
+    # --- Publishing ---
+
+    def start_server(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve /metrics (text) and /metrics.json from a daemon thread."""
+        metrics = self
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body, content_type = json.dumps(metrics.snapshot(), indent=1), "application/json"
+                elif self.path in ("/", "/metrics"):
+                    body, content_type = metrics.render(), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                payload = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+        return server
+
+    def start_summaries(self, interval: float, logger):
+        """Log summary() every `interval` seconds, with the page rate since the last one."""
+        def _loop():
+            last_pages, last_time = 0, time.time()
+            while True:
+                time.sleep(interval)
+                snapshot = self.snapshot()
+                pages = snapshot["counters"].get("frontier.completed", 0)
+                now = time.time()
+                logger.info(f"{pages:,} pages, {(pages - last_pages) / (now - last_time):.1f}/s\n"
+                            + self.summary(snapshot))
+                last_pages, last_time = pages, now
+
+        threading.Thread(target=_loop, name="MetricsSummary", daemon=True).start()
+
+    # --- Helpers ---
+
+    def _thread_metrics(self) -> _ThreadMetrics:
+        stats = getattr(self._local, "stats", None)
+        if stats is None:
+            stats = self._local.stats = _ThreadMetrics()
+            with self._lock:
+                self._all_metrics.append(stats)
+        return stats
+
+
+def _metric_name(name: str) -> str:
+    return name.replace(".", "_").replace("-", "_")
+
+
+def _lines(metric: str, value) -> list[str]:
+    if isinstance(value, dict):
+        return [f'{metric}{{key="{key}"}} {n}' for key, n in value.items()]
+    return [f"{metric} {value}"]
+
+
+def _duration(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.1f} ms"
+    return f"{seconds * 1e6:.0f} µs"
+
+
+def _short(value) -> str:
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{key}: {n:,}" if isinstance(n, int) else f"{key}: {n}"
+                               for key, n in value.items()) + "}"
+    return f"{value:,}" if isinstance(value, int) else str(value)
+
+
+# Shared by every crawler thread (see crawler/ and scraper.py)
+metrics = Metrics()
@@ -1,5 +1,72 @@
+import io
 import pickle
 
+# Pickled requests.Response objects are only decoded as far as the crawler
+# needs them. `status` comes straight from the cache server's dict, so error
+# pages cost nothing; `headers` and `content` come from one pass of
+# _LightUnpickler, which reads the same bytes but swaps every requests class
+# for a bare stand-in instead of rebuilding cookie jars, the prepared request,
+# redirect history and so on. The full object is still there as
+# `raw_response`, built the first time something asks for it.
+
+# Modules whose classes the light unpickler really constructs (containers
+# and the helpers pickle itself uses for them)
+_REAL_MODULES = {"builtins", "copyreg", "collections", "_codecs"}
+
+
+class _Skipped(object):
+    # Stand-in for any class the crawler doesn't look at: swallows whatever
+    # the pickle builds it with
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __setstate__(self, state):
+        pass
+
+
+class _ResponseState(object):
+    # Stand-in for requests.Response: just keeps the attribute dict
+    def __setstate__(self, state):
+        self.state = state if isinstance(state, dict) else {}
+
+
+class Headers(dict):
+    # Stand-in for requests.structures.CaseInsensitiveDict: keys are stored
+    # lowercase, lookups lowercase the key
+    def __setstate__(self, state):
+        for lower_key, (_, value) in state.get("_store", {}).items():
+            self[lower_key] = value
+
+    def __getitem__(self, key):
+        return dict.__getitem__(self, key.lower())
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key.lower())
+
+    def get(self, key, default=None):
+        return dict.get(self, key.lower(), default)
+
+
+_STAND_INS = {
+    ("requests.models", "Response"): _ResponseState,
+    ("requests.structures", "CaseInsensitiveDict"): Headers,
+}
+
+
+class _LightUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        stand_in = _STAND_INS.get((module, name))
+        if stand_in is not None:
+            return stand_in
+        if module in _REAL_MODULES:
+            return super().find_class(module, name)
+        return _Skipped
+
+
+_NOT_LOADED = object()
+_NO_CONTENT = memoryview(b"")
+
+
 # This class holds the response data from the cache server
 class Response(object):
     def __init__(self, resp_dict):
@@ -12,13 +79,59 @@ class Response(object):
         # If there was an error, store it; otherwise, set to None
         self.error = resp_dict["error"] if "error" in resp_dict else None
 
-        # Try to load the actual raw HTTP response object (HTML, headers, etc.)
+        # The pickled raw HTTP response (HTML, headers, etc.), decoded on demand
+        self._pickled = resp_dict.get("response")
+        self._headers = None
+        self._content = None
+        self._raw_response = _NOT_LOADED
+
+    # Response headers (case-insensitive get), empty if there's no response
+    @property
+    def headers(self):
+        if self._headers is None:
+            self._decode()
+        return self._headers
+
+    # Response body as a read-only memoryview, empty if there's no response
+    @property
+    def content(self):
+        if self._content is None:
+            self._decode()
+        return self._content
+
+    # The actual raw HTTP response object (a full requests.Response), or None
+    @property
+    def raw_response(self):
+        if self._raw_response is _NOT_LOADED:
+            try:
+                self._raw_response = pickle.loads(self._pickled) if self._pickled is not None else None
+            except TypeError:
+                # If something went wrong, keep it as None
+                self._raw_response = None
+        return self._raw_response
+
+    def _decode(self):
+        self._headers, self._content = Headers(), _NO_CONTENT
+        if self._pickled is None:
+            return
         try:
-            self.raw_response = (
-                pickle.loads(resp_dict["response"])  # Deserialize the response
-                if "response" in resp_dict else
-                None
-            )
-        except TypeError:
-            # If something went wrong, keep it as None
-            self.raw_response = None
+            state = _LightUnpickler(io.BytesIO(self._pickled)).load()
+        except (pickle.UnpicklingError, TypeError, ValueError, EOFError, AttributeError, IndexError):
+            return
+        state = getattr(state, "state", None) or {}
+        headers = state.get("headers")
+        if isinstance(headers, Headers):
+            self._headers = headers
+        content = state.get("_content")
+        if isinstance(content, (bytes, bytearray)):
+            self._content = memoryview(content)
+
+    # Sent to parser processes (crawler/pipeline.py) as the still-pickled bytes
+    def __getstate__(self):
+        return {"url": self.url, "status": self.status, "error": self.error, "_pickled": self._pickled}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._headers = None
+        self._content = None
+        self._raw_response = _NOT_LOADED
@@ -0,0 +1,91 @@
+from collections import defaultdict
+from functools import lru_cache
+from hashlib import blake2b
+from threading import Lock
+from typing import Mapping
+
+FINGERPRINT_BITS = 64
+
+
+# Each fingerprint bit gets its own 32-bit "lane" inside one big integer, so a
+# token's weight can be added to all 64 per-bit totals with a single addition
+_LANE_BITS = 32
+_LANE_MASK = (1 << _LANE_BITS) - 1
+
+
+@lru_cache(maxsize=200_000)
+def _token_lanes(token: str) -> int:
+    """
+    Stable 64-bit hash of a token (the builtin hash() differs between processes),
+    spread out so that bit i of the hash becomes the lowest bit of lane i.
+    """
+    h = int.from_bytes(blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+    lanes = 0
+    for bit in range(FINGERPRINT_BITS):
+        if h >> bit & 1:
+            lanes |= 1 << (bit * _LANE_BITS)
+    return lanes
+
+
+def simhash(word_counts: Mapping[str, int]) -> int:
+    """
+    64-bit SimHash of a page's tokens, weighted by how often each one appears.
+    Pages with mostly the same words get fingerprints that differ in only a few bits.
+    """
+    set_weight = 0  # Per-bit sum of the weights of tokens whose hash has that bit set
+    total = 0
+    for token, weight in word_counts.items():
+        set_weight += weight * _token_lanes(token)
+        total += weight
+
+    # A bit is on when the tokens voting for it outweigh the ones voting against
+    fingerprint = 0
+    for bit in range(FINGERPRINT_BITS):
+        if 2 * ((set_weight >> (bit * _LANE_BITS)) & _LANE_MASK) > total:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class SimHashIndex:
+    """
+    Finds fingerprints within `max_distance` bits of each other without a full scan.
+
+    The 64 bits are split into max_distance + 1 bands. Two fingerprints that
+    differ in at most max_distance bits must agree exactly on at least one band
+    (pigeonhole), so only fingerprints sharing a band value are compared.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width = FINGERPRINT_BITS // bands
+        self._bands = [(i * width, width if i < bands - 1 else FINGERPRINT_BITS - i * width)
+                       for i in range(bands)]
+        self._tables: list[defaultdict[int, list[int]]] = [defaultdict(list) for _ in self._bands]
+        self._lock = Lock()
+        self.size = 0
+
+    def _keys(self, fingerprint: int):
+        return [(fingerprint >> shift) & ((1 << width) - 1) for shift, width in self._bands]
+
+    def find(self, fingerprint: int) -> int | None:
+        """Return a stored fingerprint close to this one, if there is one."""
+        for table, key in zip(self._tables, self._keys(fingerprint)):
+            for other in table.get(key, ()):
+                if hamming(fingerprint, other) <= self.max_distance:
+                    return other
+        return None
+
+    def check_and_add(self, fingerprint: int) -> bool:
+        """Add a fingerprint. Returns True if it's a near-duplicate of one already seen."""
+        with self._lock:
+            if self.find(fingerprint) is not None:
+                return True
+            for table, key in zip(self._tables, self._keys(fingerprint)):
+                table[key].append(fingerprint)
+            self.size += 1
+            return False
@@ -0,0 +1,62 @@
+import re
+from collections import defaultdict
+from threading import Lock
+from urllib.parse import parse_qsl, urlparse
+
+# Runs of digits (dates, page numbers, ids) are what usually varies inside a trap
+_DIGITS = re.compile(r"\d+")
+
+
+def url_pattern(parsed) -> str:
+    """
+    Collapse a parsed URL into its "family": host + path with numbers replaced,
+    plus the sorted query parameter names (values dropped).
+    e.g. /events/2024-05-17?view=day and /events/2019-01-02?view=day -> same pattern.
+    """
+    path = _DIGITS.sub("#", parsed.path.lower())
+    params = ",".join(sorted({k for k, _ in parse_qsl(parsed.query, keep_blank_values=True)}))
+    return f"{(parsed.hostname or '').lower()}{path}?{params}"
+
+
+class TrapDetector:
+    """
+    Scores URL families by how many of their crawled pages were near-duplicates.
+    Once a family has at least `min_pages` pages and that share reaches
+    `max_dup_ratio`, it's treated as a crawler trap and pruned in is_valid.
+    """
+
+    def __init__(self, min_pages: int = 20, max_dup_ratio: float = 0.5):
+        self.min_pages = min_pages
+        self.max_dup_ratio = max_dup_ratio
+        self._pages: defaultdict[str, int] = defaultdict(int)
+        self._dups: defaultdict[str, int] = defaultdict(int)
+        self._traps: set[str] = set()
+        self._lock = Lock()
+
+    def record(self, url: str, near_duplicate: bool) -> bool:
+        """Count a crawled page. Returns True if this made its family a trap."""
+        pattern = url_pattern(urlparse(url))
+        with self._lock:
+            self._pages[pattern] += 1
+            if near_duplicate:
+                self._dups[pattern] += 1
+            if pattern not in self._traps and self.score(pattern) >= self.max_dup_ratio \
+                    and self._pages[pattern] >= self.min_pages:
+                self._traps.add(pattern)
+                return True
+        return False
+
+    def score(self, pattern: str) -> float:
+        """Share of this family's pages that were near-duplicates."""
+        pages = self._pages.get(pattern, 0)
+        return self._dups.get(pattern, 0) / pages if pages else 0.0
+
+    def is_trap(self, parsed) -> bool:
+        if not self._traps:
+            return False
+        return url_pattern(parsed) in self._traps
+
+    @property
+    def traps(self) -> set[str]:
+        with self._lock:
+            return set(self._traps)
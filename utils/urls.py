@@ -0,0 +1,75 @@
+from typing import Callable, Iterable
+from urllib.parse import ParseResult, urlparse
+
+from utils import canonical_host, normalize, url_hash_parsed
+from utils.metrics import metrics
+
+
+class Link(str):
+    """
+    An outlink that went through LinkProcessor: the normalized URL itself
+    (so it still works anywhere a URL string does, e.g. in scraper()'s
+    return value), plus what processing it found out, so the frontier
+    doesn't parse or hash it again:
+
+        host    canonical_host() of the URL (the frontier's shard and domain key)
+        parsed  the urlparse() result
+        hash    url_hash() of the URL (the save-file key)
+    """
+
+    host: str
+    parsed: ParseResult
+    hash: str
+
+
+class LinkProcessor:
+    """
+    Turns one page's outlinks into Links in a single pass: normalizes each
+    URL, drops repeats within the page, parses it once, checks it with
+    `is_valid_parsed` (which can cache per-host decisions, see
+    scraper.is_valid_parsed) and hashes it from the same parse.
+    Links that were already processed are passed through (only deduped).
+    """
+
+    def __init__(self, is_valid_parsed: Callable[[ParseResult], bool]):
+        self.is_valid_parsed = is_valid_parsed
+
+    def process(self, urls: Iterable[str]) -> list[Link]:
+        links: list[Link] = []
+        seen: set[str] = set()
+        invalid = repeated = 0
+        for url in urls:
+            if type(url) is Link:
+                if url not in seen:
+                    seen.add(url)
+                    links.append(url)
+                continue
+
+            url = normalize(url)
+            if url in seen:
+                repeated += 1
+                continue
+            seen.add(url)
+
+            try:
+                parsed = urlparse(url)
+                if not self.is_valid_parsed(parsed):
+                    invalid += 1
+                    continue
+                host = canonical_host(parsed)
+                url_hash = url_hash_parsed(parsed)
+            except ValueError:  # e.g. a port that isn't a number
+                invalid += 1
+                continue
+
+            link = Link(url)
+            link.host = host
+            link.parsed = parsed
+            link.hash = url_hash
+            links.append(link)
+
+        if invalid:
+            metrics.count("links.invalid", invalid)
+        if repeated:
+            metrics.count("links.repeated", repeated)
+        return links